@@ -0,0 +1,121 @@
+"""API routes for multi-image batch detection."""
+
+import json
+from contextlib import AsyncExitStack
+from typing import List
+
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
+
+from app.api.routes import build_detection_config, build_render_config, detection_service
+from app.config import settings
+from app.models.yolo_manager import ModelLoadTimeoutError
+from app.services.batch_detection import BATCH_RESULT_FIELDS, BatchDetectionService, iter_batch_sources
+from app.services.inference_executor import ExecutorSaturatedError
+from app.utils.ingest import peek_upload, sniff_content_type
+from app.utils.logger import app_logger as logger
+
+# Create router
+router = APIRouter()
+
+# Initialize batch service
+batch_service = BatchDetectionService(detection_service)
+
+
+def parse_result_fields(fields: str = None) -> List[str]:
+    """Parse the comma-separated result fields of a batch request."""
+    if fields is None:
+        return list(BATCH_RESULT_FIELDS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in BATCH_RESULT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(unknown)}. Allowed: {', '.join(BATCH_RESULT_FIELDS)}"
+        )
+    return selected
+
+
+@router.post("/detect/batch")
+async def detect_objects_in_batch(
+    files: List[UploadFile] = File(..., description="Images, or zip/tar archives of images"),
+    model: str = Form(..., description="YOLO model to use (yolov8n, yolov8s, yolov8m, yolov8l)"),
+    confidence: float = Form(None, description="Confidence threshold (0.0-1.0)"),
+    iou: float = Form(None, description="IOU threshold for NMS (0.0-1.0)"),
+    max_det: int = Form(None, description="Maximum number of detections"),
+    imgsz: int = Form(None, description="Input image size (320, 640, 1280)"),
+    classes: str = Form(None, description="Comma-separated class ids to detect (all when omitted)"),
+    roi: str = Form(None, description="JSON list of rectangles [x1, y1, x2, y2] and polygons [[x, y], ...] in source pixels"),
+    render: str = Form(None, description="Annotated image format (none, jpeg, webp, png)"),
+    render_quality: int = Form(None, description="JPEG/WebP quality of the annotated images (1-100)"),
+    annotate: bool = Form(None, description="Deprecated: true is the same as render=jpeg"),
+    fields: str = Form(None, description="Comma-separated result fields (detections, count, image_size)")
+):
+    """Detect objects in many images, streaming one NDJSON line per image as it finishes.
+
+    Each line carries the image's index and filename; failed images get an
+    error line instead of failing the batch. A final line with done=true
+    summarizes the batch.
+    """
+    if model not in settings.available_models:
+        raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+    if len(files) > settings.max_batch_files:
+        raise HTTPException(status_code=400, detail=f"Too many files. Maximum: {settings.max_batch_files}")
+
+    result_fields = parse_result_fields(fields)
+    detection_config = build_detection_config(confidence, iou, max_det, imgsz, classes, roi)
+    if render is None and annotate is not None:
+        render = "jpeg" if annotate else "none"
+    render_config = build_render_config(render, render_quality)
+
+    # Check every upload's content up front so the stream only reports per-image problems
+    allowed_types = settings.supported_image_types + settings.supported_archive_types
+    uploads = []
+    for file in files:
+        content_type = sniff_content_type(peek_upload(file))
+        if content_type not in allowed_types:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File content is not an image or archive: {file.filename} ({content_type or 'unknown'})"
+            )
+        uploads.append((file, content_type))
+
+    logger.info("Processing batch of {} uploads with model {} - Config: {}", len(files), model, detection_config)
+
+    # Admit the request and load the model before the response starts, so failures are still HTTP errors
+    resources = AsyncExitStack()
+    try:
+        await resources.enter_async_context(detection_service.executor.admission())
+        model_instance = await resources.enter_async_context(detection_service.lease_model(model))
+    except ExecutorSaturatedError as e:
+        await resources.aclose()
+        logger.warning("Batch request rejected, inference queue saturated")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ModelLoadTimeoutError as e:
+        await resources.aclose()
+        logger.warning(f"Batch request failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.inference_retry_after)}
+        )
+    except BaseException:
+        await resources.aclose()
+        raise
+
+    async def stream():
+        async with resources:
+            try:
+                async for result in batch_service.detect(
+                    iter_batch_sources(uploads), model, model_instance, detection_config, render_config, result_fields
+                ):
+                    yield json.dumps(result) + "\n"
+            except Exception as e:
+                logger.error(f"Batch processing failed: {e}")
+                yield json.dumps({"done": True, "success": False, "error": f"Batch processing failed: {str(e)}"}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,166 @@
+"""API routes for background video detection jobs."""
+
+import asyncio
+import os
+
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
+
+from app.api.routes import build_detection_config, build_sampling_config, detection_service
+from app.config import settings
+from app.services import job_store
+from app.services.inference_executor import ExecutorSaturatedError
+from app.services.job_store import JobStore
+from app.services.video_jobs import VideoJobManager
+from app.utils.logger import app_logger as logger
+from app.utils.file_validator import validate_file
+
+# Seconds between checks for new detections while a job is running
+STREAM_POLL_INTERVAL = 0.25
+
+# Create router
+router = APIRouter()
+
+# Initialize job manager
+job_manager = VideoJobManager(
+    detection_service,
+    JobStore(settings.job_db_path),
+    job_dir=settings.job_dir,
+    max_concurrent=settings.max_concurrent_jobs,
+    max_queued=settings.max_queued_jobs
+)
+
+
+async def _get_job_or_404(job_id: str):
+    """Get a job status or raise 404."""
+    job = await detection_service.executor.run(job_manager.get_status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.post("/jobs/video", status_code=status.HTTP_202_ACCEPTED)
+async def submit_video_job(
+    file: UploadFile = File(...),
+    model: str = Form(..., description="YOLO model to use (yolov8n, yolov8s, yolov8m, yolov8l)"),
+    confidence: float = Form(None, description="Confidence threshold (0.0-1.0)"),
+    iou: float = Form(None, description="IOU threshold for NMS (0.0-1.0)"),
+    max_det: int = Form(None, description="Maximum number of detections"),
+    imgsz: int = Form(None, description="Input image size (320, 640, 1280)"),
+    classes: str = Form(None, description="Comma-separated class ids to detect (all when omitted)"),
+    roi: str = Form(None, description="JSON list of rectangles [x1, y1, x2, y2] and polygons [[x, y], ...] in source pixels"),
+    sample_policy: str = Form(None, description="Frame sampling policy (stride, scene_change, target_fps)"),
+    stride: int = Form(None, description="Inference stride (stride) or maximum gap (scene_change)"),
+    target_fps: float = Form(None, description="Inference rate for the target_fps policy"),
+    scene_threshold: float = Form(None, description="Frame difference that triggers inference (scene_change)"),
+    track: bool = Form(None, description="Carry boxes onto skipped frames with a tracker")
+):
+    """Queue a video for background detection and return its job id immediately."""
+    await validate_file(file, settings.supported_video_types, settings.max_file_size)
+
+    if model not in settings.available_models:
+        raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+
+    detection_config = build_detection_config(confidence, iou, max_det, imgsz, classes, roi)
+    sampling_config = build_sampling_config(sample_policy, stride, target_fps, scene_threshold, track)
+
+    try:
+        job = await job_manager.submit(file.file, file.filename, model, detection_config, sampling_config)
+    except ExecutorSaturatedError as e:
+        logger.warning("Video job rejected, job queue saturated")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue is full, retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['id']}",
+        "detections_url": f"/api/jobs/{job['id']}/detections"
+    }
+
+
+@router.get("/jobs")
+async def list_jobs(limit: int = 50):
+    """List recent video jobs."""
+    return await detection_service.executor.run(job_manager.list_status, limit)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get job progress: frames done, FPS and ETA."""
+    return await _get_job_or_404(job_id)
+
+
+@router.post("/jobs/{job_id}/cancel", status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; the worker running it stops at its next progress update."""
+    job = await _get_job_or_404(job_id)
+    if job["status"] in job_store.FINAL_STATES:
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+
+    if not await detection_service.executor.run(job_manager.cancel, job_id):
+        # Finished between the two reads
+        job = await _get_job_or_404(job_id)
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return {"job_id": job_id, "cancelling": True}
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Get the final result of a completed job."""
+    job = await _get_job_or_404(job_id)
+    if job["status"] != job_store.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    return {
+        "success": True,
+        "job_id": job_id,
+        "video_url": job["video_url"],
+        "original_filename": job["original_filename"],
+        "model_used": job["model_id"],
+        "total_frames": job["total_frames"],
+        "processing_fps": job["fps"],
+        "inference_ratio": job["inference_ratio"],
+        "processing_time": job["finished_at"] - job["started_at"],
+        "pipeline_stats": job["pipeline_stats"],
+        "detections_url": f"/api/jobs/{job_id}/detections"
+    }
+
+
+@router.get("/jobs/{job_id}/detections")
+async def stream_job_detections(job_id: str):
+    """Stream per-frame detections as NDJSON, following the job while it runs."""
+    job = await _get_job_or_404(job_id)
+    detections_path = job["detections_path"]
+
+    async def is_active() -> bool:
+        # Read from the job store, so jobs run by other server workers are followed too
+        return await detection_service.executor.run(job_manager.is_active, job_id)
+
+    async def follow():
+        # Wait for the worker to create the log
+        while not os.path.exists(detections_path):
+            if not await is_active():
+                return
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+        with open(detections_path, "r", encoding="utf-8") as f:
+            partial = ""
+            while True:
+                # Sample the state before reading so lines written before the job ended are not lost
+                active = await is_active()
+                chunk = f.read()
+                if chunk:
+                    partial += chunk
+                    complete, _, partial = partial.rpartition("\n")
+                    if complete:
+                        yield complete + "\n"
+                    continue
+                if not active:
+                    break
+                await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+    return StreamingResponse(follow(), media_type="application/x-ndjson")
@@ -2,16 +2,21 @@
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, status
 from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
-import os
 from datetime import datetime
 
 from app.config import settings
-from app.models.yolo_manager import YOLOModelManager
+from app.models.yolo_manager import ModelLoadTimeoutError, YOLOModelManager
 from app.services.detection_service import DetectionService
+from app.services.frame_sampling import SAMPLE_POLICIES
+from app.services.inference_executor import ExecutorSaturatedError
+from app.services.regions import parse_roi
+from app.services.rendering import RENDER_FORMATS
+from app.services.tiling import TILE_MERGE_METHODS
 from app.utils.logger import app_logger as logger
 from app.utils.file_validator import validate_file
+from app.utils.metrics import observe_stage
 
 # Create router
 router = APIRouter()
@@ -21,6 +26,100 @@ model_manager = YOLOModelManager()
 detection_service = DetectionService(model_manager)
 
 
+def parse_classes(classes: str) -> List[int]:
+    """Parse comma-separated class ids into a sorted list without duplicates."""
+    try:
+        class_ids = sorted({int(value) for value in classes.split(",") if value.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="classes must be comma-separated class ids")
+    if not class_ids or class_ids[0] < 0:
+        raise HTTPException(status_code=400, detail="classes must be comma-separated class ids")
+    return class_ids
+
+
+def build_detection_config(confidence: float = None, iou: float = None, max_det: int = None,
+                           imgsz: int = None, classes: str = None, roi: str = None) -> Dict[str, Any]:
+    """Build YOLO detection parameters from the optional request fields."""
+    detection_config = {}
+    if confidence is not None:
+        detection_config['conf'] = confidence
+    if iou is not None:
+        detection_config['iou'] = iou
+    if max_det is not None:
+        detection_config['max_det'] = max_det
+    if imgsz is not None:
+        detection_config['imgsz'] = imgsz
+    if classes is not None:
+        detection_config['classes'] = parse_classes(classes)
+    if roi is not None:
+        try:
+            detection_config['roi'] = parse_roi(roi)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return detection_config
+
+
+def build_sampling_config(sample_policy: str = None, stride: int = None, target_fps: float = None,
+                          scene_threshold: float = None, track: bool = None) -> Dict[str, Any]:
+    """Build video frame-sampling options from the optional request fields."""
+    if sample_policy is not None and sample_policy not in SAMPLE_POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sample_policy: {sample_policy}. Allowed: {', '.join(SAMPLE_POLICIES)}"
+        )
+    if stride is not None and stride < 1:
+        raise HTTPException(status_code=400, detail="stride must be at least 1")
+    if target_fps is not None and target_fps <= 0:
+        raise HTTPException(status_code=400, detail="target_fps must be positive")
+
+    options = {
+        "policy": sample_policy,
+        "stride": stride,
+        "target_fps": target_fps,
+        "scene_threshold": scene_threshold,
+        "track": track
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def build_tiling_config(tiled: bool = None, tile_size: int = None, tile_overlap: float = None,
+                        tile_full_frame: bool = None, tile_merge: str = None) -> Optional[Dict[str, Any]]:
+    """Build tiled-inference options from the optional request fields (None when not tiled)."""
+    if not tiled:
+        return None
+    if tile_size is not None and tile_size < 32:
+        raise HTTPException(status_code=400, detail="tile_size must be at least 32")
+    if tile_overlap is not None and not 0 <= tile_overlap < 1:
+        raise HTTPException(status_code=400, detail="tile_overlap must be in [0, 1)")
+    if tile_merge is not None and tile_merge not in TILE_MERGE_METHODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid tile_merge: {tile_merge}. Allowed: {', '.join(TILE_MERGE_METHODS)}"
+        )
+
+    options = {
+        "tile_size": tile_size,
+        "overlap": tile_overlap,
+        "full_frame": tile_full_frame,
+        "merge": tile_merge
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def build_render_config(render: str = None, render_quality: int = None, render_lazy: bool = None) -> Dict[str, Any]:
+    """Build annotated-image options from the optional request fields."""
+    if render is not None and render not in RENDER_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid render: {render}. Allowed: {', '.join(RENDER_FORMATS)}"
+        )
+    if render_quality is not None and not 1 <= render_quality <= 100:
+        raise HTTPException(status_code=400, detail="render_quality must be between 1 and 100")
+
+    options = {"format": render, "quality": render_quality, "lazy": render_lazy}
+    return {key: value for key, value in options.items() if value is not None}
+
+
 @router.get("/models", response_model=List[Dict[str, Any]])
 async def get_available_models():
     """Get list of available YOLO models."""
@@ -40,6 +139,18 @@ async def get_available_models():
         raise HTTPException(status_code=500, detail="Failed to retrieve models")
 
 
+@router.get("/models/resident")
+async def get_resident_models():
+    """Get models currently in memory with their footprint, usage and last-used times."""
+    return model_manager.get_residency_stats()
+
+
+@router.get("/models/load-stats")
+async def get_model_load_stats():
+    """Get per-model load attempts, failures and load, file-read and warmup durations."""
+    return model_manager.get_load_metrics()
+
+
 @router.post("/detect/image")
 async def detect_objects_in_image(
     file: UploadFile = File(...),
@@ -47,43 +158,67 @@ async def detect_objects_in_image(
     confidence: float = Form(None, description="Confidence threshold (0.0-1.0)"),
     iou: float = Form(None, description="IOU threshold for NMS (0.0-1.0)"),
     max_det: int = Form(None, description="Maximum number of detections"),
-    imgsz: int = Form(None, description="Input image size (320, 640, 1280)")
+    imgsz: int = Form(None, description="Input image size (320, 640, 1280)"),
+    classes: str = Form(None, description="Comma-separated class ids to detect (all when omitted)"),
+    roi: str = Form(None, description="JSON list of rectangles [x1, y1, x2, y2] and polygons [[x, y], ...] in source pixels"),
+    tiled: bool = Form(False, description="Detect on overlapping tiles (for high-resolution images)"),
+    tile_size: int = Form(None, description="Tile edge in pixels"),
+    tile_overlap: float = Form(None, description="Fraction of each tile shared with its neighbours (0.0-1.0)"),
+    tile_full_frame: bool = Form(None, description="Also detect on the whole downscaled image"),
+    tile_merge: str = Form(None, description="How tile results are merged (nms, wbf)"),
+    render: str = Form(None, description="Annotated image format (none, jpeg, webp, png)"),
+    render_quality: int = Form(None, description="JPEG/WebP quality of the annotated image (1-100)"),
+    render_lazy: bool = Form(None, description="Render the annotated image when it is first requested")
 ):
     """Detect objects in an uploaded image."""
     start_time = time.time()
 
     try:
         # Validate file
+        validate_start = time.time()
         await validate_file(file, settings.supported_image_types, settings.max_file_size)
 
         # Validate model
         if model not in settings.available_models:
             raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+        observe_stage("validate", model, "image", time.time() - validate_start)
 
         # Build detection config
-        detection_config = {}
-        if confidence is not None:
-            detection_config['conf'] = confidence
-        if iou is not None:
-            detection_config['iou'] = iou
-        if max_det is not None:
-            detection_config['max_det'] = max_det
-        if imgsz is not None:
-            detection_config['imgsz'] = imgsz
-
-        logger.info(f"Processing image with model {model}: {file.filename} - Config: {detection_config}")
+        detection_config = build_detection_config(confidence, iou, max_det, imgsz, classes, roi)
+        tiling_config = build_tiling_config(tiled, tile_size, tile_overlap, tile_full_frame, tile_merge)
+        render_config = build_render_config(render, render_quality, render_lazy)
+
+        # Per-request detail: debug level, formatted only when a sink takes it
+        logger.debug(
+            "Processing image with model {}: {} - Config: {} - Tiling: {}",
+            model, file.filename, detection_config, tiling_config
+        )
 
         # Process image
-        result = await detection_service.process_image(file, model, detection_config)
+        result = await detection_service.process_image(file, model, detection_config, tiling_config, render_config)
 
         processing_time = time.time() - start_time
         result["processing_time"] = processing_time
 
-        logger.info(f"Image processed in {processing_time:.3f}s")
+        logger.debug("Image processed in {:.3f}s", processing_time)
         return result
 
     except HTTPException:
         raise
+    except ModelLoadTimeoutError as e:
+        logger.warning(f"Image request failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.inference_retry_after)}
+        )
+    except ExecutorSaturatedError as e:
+        logger.warning("Image request rejected, inference queue saturated")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"Image processing failed in {processing_time:.3f}s: {e}")
@@ -97,34 +232,36 @@ async def detect_objects_in_video(
     confidence: float = Form(None, description="Confidence threshold (0.0-1.0)"),
     iou: float = Form(None, description="IOU threshold for NMS (0.0-1.0)"),
     max_det: int = Form(None, description="Maximum number of detections"),
-    imgsz: int = Form(None, description="Input image size (320, 640, 1280)")
+    imgsz: int = Form(None, description="Input image size (320, 640, 1280)"),
+    classes: str = Form(None, description="Comma-separated class ids to detect (all when omitted)"),
+    roi: str = Form(None, description="JSON list of rectangles [x1, y1, x2, y2] and polygons [[x, y], ...] in source pixels"),
+    sample_policy: str = Form(None, description="Frame sampling policy (stride, scene_change, target_fps)"),
+    stride: int = Form(None, description="Inference stride (stride) or maximum gap (scene_change)"),
+    target_fps: float = Form(None, description="Inference rate for the target_fps policy"),
+    scene_threshold: float = Form(None, description="Frame difference that triggers inference (scene_change)"),
+    track: bool = Form(None, description="Carry boxes onto skipped frames with a tracker")
 ):
     """Detect objects in an uploaded video."""
     start_time = time.time()
 
     try:
         # Validate file
+        validate_start = time.time()
         await validate_file(file, settings.supported_video_types, settings.max_file_size)
 
         # Validate model
         if model not in settings.available_models:
             raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+        observe_stage("validate", model, "video", time.time() - validate_start)
 
-        # Build detection config
-        detection_config = {}
-        if confidence is not None:
-            detection_config['conf'] = confidence
-        if iou is not None:
-            detection_config['iou'] = iou
-        if max_det is not None:
-            detection_config['max_det'] = max_det
-        if imgsz is not None:
-            detection_config['imgsz'] = imgsz
-
-        logger.info(f"Processing video with model {model}: {file.filename} - Config: {detection_config}")
+        # Build detection and frame sampling config
+        detection_config = build_detection_config(confidence, iou, max_det, imgsz, classes, roi)
+        sampling_config = build_sampling_config(sample_policy, stride, target_fps, scene_threshold, track)
+
+        logger.info(f"Processing video with model {model}: {file.filename} - Config: {detection_config}, sampling: {sampling_config}")
 
         # Process video
-        result = await detection_service.process_video(file, model, detection_config)
+        result = await detection_service.process_video(file, model, detection_config, sampling_config)
 
         processing_time = time.time() - start_time
         result["processing_time"] = processing_time
@@ -134,6 +271,20 @@ async def detect_objects_in_video(
 
     except HTTPException:
         raise
+    except ModelLoadTimeoutError as e:
+        logger.warning(f"Video request failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.inference_retry_after)}
+        )
+    except ExecutorSaturatedError as e:
+        logger.warning("Video request rejected, inference queue saturated")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"Video processing failed in {processing_time:.3f}s: {e}")
@@ -143,14 +294,13 @@ async def detect_objects_in_video(
 @router.get("/video/status/{filename}")
 async def get_video_status(filename: str):
     """Check if a processed video file exists and is ready."""
-    import os
-    file_path = os.path.join("static", filename)
+    artifact = detection_service.result_store.stat(filename)
 
-    if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+    if artifact is not None and artifact.size > 0:
         return {
             "ready": True,
             "filename": filename,
-            "size": os.path.getsize(file_path)
+            "size": artifact.size
         }
     else:
         return {
@@ -159,6 +309,14 @@ async def get_video_status(filename: str):
         }
 
 
+@router.get("/scheduler/stats")
+async def get_scheduler_stats():
+    """Get inference batching queue depth, batch-size and wait-time metrics."""
+    stats = detection_service.batcher.get_stats()
+    stats["executor"] = detection_service.executor.get_stats()
+    return stats
+
+
 @router.get("/health")
 async def api_health():
     """API health check."""
@@ -166,5 +324,6 @@ async def api_health():
         "status": "healthy",
         "timestamp": time.time(),
         "models_loaded": len(model_manager.loaded_models),
+        "result_cache": detection_service.result_cache.get_stats() if detection_service.result_cache else None,
         "service": "YOLO Object Detection API"
     }
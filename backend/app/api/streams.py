@@ -0,0 +1,147 @@
+"""API routes for server-side detection streams (RTSP/HTTP URLs, devices and looping files)."""
+
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Form, WebSocket, status
+from fastapi.responses import StreamingResponse
+
+from app.api.routes import build_detection_config, detection_service
+from app.config import settings
+from app.services.stream_manager import LiveStream, StreamLimitError, StreamManager, StreamSourceError
+from app.utils.logger import app_logger as logger
+
+# Seconds between SSE comments that keep idle connections (and proxies) open
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+# Create router
+router = APIRouter()
+
+# Initialize stream manager
+stream_manager = StreamManager(
+    detection_service,
+    max_streams=settings.max_streams,
+    inference_slots=settings.stream_inference_slots
+)
+
+
+def _get_stream_or_404(stream_id: str) -> LiveStream:
+    """Get a running stream or raise 404."""
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail=f"Stream not found: {stream_id}")
+    return stream
+
+
+@router.post("/streams", status_code=status.HTTP_201_CREATED)
+async def start_stream(
+    source: str = Form(..., description="rtsp://, http(s):// or rtmp:// URL, device index, or file path"),
+    model: str = Form(..., description="YOLO model to use (yolov8n, yolov8s, yolov8m, yolov8l)"),
+    confidence: float = Form(None, description="Confidence threshold (0.0-1.0)"),
+    iou: float = Form(None, description="IOU threshold for NMS (0.0-1.0)"),
+    max_det: int = Form(None, description="Maximum number of detections"),
+    imgsz: int = Form(None, description="Input image size (320, 640, 1280)"),
+    classes: str = Form(None, description="Comma-separated class ids to detect (all when omitted)"),
+    roi: str = Form(None, description="JSON list of rectangles [x1, y1, x2, y2] and polygons [[x, y], ...] in source pixels"),
+    max_fps: float = Form(None, description="Maximum inference rate for this stream; 0 removes the cap"),
+    loop: bool = Form(True, description="Restart file sources when they end")
+):
+    """Start pulling frames from a source and detecting on them until the stream is deleted."""
+    if model not in settings.available_models:
+        raise HTTPException(status_code=400, detail=f"Invalid model: {model}")
+    if max_fps is not None and max_fps < 0:
+        raise HTTPException(status_code=400, detail="max_fps must not be negative")
+
+    detection_config = build_detection_config(confidence, iou, max_det, imgsz, classes, roi)
+    try:
+        stream = await stream_manager.add(
+            source, model, detection_config,
+            max_fps=settings.stream_default_max_fps if max_fps is None else max_fps,
+            loop_file=loop
+        )
+    except StreamSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except StreamLimitError as e:
+        logger.warning(f"Stream rejected: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return {
+        **stream.get_status(),
+        "status_url": f"/api/streams/{stream.id}",
+        "events_url": f"/api/streams/{stream.id}/events",
+        "websocket_url": f"/api/ws/streams/{stream.id}"
+    }
+
+
+@router.get("/streams")
+async def list_streams():
+    """List running streams with their state and rates."""
+    return stream_manager.list()
+
+
+@router.get("/streams/{stream_id}")
+async def get_stream(stream_id: str):
+    """Get a stream's state, frame counters and inference rate."""
+    return _get_stream_or_404(stream_id).get_status()
+
+
+@router.delete("/streams/{stream_id}")
+async def stop_stream(stream_id: str):
+    """Stop a stream and close its subscriptions."""
+    _get_stream_or_404(stream_id)
+    await stream_manager.remove(stream_id)
+    return {"stream_id": stream_id, "stopped": True}
+
+
+@router.get("/streams/{stream_id}/events")
+async def stream_events(stream_id: str):
+    """Follow a stream's detections and state changes as Server-Sent Events."""
+    stream = _get_stream_or_404(stream_id)
+
+    async def follow():
+        with stream.subscribe() as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+    return StreamingResponse(
+        follow(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws/streams/{stream_id}")
+async def stream_events_ws(websocket: WebSocket, stream_id: str):
+    """Follow a stream's detections and state changes as JSON WebSocket messages."""
+    await websocket.accept()
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        await websocket.close(code=1008, reason=f"Stream not found: {stream_id}")
+        return
+
+    async def forward():
+        with stream.subscribe() as queue:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                await websocket.send_text(json.dumps(event, separators=(",", ":")))
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    # Stop forwarding as soon as the client goes away, even if the stream is idle
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(wait_for_disconnect())]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if tasks[0] in done and tasks[0].exception() is None:
+        await websocket.close(code=1000, reason="Stream stopped")
@@ -0,0 +1,46 @@
+"""WebSocket route for live detection on a stream of frames."""
+
+from fastapi import APIRouter, Query, WebSocket
+
+from app.api.routes import build_detection_config, detection_service
+from app.config import settings
+from app.services.live_detection import LiveConfig, LiveConfigError, LiveDetectionSession
+from app.utils.logger import app_logger as logger
+
+# Create router
+router = APIRouter()
+
+
+@router.websocket("/ws/detect")
+async def detect_live(
+    websocket: WebSocket,
+    model: str = Query(..., description="YOLO model to use (yolov8n, yolov8s, yolov8m, yolov8l)"),
+    confidence: float = Query(None, description="Confidence threshold (0.0-1.0)"),
+    iou: float = Query(None, description="IOU threshold for NMS (0.0-1.0)"),
+    max_det: int = Query(None, description="Maximum number of detections"),
+    imgsz: int = Query(None, description="Input image size (320, 640, 1280)"),
+    format: str = Query("json", description="Result format: json or binary"),
+    latency_budget_ms: float = Query(None, description="Drop frames that waited longer than this; 0 disables")
+):
+    """Detect objects on encoded frames sent as binary messages, replying per frame.
+
+    Frames that arrive while an older one is still waiting replace it, and
+    frames that exceed the latency budget before inference are dropped.
+    Settings can be changed mid-stream with a JSON {"type": "config"} message.
+    """
+    config = LiveConfig(
+        model_id=model,
+        detect_params=build_detection_config(confidence, iou, max_det, imgsz),
+        output_format=format,
+        latency_budget_ms=settings.ws_latency_budget_ms if latency_budget_ms is None else latency_budget_ms
+    )
+    # Accept first, so an invalid setting reaches the client as the close reason
+    await websocket.accept()
+    try:
+        config.validate()
+    except LiveConfigError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    logger.info(f"Live stream opened with model {model} - Config: {config.describe()}")
+    await LiveDetectionSession(websocket, detection_service, config).run()
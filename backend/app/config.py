@@ -16,6 +16,7 @@ class Settings(BaseSettings):
     # Model settings
     model_cache_dir: str = "./models"
     max_file_size: int = 50 * 1024 * 1024  # 50MB
+    upload_overhead_bytes: int = 64 * 1024  # multipart framing and form fields
     supported_image_types: list = ["image/jpeg", "image/png", "image/jpg"]
     supported_video_types: list = ["video/mp4", "video/avi", "video/mov"]
 
@@ -47,16 +48,136 @@ class Settings(BaseSettings):
         }
     }
 
+    # Inference backends ("torch", "onnx", "onnx_int8" or "openvino"), per model id
+    default_model_backend: str = "torch"
+    model_backends: dict = {}
+    export_imgsz: int = 640
+    onnx_opset: int = 17
+    ort_intra_op_threads: int = 0  # 0 uses the per-worker thread budget (see torch_threads)
+    ort_inter_op_threads: int = 0
+
+    # Model residency ("lru" or "lfu"; 0 disables a limit)
+    max_resident_models: int = 2
+    model_memory_budget_mb: int = 0
+    model_eviction_policy: str = "lru"
+    model_warmup_enabled: bool = True
+    model_warmup_imgsz: list = [640]
+    model_load_timeout: float = 120.0  # seconds a request waits for a model to load
+    model_load_retries: int = 2
+    model_load_retry_delay: float = 1.0  # seconds, multiplied by the attempt number
+
     # Processing settings
     max_image_width: int = 1920
     max_image_height: int = 1080
     detection_confidence_threshold: float = 0.25
     max_video_duration: int = 300  # 5 minutes
+    reduced_jpeg_decode: bool = False  # decode large JPEGs at 1/2, 1/4 or 1/8 scale
+
+    # Tiled inference for high-resolution images (requested per call with tiled=true)
+    tile_size: int = 640
+    tile_overlap: float = 0.2  # fraction of the tile shared with its neighbours
+    tile_batch_size: int = 8  # tiles per inference call
+    tile_merge: str = "nms"  # "nms" or "wbf"
+    tile_merge_iou: float = 0.5
+    tile_full_frame: bool = True  # also run the whole image to catch objects larger than a tile
+    max_tiled_image_width: int = 8192
+    max_tiled_image_height: int = 8192
+
+    # Annotated result images ("none", "jpeg", "webp" or "png"); lazy ones are rendered on first GET
+    render_format: str = "none"
+    render_quality: int = 90  # jpeg and webp
+    render_png_compression: int = 3  # 0-9
+    render_lazy: bool = False
+    render_pending_dir: str = "./pending_renders"  # uploads kept until their lazy image is rendered
+
+    # Result file storage: sharded layout, per-kind TTLs in seconds and a disk quota (0 disables)
+    result_dir: str = "static"
+    result_shard_levels: int = 2  # nested directories named by two hex characters
+    result_image_ttl: int = 24 * 3600
+    result_video_ttl: int = 7 * 24 * 3600
+    result_store_max_bytes: int = 5 * 1024 * 1024 * 1024
+    result_sweep_interval: float = 300.0
+    scratch_dir: str = ""  # temporary uploads; empty uses tmpfs (/dev/shm) when it has room, else ./scratch
+    scratch_max_age: int = 3600  # older temporary and partial files are crash leftovers
+
+    # Batch detection (/api/detect/batch): many images or a zip/tar archive per request
+    max_batch_files: int = 256  # images per request, counting archive members
+    max_batch_upload_size: int = 500 * 1024 * 1024  # whole request body
+    supported_archive_types: list = ["application/zip", "application/x-tar", "application/gzip"]
+    batch_decode_concurrency: int = 8  # images decoded ahead of inference
+
+    # Video pipeline (decode -> inference -> encode stages)
+    video_inference_batch_size: int = 4
+    video_pipeline_queue_size: int = 32  # frames buffered between pipeline stages
+    video_output_max_side: int = 0  # downscale output videos (and inference input) to this longer side; 0 keeps the source size
+    video_letterbox_reuse: bool = True  # letterbox frames into reused buffers instead of per-frame copies
+
+    # Live detection WebSocket (/api/ws/detect)
+    ws_max_frame_size: int = 4 * 1024 * 1024  # encoded bytes per frame
+    ws_latency_budget_ms: float = 500.0  # drop frames that waited longer before inference; 0 disables
+    ws_idle_timeout: float = 60.0  # close connections that send nothing for this long; 0 disables
+
+    # Server-side streams (/api/streams): RTSP/HTTP URLs, capture devices and looping files
+    max_streams: int = 32
+    stream_inference_slots: int = 8  # frames in inference at once across all streams
+    stream_default_max_fps: float = 5.0  # per-stream inference rate cap; 0 removes the cap
+    stream_local_sources: bool = False  # allow file paths and device indexes; only for trusted clients
+    stream_allowed_hosts: list = []  # hostname patterns URL sources may use ("*.cams.local"); empty allows any
+    stream_open_timeout: float = 10.0  # seconds to connect or to wait for a frame
+    stream_reconnect_initial_delay: float = 1.0  # doubled after each failed attempt
+    stream_reconnect_max_delay: float = 30.0
+    stream_max_reconnect_attempts: int = 0  # consecutive failures before giving up; 0 retries forever
+    stream_subscriber_queue_size: int = 64  # events buffered per subscriber before the oldest are dropped
+
+    # Video frame sampling ("stride", "scene_change" or "target_fps") and tracking
+    video_sample_policy: str = "stride"
+    video_sample_stride: int = 3
+    video_max_stride: int = 15  # scene_change: always infer after this many frames
+    video_scene_change_threshold: float = 12.0  # mean abs gray-level difference (0-255)
+    video_target_fps: float = 10.0
+    video_tracking_enabled: bool = True
+    tracker_iou_threshold: float = 0.3
+    tracker_max_age: int = 15  # frames
+
+    # Image result cache (disk tier is disabled when the path is empty)
+    result_cache_enabled: bool = True
+    result_cache_max_bytes: int = 32 * 1024 * 1024
+    result_cache_disk_path: str = ""
+    result_cache_disk_max_bytes: int = 256 * 1024 * 1024
+
+    # Background video jobs
+    job_dir: str = "./jobs"
+    job_db_path: str = "./jobs/jobs.db"
+    max_concurrent_jobs: int = 1
+    max_queued_jobs: int = 16
+
+    # Inference batching
+    inference_batching_enabled: bool = True
+    inference_max_batch_size: int = 8
+    inference_max_batch_wait_ms: float = 5.0
+
+    # Inference executor
+    inference_executor: str = "thread"  # "thread" or "process"
+    inference_workers: int = 2
+    blocking_io_workers: int = 4
+    inference_max_pending: int = 32
+    inference_retry_after: int = 2  # seconds
+    preload_models: list = []  # loaded and warmed up at startup
+
+    # Server workers: more than one pre-forks processes that share the preloaded torch weights
+    workers: int = 1
+    torch_threads: int = 0  # intra-op threads per worker process; 0 splits the CPU cores across workers
+    torch_interop_threads: int = 1
 
     # Logging
     log_level: str = "INFO"
     log_file: str = "../logs/app.log"
     error_log_file: str = "../logs/error.log"
+    log_format: str = "text"  # "text" or "json" (one JSON object per line)
+    log_enqueue: bool = True  # write sinks from a background thread
+    log_success_sample_rate: float = 0.1  # share of successful requests given an access log line
+    log_route_sample_rates: dict = {"/health": 0.0, "/metrics": 0.0}  # per route template overrides
+    log_slow_request_ms: float = 1000.0  # requests slower than this are always logged
 
     # CORS settings
     cors_origins: list = ["http://localhost:5173", "http://localhost:3000"]
@@ -4,15 +4,85 @@ import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager
+import asyncio
+import os
 import time
 
 from app.config import settings
-from app.api.routes import router
-from app.utils.logger import setup_logging
+from app.api.routes import router, detection_service, model_manager
+from app.api.jobs import router as jobs_router, job_manager
+from app.api.batch import router as batch_router
+from app.api.ws import router as ws_router
+from app.api.streams import router as streams_router, stream_manager
+from app.utils.metrics import (
+    CONTENT_TYPE_LATEST, REQUEST_SECONDS, REQUESTS_IN_FLIGHT, register_runtime_gauges, render_metrics
+)
+from app.utils.ingest import UploadSizeLimitMiddleware
+from app.utils.logger import SuccessLogSampler, app_logger as logger, setup_logging
+from app.utils.workers import configure_threads, is_primary_worker, is_respawned_worker
+
+# Expose service state (models, executor, batch queue, jobs) as scrape-time gauges
+register_runtime_gauges(model_manager, detection_service, job_manager)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services, serve, then stop them.
+
+    Nothing here imports torch: configured models are preloaded in the
+    background, so /health answers while they load, and requests for a
+    model still loading wait for that same load.
+    """
+    # Log sinks and files are created here rather than on import
+    setup_logging()
+
+    # Split the CPU cores across server workers before any model runs
+    configure_threads()
+
+    # Create the result and scratch directories, index stored results, clear crash leftovers
+    # and start expiring old results
+    await detection_service.executor.run(detection_service.result_store.scan)
+    # With several server workers, one of them sweeps for all
+    app.state.result_sweeper = None
+    if is_primary_worker():
+        app.state.result_sweeper = asyncio.create_task(
+            detection_service.result_store.run_sweeper(settings.result_sweep_interval)
+        )
+
+    # Load and warm up configured models (process workers preload their own)
+    app.state.model_preload = None
+    if settings.preload_models and not detection_service.executor.uses_processes:
+        app.state.model_preload = asyncio.create_task(preload_models(settings.preload_models))
+
+    # Resume video jobs interrupted by a previous shutdown; jobs left running by
+    # sibling workers are still running, so only a fresh server recovers them
+    if is_primary_worker() and not is_respawned_worker():
+        await job_manager.recover()
+
+    yield
+
+    # Stop streams, video jobs, the preload and the result sweeper, shut down the executor pools
+    # and close the result cache
+    for task in (app.state.model_preload, app.state.result_sweeper):
+        if task is not None:
+            task.cancel()
+    stream_manager.shutdown()
+    job_manager.shutdown()
+    detection_service.executor.shutdown()
+    model_manager.shutdown()
+    if detection_service.result_cache is not None:
+        detection_service.result_cache.close()
+
+
+async def preload_models(model_ids):
+    """Preload and warm up models; a failure is logged and the model loads on its first request."""
+    try:
+        await detection_service.warmup_models(model_ids)
+    except Exception as e:
+        logger.error(f"Model preload failed: {e}")
 
-# Setup logging
-logger = setup_logging()
 
 # Create FastAPI application
 app = FastAPI(
@@ -20,7 +90,16 @@ app = FastAPI(
     description="API for real-time object detection using YOLO models",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
+)
+
+# Reject oversized uploads while the body is still streaming in
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_file_size=settings.max_file_size,
+    overhead_bytes=settings.upload_overhead_bytes,
+    path_limits={"/api/detect/batch": settings.max_batch_upload_size}
 )
 
 # Add CORS middleware
@@ -32,15 +111,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Successful requests are logged for a sample of each route; errors and slow requests always
+access_log_sampler = SuccessLogSampler(settings.log_success_sample_rate, settings.log_route_sample_rates)
+
+
 # Add request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    """Add processing time header to all responses."""
+    """Add processing time header to all responses and record request latency."""
     start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    REQUESTS_IN_FLIGHT.inc()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        process_time = time.time() - start_time
+        # Label by route template, not raw path, to keep the series count bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.labels(route=route, method=request.method, status=str(status_code)).observe(process_time)
+
     response.headers["X-Process-Time"] = str(process_time)
-    logger.info(f"{request.method} {request.url} - {process_time:.3f}s")
+    if (
+        status_code >= 400
+        or process_time * 1000 >= settings.log_slow_request_ms
+        or access_log_sampler.should_log(route)
+    ):
+        # Fields are passed separately: formatted only if a sink takes the record, and kept as JSON fields
+        logger.info(
+            "{method} {path} {status} - {duration:.3f}s",
+            method=request.method, path=request.url.path, status=status_code, route=route, duration=process_time
+        )
     return response
 
 # Global exception handler
@@ -64,7 +166,12 @@ class SafeStaticFiles(StaticFiles):
 
     async def get_response(self, path: str, scope):
         try:
-            return await super().get_response(path, scope)
+            # Lazily rendered result images are drawn on their first request
+            if detection_service.lazy_renders.is_pending(path):
+                await detection_service.executor.run(detection_service.lazy_renders.render, path)
+            response = await super().get_response(path, scope)
+            detection_service.result_store.touch(os.path.basename(path))
+            return response
         except ConnectionResetError:
             # Client disconnected, log but don't crash
             logger.warning(f"Client disconnected while serving static file: {path}")
@@ -73,17 +180,35 @@ class SafeStaticFiles(StaticFiles):
             logger.error(f"Error serving static file {path}: {e}")
             raise
 
-# Mount static files for processed images/videos
-app.mount("/static", SafeStaticFiles(directory="static", html=True), name="static")
+# Mount static files for processed images/videos (the directory is created at startup)
+app.mount("/static", SafeStaticFiles(directory=settings.result_dir, html=True, check_dir=False), name="static")
 
 # Include API routes
 app.include_router(router, prefix="/api", tags=["API"])
+app.include_router(jobs_router, prefix="/api", tags=["Jobs"])
+app.include_router(batch_router, prefix="/api", tags=["Batch"])
+app.include_router(ws_router, prefix="/api", tags=["Stream"])
+app.include_router(streams_router, prefix="/api", tags=["Stream"])
 
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": time.time()}
+    cache = detection_service.result_cache
+    preload = getattr(app.state, "model_preload", None)
+    return {
+        "status": "healthy",
+        "timestamp": time.time(),
+        "models_preloading": preload is not None and not preload.done(),
+        "result_cache": cache.get_stats() if cache is not None else None,
+        "result_store": detection_service.result_store.get_stats()
+    }
+
+# Prometheus metrics endpoint
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Per-stage latency histograms and runtime gauges in the Prometheus text format."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 # Root endpoint
 @app.get("/", tags=["Root"])
@@ -99,8 +224,7 @@ async def root():
 
 if __name__ == "__main__":
     # Create static directory if it doesn't exist
-    import os
-    os.makedirs("static", exist_ok=True)
+    os.makedirs(settings.result_dir, exist_ok=True)
 
     # Run the application
     uvicorn.run(
@@ -108,5 +232,6 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        access_log=False  # the timing middleware writes the (sampled) access log
     )
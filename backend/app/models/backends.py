@@ -0,0 +1,362 @@
+"""Inference backends: PyTorch weights, or cached ONNX Runtime / OpenVINO exports of them."""
+
+import ast
+import functools
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.detections import Detections
+from app.utils.logger import app_logger as logger
+
+BACKENDS = ("torch", "onnx", "onnx_int8", "openvino")
+# Backends whose loader accepts the artifact's bytes instead of a path
+BYTES_BACKENDS = ("onnx", "onnx_int8")
+
+# Class offset used to keep boxes of different classes apart during NMS
+_NMS_CLASS_OFFSET = 7680
+_LETTERBOX_STRIDE = 32
+LETTERBOX_COLOR = (114, 114, 114)
+DEFAULT_IMGSZ = 640
+# First ultralytics release whose predictor internals _detect_letterboxed_torch relies on
+_LETTERBOX_FAST_PATH_VERSION = (8, 4)
+
+# Models loaded before the server forked its workers, keyed by artifact path
+_preloaded: Dict[str, Any] = {}
+
+
+def backend_for(model_id: str) -> str:
+    """Get the configured backend of a model."""
+    backend = settings.model_backends.get(model_id, settings.default_model_backend)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend for {model_id}: {backend}")
+    return backend
+
+
+def weights_path(model_id: str) -> str:
+    """Path of a model's PyTorch weights in the model cache."""
+    return os.path.join(settings.model_cache_dir, settings.available_models[model_id]["filename"])
+
+
+def artifact_path(model_id: str, backend: str) -> str:
+    """Path of a model's artifact for a backend, keyed by export imgsz and opset."""
+    if backend == "torch":
+        return weights_path(model_id)
+
+    stem = os.path.splitext(settings.available_models[model_id]["filename"])[0]
+    imgsz = settings.export_imgsz
+    if backend == "openvino":
+        return os.path.join(settings.model_cache_dir, f"{stem}_{imgsz}_openvino_model")
+    suffix = "_int8" if backend == "onnx_int8" else ""
+    return os.path.join(settings.model_cache_dir, f"{stem}_{imgsz}_opset{settings.onnx_opset}{suffix}.onnx")
+
+
+def ensure_artifact(model_id: str, backend: str) -> str:
+    """Get a model's artifact for a backend, downloading or exporting it on first use."""
+    path = artifact_path(model_id, backend)
+    if os.path.exists(path):
+        return path
+
+    from app.utils.workers import import_torch
+    import_torch()
+    from ultralytics import YOLO
+
+    pt_path = weights_path(model_id)
+    os.makedirs(settings.model_cache_dir, exist_ok=True)
+    if not os.path.exists(pt_path):
+        model_filename = settings.available_models[model_id]["filename"]
+        logger.info(f"Model not found locally, downloading: {model_filename}")
+        # Download model (this happens synchronously in ultralytics)
+        YOLO(model_filename).save(pt_path)
+    if backend == "torch":
+        return path
+
+    if backend == "onnx_int8":
+        fp32_path = ensure_artifact(model_id, "onnx")
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizing {fp32_path} to INT8")
+        quantize_dynamic(fp32_path, path + ".tmp", weight_type=QuantType.QUInt8)
+        os.replace(path + ".tmp", path)
+        return path
+
+    export_format = "openvino" if backend == "openvino" else "onnx"
+    logger.info(f"Exporting {model_id} to {export_format} (imgsz={settings.export_imgsz})")
+    exported = YOLO(pt_path).export(
+        format=export_format,
+        imgsz=settings.export_imgsz,
+        opset=settings.onnx_opset if export_format == "onnx" else None,
+        dynamic=export_format == "onnx"
+    )
+    os.replace(exported, path)
+    return path
+
+
+def load_artifact(path: str, backend: str, data: Optional[bytes] = None):
+    """Load an artifact into a model that can be passed to run_detection.
+
+    ONNX models can be built from the artifact's bytes when the caller has
+    already read them; the other loaders always read the file themselves.
+    """
+    if backend in BYTES_BACKENDS:
+        from app.utils.workers import intra_op_threads
+
+        return OnnxRuntimeModel(
+            path,
+            intra_op_threads=settings.ort_intra_op_threads or intra_op_threads(),
+            inter_op_threads=settings.ort_inter_op_threads,
+            data=data
+        )
+
+    preloaded = _preloaded.pop(path, None)
+    if preloaded is not None:
+        return preloaded
+
+    # Deferred until the first torch model load, so the API starts without torch
+    from app.utils.workers import import_torch
+    import_torch()
+    from ultralytics import YOLO
+    return YOLO(path, task="detect")
+
+
+def preload_torch_models(model_ids: List[str]) -> List[str]:
+    """Load and fuse PyTorch models ahead of forking server workers, which then share their weights.
+
+    Each worker's first load_artifact of a preloaded path takes the copy
+    inherited from the parent; later loads read the file again. Other
+    backends are skipped, as their runtimes do not survive a fork.
+    """
+    from ultralytics import YOLO
+
+    loaded = []
+    for model_id in model_ids:
+        if model_id not in settings.available_models or backend_for(model_id) != "torch":
+            continue
+        path = ensure_artifact(model_id, "torch")
+        model = YOLO(path, task="detect")
+        model.fuse()  # fuse now so workers do not each write fused copies of the weights
+        _preloaded[path] = model
+        loaded.append(model_id)
+    return loaded
+
+
+def accepts_letterboxed_batch(model_id: str) -> bool:
+    """Whether a model's backend takes letterboxed batches of any stride-multiple shape."""
+    # OpenVINO exports have a static square input
+    return backend_for(model_id) != "openvino"
+
+
+def run_detection(model, images, detect_params: Dict[str, Any]) -> List[Detections]:
+    """Run any backend's model and return columnar detections.
+
+    images is a list of BGR images, or an already letterboxed RGB NCHW
+    float32 batch in [0, 1] whose boxes stay in batch coordinates.
+    """
+    if isinstance(images, np.ndarray):
+        params = {key: value for key, value in detect_params.items() if key != "imgsz"}
+        if isinstance(model, OnnxRuntimeModel):
+            return model.detect_letterboxed(images, **params)
+        return _detect_letterboxed_torch(model, images, **params)
+
+    if isinstance(model, OnnxRuntimeModel):
+        return model.detect(images, **detect_params)
+    return [Detections.from_result(result) for result in model(images, **detect_params)]
+
+
+def _detect_letterboxed_torch(model, batch: np.ndarray, conf: float = 0.25, iou: float = 0.7,
+                              max_det: int = 300, classes: Optional[List[int]] = None, **_) -> List[Detections]:
+    """Run an ultralytics model's network and NMS on a letterboxed batch, skipping its own pre/postprocessing.
+
+    This reaches into the predictor; on releases without the expected
+    internals the batch goes through model.predict instead.
+    """
+    import torch
+
+    non_max_suppression = _ultralytics_nms()
+    predictor = _primed_predictor(model) if non_max_suppression is not None else None
+    if predictor is None:
+        return _predict_letterboxed_torch(model, batch, conf, iou, max_det, classes)
+
+    network = predictor.model
+    with torch.inference_mode():
+        tensor = torch.from_numpy(batch).to(predictor.device)
+        outputs = non_max_suppression(
+            network(tensor.half() if network.fp16 else tensor), conf, iou,
+            classes=classes, max_det=max_det, end2end=getattr(network, "end2end", False)
+        )
+    return [Detections.from_data(output.cpu().numpy(), model.names) for output in outputs]
+
+
+def _predict_letterboxed_torch(model, batch: np.ndarray, conf: float, iou: float, max_det: int,
+                               classes: Optional[List[int]]) -> List[Detections]:
+    """Run a letterboxed batch through model.predict, which takes an NCHW tensor as already preprocessed."""
+    import torch
+
+    results = model.predict(torch.from_numpy(batch), conf=conf, iou=iou, max_det=max_det, classes=classes, verbose=False)
+    return [Detections.from_result(result) for result in results]
+
+
+@functools.lru_cache(maxsize=None)
+def _ultralytics_nms():
+    """Get ultralytics' NMS when the installed release supports the letterboxed fast path, else None."""
+    import ultralytics
+
+    version = tuple(int(part) for part in ultralytics.__version__.split(".")[:2] if part.isdigit())
+    try:
+        from ultralytics.utils.nms import non_max_suppression
+    except ImportError:
+        non_max_suppression = None
+    if version < _LETTERBOX_FAST_PATH_VERSION or non_max_suppression is None:
+        logger.warning(f"ultralytics {ultralytics.__version__}: letterboxed batches go through model.predict")
+        return None
+    return non_max_suppression
+
+
+def _primed_predictor(model):
+    """Get the model's predictor, which holds the fused network on its device, or None if it lacks them."""
+    if getattr(model, "predictor", None) is None:
+        model.predict(np.zeros((_LETTERBOX_STRIDE, _LETTERBOX_STRIDE, 3), dtype=np.uint8), verbose=False)
+    predictor = getattr(model, "predictor", None)
+    network = getattr(predictor, "model", None)
+    if network is None or getattr(predictor, "device", None) is None or not hasattr(network, "fp16"):
+        return None
+    return predictor
+
+
+def letterbox_geometry(width: int, height: int, imgsz: int) -> Tuple[float, Tuple[int, int], Tuple[int, int, int, int]]:
+    """Get the scale, resized (width, height) and (left, top, right, bottom) padding of a letterbox."""
+    ratio = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_w = (imgsz - new_width) % _LETTERBOX_STRIDE / 2
+    pad_h = (imgsz - new_height) % _LETTERBOX_STRIDE / 2
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    return ratio, (new_width, new_height), (left, top, right, bottom)
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize keeping aspect ratio and pad to a stride multiple, as the PyTorch predictor does."""
+    height, width = image.shape[:2]
+    ratio, new_size, (left, top, right, bottom) = letterbox_geometry(width, height, imgsz)
+
+    if new_size != (width, height):
+        image = cv2.resize(image, new_size, interpolation=cv2.INTER_LINEAR)
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return image, ratio, (left, top)
+
+
+class OnnxRuntimeModel:
+    """YOLO detection model exported to ONNX, run with ONNX Runtime on CPU.
+
+    Pre- and post-processing mirror the ultralytics predictor: letterbox to
+    a stride multiple, class-aware NMS and rescaling to the source image.
+    """
+
+    def __init__(self, path: str, intra_op_threads: int = 0, inter_op_threads: int = 0, data: Optional[bytes] = None):
+        """Create the inference session from the file, or its bytes (0 threads keeps the ONNX Runtime default)."""
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            path if data is None else data, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.size_bytes = os.path.getsize(path) if data is None else len(data)
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names: Dict[int, str] = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+    def detect(self, images: List[np.ndarray], conf: float = 0.25, iou: float = 0.7, max_det: int = 300,
+               imgsz: int = DEFAULT_IMGSZ, classes: Optional[List[int]] = None, **_) -> List[Detections]:
+        """Detect objects in BGR images; images of the same shape share one session run."""
+        results: List[Optional[Detections]] = [None] * len(images)
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for index, image in enumerate(images):
+            groups.setdefault(image.shape, []).append(index)
+
+        for indices in groups.values():
+            batch, transforms = [], []
+            for index in indices:
+                padded, ratio, pad = letterbox(images[index], imgsz)
+                batch.append(padded)
+                transforms.append((ratio, pad))
+
+            # BGR HWC uint8 -> RGB NCHW float32 in [0, 1]
+            tensor = np.ascontiguousarray(np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+            tensor /= 255.0
+            outputs = self.session.run(None, {self.input_name: tensor})[0]
+
+            for index, output, (ratio, pad) in zip(indices, outputs, transforms):
+                results[index] = self._postprocess(
+                    output, images[index].shape, ratio, pad, conf, iou, max_det, classes
+                )
+        return results
+
+    def detect_letterboxed(self, batch: np.ndarray, conf: float = 0.25, iou: float = 0.7,
+                           max_det: int = 300, classes: Optional[List[int]] = None, **_) -> List[Detections]:
+        """Detect objects in a letterboxed RGB NCHW float32 batch, keeping boxes in batch coordinates."""
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        shape = batch.shape[2:]
+        return [self._postprocess(output, shape, 1.0, (0, 0), conf, iou, max_det, classes) for output in outputs]
+
+    def _postprocess(self, output: np.ndarray, shape: Tuple[int, ...], ratio: float, pad: Tuple[int, int],
+                     conf: float, iou: float, max_det: int, classes: Optional[List[int]] = None) -> Detections:
+        """Turn one (4 + classes, anchors) output into NMS-filtered detections on the source image.
+
+        Boxes whose best class is not in classes are dropped before NMS, as
+        the ultralytics class filter does.
+        """
+        predictions = output.T
+        scores = predictions[:, 4:]
+        class_id = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(scores)), class_id]
+        keep = confidence > conf
+        if classes is not None:
+            keep &= np.isin(class_id, classes)
+        if not keep.any():
+            return Detections.empty(self.names)
+
+        boxes = predictions[keep, :4]
+        confidence, class_id = confidence[keep], class_id[keep]
+        xyxy = np.concatenate([boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, :2] + boxes[:, 2:] / 2], axis=1)
+
+        offsets = (class_id * _NMS_CLASS_OFFSET).astype(np.float32)[:, None]
+        selected = nms(xyxy + offsets, confidence, iou)[:max_det]
+        xyxy = xyxy[selected]
+        xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad[0]) / ratio).clip(0, shape[1])
+        xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad[1]) / ratio).clip(0, shape[0])
+
+        return Detections(
+            xyxy=xyxy.astype(np.float32),
+            confidence=confidence[selected].astype(np.float32),
+            class_id=class_id[selected].astype(np.int32),
+            names=self.names
+        )
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression; returns kept indices by descending score."""
+    # torchvision only when already loaded: ONNX-only workers never import torch
+    torch, torchvision = sys.modules.get("torch"), sys.modules.get("torchvision")
+    if torch is not None and torchvision is not None:
+        return torchvision.ops.nms(torch.from_numpy(boxes), torch.from_numpy(scores), iou_threshold).numpy()
+
+    order = scores.argsort()[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        top_left = np.maximum(boxes[best, :2], boxes[order[1:], :2])
+        bottom_right = np.minimum(boxes[best, 2:], boxes[order[1:], 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        overlap = intersection / (areas[best] + areas[order[1:]] - intersection)
+        order = order[1:][overlap <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
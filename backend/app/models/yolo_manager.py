@@ -1,111 +1,309 @@
 """YOLO model management and caching."""
 
-import os
+import sys
 import asyncio
-from typing import Dict, Optional, Any
-from ultralytics import YOLO
-import torch
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, Any, Tuple
 
 from app.config import settings
+from app.models.backends import BYTES_BACKENDS, backend_for, ensure_artifact, load_artifact
 from app.utils.logger import app_logger as logger
 
+if TYPE_CHECKING:
+    # torch and ultralytics are imported by the first torch model load, not at startup
+    from ultralytics import YOLO
+
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class ModelLoadTimeoutError(Exception):
+    """Raised when a model does not finish loading within the configured timeout."""
+
+
+@dataclass
+class ModelLoadMetrics:
+    """Timings and outcomes of a model's loads."""
+
+    backend: Optional[str] = None
+    attempts: int = 0
+    failures: int = 0
+    loads: int = 0
+    load_seconds: Optional[float] = None
+    export_seconds: Optional[float] = None
+    file_read_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    loaded_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class ResidentModel:
+    """Residency bookkeeping for a loaded model."""
+
+    size_bytes: int
+    loaded_at: float
+    last_used: float
+    use_count: int = 0
+    in_use: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "size_bytes": self.size_bytes,
+            "loaded_at": self.loaded_at,
+            "last_used": self.last_used,
+            "use_count": self.use_count,
+            "in_use": self.in_use
+        }
+
+
+def model_size_bytes(model) -> int:
+    """Bytes held by a model's parameters and buffers, or its artifact size for exported backends."""
+    if hasattr(model, "size_bytes"):
+        return model.size_bytes
+    try:
+        tensors = list(model.model.parameters()) + list(model.model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return 0
+
+
+def _read_artifact(path: str, backend: str) -> Optional[bytes]:
+    """Read an artifact for loaders that take bytes; None for loaders that read the file themselves."""
+    if backend not in BYTES_BACKENDS:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
 
 class YOLOModelManager:
-    """Manages YOLO model loading, caching, and inference."""
+    """Manages YOLO model loading, caching, and inference.
 
-    def __init__(self):
+    Loaded models stay resident until the max_resident count or the memory
+    budget is exceeded; then idle models are evicted by least recent (lru)
+    or least frequent (lfu) use. Models leased by in-flight requests are
+    never evicted.
+    """
+
+    def __init__(self, max_resident: int = None, memory_budget_mb: int = None, eviction_policy: str = None):
         """Initialize the model manager."""
-        self.loaded_models: Dict[str, YOLO] = {}
-        self.model_locks: Dict[str, asyncio.Lock] = {}
-        self._ensure_model_directory()
+        self.max_resident = settings.max_resident_models if max_resident is None else max_resident
+        self.memory_budget_mb = settings.model_memory_budget_mb if memory_budget_mb is None else memory_budget_mb
+        self.eviction_policy = eviction_policy or settings.model_eviction_policy
+        if self.eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown model eviction policy: {self.eviction_policy}")
+
+        self.load_timeout = settings.model_load_timeout
+        self.load_retries = settings.model_load_retries
+        self.load_retry_delay = settings.model_load_retry_delay
 
-    def _ensure_model_directory(self):
-        """Ensure the model cache directory exists."""
-        os.makedirs(settings.model_cache_dir, exist_ok=True)
-        logger.info(f"Model cache directory: {settings.model_cache_dir}")
+        self.loaded_models: Dict[str, "YOLO"] = {}
+        self.residency: Dict[str, ResidentModel] = {}
+        self.load_metrics: Dict[str, ModelLoadMetrics] = {}
+        self.evictions = 0
+        self._loads: Dict[str, asyncio.Future] = {}
+        self._load_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-load")
 
-    async def get_model(self, model_id: str) -> YOLO:
+    async def get_model(self, model_id: str) -> "YOLO":
         """Get or load a YOLO model by ID."""
         if model_id not in settings.available_models:
             raise ValueError(f"Unknown model: {model_id}")
 
-        # Check if model is already loaded
-        if model_id in self.loaded_models:
-            return self.loaded_models[model_id]
+        # Load unless resident; loop in case the model is evicted again before this waiter resumes
+        while model_id not in self.loaded_models:
+            # Concurrent callers share a single in-flight load
+            load = self._loads.get(model_id)
+            if load is None:
+                load = asyncio.ensure_future(self._load_with_retry(model_id))
+                self._loads[model_id] = load
+                load.add_done_callback(lambda _: self._loads.pop(model_id, None))
 
-        # Use lock to prevent concurrent loading of the same model
-        if model_id not in self.model_locks:
-            self.model_locks[model_id] = asyncio.Lock()
+            # Shield so a cancelled or timed-out waiter does not abort the shared load
+            try:
+                await asyncio.wait_for(asyncio.shield(load), timeout=self.load_timeout)
+            except asyncio.TimeoutError:
+                raise ModelLoadTimeoutError(f"Model {model_id} did not load within {self.load_timeout}s")
 
-        async with self.model_locks[model_id]:
-            # Double-check after acquiring lock
-            if model_id in self.loaded_models:
-                return self.loaded_models[model_id]
+        self._touch(model_id)
+        return self.loaded_models[model_id]
+
+    @asynccontextmanager
+    async def lease(self, model_id: str) -> AsyncIterator["YOLO"]:
+        """Get a model and pin it in memory until the block exits."""
+        model = await self.get_model(model_id)
+        resident = self.residency[model_id]
+        resident.in_use += 1
+        try:
+            yield model
+        finally:
+            resident.in_use -= 1
+            self._evict_if_needed()
 
-            # Load the model
-            await self._load_model(model_id)
+    def _touch(self, model_id: str):
+        """Record a use of a resident model."""
+        resident = self.residency[model_id]
+        resident.last_used = time.time()
+        resident.use_count += 1
 
-            return self.loaded_models[model_id]
+    def _over_budget(self) -> bool:
+        if self.max_resident and len(self.loaded_models) > self.max_resident:
+            return True
+        if self.memory_budget_mb:
+            used = sum(resident.size_bytes for resident in self.residency.values())
+            return used > self.memory_budget_mb * 1024 * 1024
+        return False
 
-    async def _load_model(self, model_id: str):
-        """Load a YOLO model from disk or download it."""
+    def _evict_if_needed(self, keep: Optional[str] = None):
+        """Unload idle models until the residency limits are met."""
+        while self._over_budget():
+            idle = [
+                model_id for model_id, resident in self.residency.items()
+                if resident.in_use == 0 and model_id != keep
+            ]
+            if not idle:
+                logger.warning(
+                    f"Model residency over budget with {len(self.loaded_models)} models, all in use"
+                )
+                return
+
+            if self.eviction_policy == "lfu":
+                victim = min(idle, key=lambda m: (self.residency[m].use_count, self.residency[m].last_used))
+            else:
+                victim = min(idle, key=lambda m: self.residency[m].last_used)
+
+            logger.info(f"Evicting model {victim} ({self.eviction_policy})")
+            self._unload(victim)
+            self.evictions += 1
+
+    def _unload(self, model_id: str):
+        """Drop a model from memory."""
+        self.loaded_models.pop(model_id, None)
+        self.residency.pop(model_id, None)
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    async def _load_with_retry(self, model_id: str):
+        """Load a model in the background executor, retrying failed attempts."""
+        metrics = self.load_metrics.setdefault(model_id, ModelLoadMetrics())
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(1, self.load_retries + 2):
+            metrics.attempts += 1
+            try:
+                model, file_read_seconds, construct_seconds = await loop.run_in_executor(
+                    self._load_executor, self._load_model, model_id
+                )
+                break
+            except Exception as e:
+                metrics.failures += 1
+                metrics.last_error = str(e)
+                if attempt > self.load_retries:
+                    raise
+                logger.warning(f"Loading model {model_id} failed (attempt {attempt}), retrying: {e}")
+                await asyncio.sleep(self.load_retry_delay * attempt)
+
+        # Store in memory cache
+        self.loaded_models[model_id] = model
+        now = time.time()
+        self.residency[model_id] = ResidentModel(
+            size_bytes=model_size_bytes(model), loaded_at=now, last_used=now
+        )
+        metrics.file_read_seconds = file_read_seconds
+        metrics.load_seconds = (metrics.export_seconds or 0.0) + (file_read_seconds or 0.0) + construct_seconds
+        metrics.last_error = None
+        metrics.loaded_at = now
+        metrics.loads += 1
+        self._evict_if_needed(keep=model_id)
+
+    def _load_model(self, model_id: str) -> Tuple[Any, Optional[float], float]:
+        """Load a model for its configured backend (runs on the load executor).
+
+        Returns the model, the seconds spent reading its artifact (None
+        when the loader reads the file itself, as torch and OpenVINO do)
+        and the seconds spent building the model. Download and export time
+        is recorded separately.
+        """
         try:
             model_info = settings.available_models[model_id]
-            model_filename = model_info["filename"]
-            model_path = os.path.join(settings.model_cache_dir, model_filename)
-
-            logger.info(f"Loading YOLO model: {model_id} ({model_info['name']})")
-
-            # Check if model file exists locally
-            if not os.path.exists(model_path):
-                logger.info(f"Model not found locally, downloading: {model_filename}")
-                # Download model (this happens synchronously in ultralytics)
-                model = YOLO(model_filename)
-                # Save to cache directory
-                model.save(model_path)
-            else:
-                logger.info(f"Loading model from cache: {model_path}")
-                model = YOLO(model_path)
+            backend = backend_for(model_id)
+
+            logger.info(f"Loading YOLO model: {model_id} ({model_info['name']}, {backend} backend)")
 
-            # Store in memory cache
-            self.loaded_models[model_id] = model
+            # Download or export on first use; ONNX artifacts are then read once and
+            # handed to the loader as bytes, so file I/O is timed apart from deserialization
+            start_time = time.perf_counter()
+            artifact = ensure_artifact(model_id, backend)
+            self.load_metrics[model_id].export_seconds = time.perf_counter() - start_time
+
+            logger.info(f"Loading model from cache: {artifact}")
+            read_start = time.perf_counter()
+            data = _read_artifact(artifact, backend)
+            read_end = time.perf_counter()
+            file_read_seconds = read_end - read_start if data is not None else None
+
+            model = load_artifact(artifact, backend, data)
+            construct_seconds = time.perf_counter() - read_end
 
             # Log model info
+            self.load_metrics[model_id].backend = backend
             self._log_model_info(model_id, model)
+            return model, file_read_seconds, construct_seconds
 
         except Exception as e:
             logger.error(f"Failed to load model {model_id}: {e}")
             raise
 
-    def _log_model_info(self, model_id: str, model: YOLO):
+    def record_warmup(self, model_id: str, seconds: float):
+        """Record how long a model's warmup inferences took."""
+        self.load_metrics.setdefault(model_id, ModelLoadMetrics()).warmup_seconds = seconds
+
+    def get_load_metrics(self) -> Dict[str, Any]:
+        """Get per-model load attempts, failures and load, file-read and warmup times."""
+        return {
+            model_id: {**metrics.to_dict(), "loading": model_id in self._loads}
+            for model_id, metrics in self.load_metrics.items()
+        }
+
+    def _log_model_info(self, model_id: str, model: "YOLO"):
         """Log information about the loaded model."""
         try:
             model_info = settings.available_models[model_id]
 
-            # Get model parameters count
-            total_params = sum(p.numel() for p in model.model.parameters())
-
             logger.info(f"Model {model_id} loaded successfully")
             logger.info(f"  Name: {model_info['name']}")
             logger.info(f"  Size: {model_info['size']}")
-            logger.info(f"  Parameters: {total_params:,}")
+            logger.info(f"  Backend: {backend_for(model_id)}")
+
+            # Get model parameters count (PyTorch backend only)
+            if hasattr(getattr(model, "model", None), "parameters"):
+                total_params = sum(p.numel() for p in model.model.parameters())
+                logger.info(f"  Parameters: {total_params:,}")
 
             # Check if CUDA is available
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+            torch = sys.modules.get("torch")
+            device = "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
             logger.info(f"  Device: {device}")
 
         except Exception as e:
             logger.warning(f"Could not log model info for {model_id}: {e}")
 
-    async def unload_model(self, model_id: str):
-        """Unload a model from memory."""
+    async def unload_model(self, model_id: str) -> bool:
+        """Unload a model from memory unless a request is using it."""
         if model_id in self.loaded_models:
-            logger.info(f"Unloading model: {model_id}")
-            del self.loaded_models[model_id]
+            if self.residency[model_id].in_use:
+                logger.warning(f"Not unloading model {model_id}: in use")
+                return False
 
-            # Clean up lock if no longer needed
-            if model_id in self.model_locks:
-                del self.model_locks[model_id]
+            logger.info(f"Unloading model: {model_id}")
+            self._unload(model_id)
+        return True
 
     def get_loaded_models_info(self) -> Dict[str, Any]:
         """Get information about currently loaded models."""
@@ -115,12 +313,30 @@ class YOLOModelManager:
             info[model_id] = {
                 "name": model_info.get("name", model_id),
                 "filename": model_info.get("filename", ""),
-                "loaded": True
+                "loaded": True,
+                **self.residency[model_id].to_dict()
             }
         return info
 
-    def clear_cache(self):
-        """Clear all loaded models from memory."""
-        logger.info(f"Clearing model cache: {len(self.loaded_models)} models")
-        self.loaded_models.clear()
-        self.model_locks.clear()
+    def get_residency_stats(self) -> Dict[str, Any]:
+        """Get resident models with their footprint and usage, plus the residency limits."""
+        return {
+            "policy": self.eviction_policy,
+            "max_resident": self.max_resident,
+            "memory_budget_mb": self.memory_budget_mb,
+            "resident_bytes": sum(resident.size_bytes for resident in self.residency.values()),
+            "evictions": self.evictions,
+            "models": self.get_loaded_models_info()
+        }
+
+    def clear_cache(self) -> int:
+        """Unload every model not leased by a request; returns the number unloaded."""
+        idle = [model_id for model_id, resident in self.residency.items() if not resident.in_use]
+        logger.info(f"Clearing model cache: {len(idle)} of {len(self.loaded_models)} models (others in use)")
+        for model_id in idle:
+            self._unload(model_id)
+        return len(idle)
+
+    def shutdown(self):
+        """Stop the model load executor."""
+        self._load_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,117 @@
+"""Pre-fork launcher: uvicorn workers forked from a parent that already holds the model weights."""
+
+import os
+import signal
+import socket
+import time
+from typing import Dict
+
+from app.config import settings
+from app.utils.logger import app_logger as logger, setup_logging
+from app.utils.workers import WORKER_RESPAWNED_ENV, WORKER_SLOT_ENV
+
+# Seconds to wait before replacing a worker that exited, so a crash loop does not spin
+_RESPAWN_DELAY = 1.0
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket all workers accept on."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, slot: int, respawned: bool):
+    """Serve the app on the shared socket; runs in a forked child and never returns."""
+    import uvicorn
+
+    # Own log sinks (and their writer thread) for this worker
+    setup_logging()
+
+    os.environ[WORKER_SLOT_ENV] = str(slot)
+    if respawned:
+        os.environ[WORKER_RESPAWNED_ENV] = "1"
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    status = 0
+    try:
+        config = uvicorn.Config(
+            "app.main:app",
+            log_level=settings.log_level.lower(),
+            access_log=False  # the timing middleware writes the (sampled) access log
+        )
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException as e:
+        logger.error(f"Worker {slot} failed: {e}")
+        status = 1
+    finally:
+        # os._exit skips atexit handlers, so drain the queued log sinks first
+        logger.complete()
+        os._exit(status)
+
+
+def serve(workers: int):
+    """Preload models, fork the workers and replace any that exit until the server is stopped.
+
+    Torch, OpenCV and the preloaded torch models are loaded once here, so
+    their memory pages are shared copy-on-write by all workers. The
+    application itself (pools, job store, event loop) is only imported in
+    the workers, after the fork.
+    """
+    import torch
+
+    from app.models.backends import preload_torch_models
+
+    # A single thread while loading, so no OpenMP thread pool exists at fork time;
+    # each worker applies its own thread budget when the app is imported
+    torch.set_num_threads(1)
+    started = time.perf_counter()
+    preloaded = preload_torch_models(settings.preload_models)
+    logger.info(f"Preloaded {preloaded or 'no'} models before forking in {time.perf_counter() - started:.2f}s")
+
+    sock = _bind_socket(settings.host, settings.port)
+    children: Dict[int, int] = {}  # pid -> slot
+    stopping = False
+
+    def spawn(slot: int, respawned: bool = False):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(sock, slot, respawned)
+        children[pid] = slot
+        logger.info(f"Started worker {slot} (pid {pid})")
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        logger.warning(f"Worker {slot} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        time.sleep(_RESPAWN_DELAY)
+        if not stopping:
+            spawn(slot, respawned=True)
+
+    sock.close()
+    logger.info("All workers stopped")
@@ -0,0 +1,216 @@
+"""Multi-image detection: archive expansion, parallel decoding and per-image streamed results."""
+
+import asyncio
+import tarfile
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.services.detections import Detections
+from app.services.regions import split_region
+from app.services.rendering import encode_params, new_result_filename, render_options
+from app.utils.file_validator import validate_image_dimensions
+from app.utils.ingest import SNIFF_LENGTH, decode_image, probe_image_size, sniff_content_type
+from app.utils.logger import app_logger as logger
+from app.utils.metrics import observe_stage, stage_timer
+
+# Optional fields of a per-image result; index, filename and success are always included
+BATCH_RESULT_FIELDS = ("detections", "count", "image_size")
+
+_ARCHIVE_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# (filename, content, error) for each image of a batch
+BatchSource = Tuple[str, Optional[bytes], Optional[str]]
+
+
+@dataclass
+class BatchItem:
+    """One image of a batch on its way from upload to result."""
+
+    index: int
+    filename: str
+    image: Optional[np.ndarray] = None
+    width: int = 0
+    height: int = 0
+    error: Optional[str] = None
+
+
+def _iter_archive(file: UploadFile, content_type: str) -> Iterator[BatchSource]:
+    """Yield the image members of a zip or (optionally compressed) tar upload."""
+    if content_type == "application/zip":
+        with zipfile.ZipFile(file.file) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(_ARCHIVE_IMAGE_EXTENSIONS):
+                    continue
+                if info.file_size > settings.max_file_size:
+                    yield info.filename, None, "File too large"
+                    continue
+                yield info.filename, archive.read(info), None
+        return
+
+    with tarfile.open(fileobj=file.file, mode="r:*") as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.lower().endswith(_ARCHIVE_IMAGE_EXTENSIONS):
+                continue
+            if member.size > settings.max_file_size:
+                yield member.name, None, "File too large"
+                continue
+            yield member.name, archive.extractfile(member).read(), None
+
+
+def iter_batch_sources(uploads: Sequence[Tuple[UploadFile, str]]) -> Iterator[BatchSource]:
+    """Expand uploads (images or archives, with their sniffed types) into images, up to max_batch_files."""
+    count = 0
+    for file, content_type in uploads:
+        if content_type in settings.supported_archive_types:
+            try:
+                for source in _iter_archive(file, content_type):
+                    if count >= settings.max_batch_files:
+                        yield source[0], None, f"Batch limit of {settings.max_batch_files} images reached"
+                        return
+                    count += 1
+                    yield source
+            except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as e:
+                yield file.filename, None, f"Could not read archive: {e}"
+            continue
+
+        if count >= settings.max_batch_files:
+            yield file.filename, None, f"Batch limit of {settings.max_batch_files} images reached"
+            return
+        count += 1
+        file.file.seek(0)
+        yield file.filename, file.file.read(), None
+
+
+class BatchDetectionService:
+    """Runs detection over many images, streaming each result as soon as its batch finishes.
+
+    Images are decoded in parallel a few ahead of inference and grouped into
+    batches of inference_max_batch_size; a batch runs as soon as it is full
+    or no more images are on the way.
+    """
+
+    def __init__(self, detection_service):
+        """Initialize the batch service on top of the single-image detection service."""
+        self.detection_service = detection_service
+        self.executor = detection_service.executor
+
+    async def detect(self, sources: Iterator[BatchSource], model_id: str, model,
+                     detection_config: Dict[str, Any] = None, render_config: Dict[str, Any] = None,
+                     fields: Sequence[str] = BATCH_RESULT_FIELDS) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one result per image in completion order, then a summary."""
+        start_time = time.time()
+        render = render_options(render_config)
+        detect_params = {'conf': settings.detection_confidence_threshold, **(detection_config or {})}
+        detect_params, region = split_region(detect_params)
+        batch_size = settings.inference_max_batch_size
+
+        decoding = set()
+        ready: List[BatchItem] = []
+        exhausted = False
+        next_index = 0
+        succeeded = failed = 0
+
+        while True:
+            # Keep a window of images decoding in parallel ahead of inference
+            while not exhausted and len(decoding) < settings.batch_decode_concurrency:
+                source = await self.executor.run(next, sources, None)
+                if source is None:
+                    exhausted = True
+                    break
+                decoding.add(asyncio.ensure_future(self.executor.run(self._decode, next_index, *source, model_id)))
+                next_index += 1
+
+            if decoding and len(ready) < batch_size:
+                done, decoding = await asyncio.wait(decoding, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t.result().index):
+                    item = task.result()
+                    if item.error is not None:
+                        failed += 1
+                        yield {"index": item.index, "filename": item.filename, "success": False, "error": item.error}
+                    else:
+                        ready.append(item)
+                # Wait for a full batch unless nothing else is coming
+                if len(ready) < batch_size and (decoding or not exhausted):
+                    continue
+
+            if not ready:
+                break
+
+            chunk, ready = ready[:batch_size], ready[batch_size:]
+            # With an ROI, each image is cropped to the window around it
+            crops = [region.crop(item.image) if region is not None else (item.image, (0, 0)) for item in chunk]
+            batch = await self.executor.infer(
+                model_id, model, [image for image, _ in crops], detect_params, endpoint="batch"
+            )
+            for item, detections, (_, origin) in zip(chunk, batch, crops):
+                if region is not None:
+                    detections = region.restore(detections, origin)
+                yield await self._build_result(item, detections, model_id, render, fields)
+                item.image = None
+                succeeded += 1
+
+        processing_time = time.time() - start_time
+        observe_stage("total", model_id, "batch", processing_time)
+        logger.info(f"Batch processed: {succeeded} images, {failed} failed in {processing_time:.3f}s")
+        yield {
+            "done": True,
+            "images": succeeded + failed,
+            "succeeded": succeeded,
+            "failed": failed,
+            "model_used": model_id,
+            "processing_time": processing_time
+        }
+
+    def _decode(self, index: int, filename: str, data: Optional[bytes], error: Optional[str],
+                model_id: str) -> BatchItem:
+        """Validate and decode one image (runs on the blocking I/O pool)."""
+        item = BatchItem(index=index, filename=filename, error=error)
+        if error is not None:
+            return item
+
+        try:
+            content_type = sniff_content_type(data[:SNIFF_LENGTH])
+            if content_type not in settings.supported_image_types:
+                raise ValueError(f"Unsupported image type: {content_type or 'unknown'}")
+
+            header_size = probe_image_size(memoryview(data))
+            if header_size is not None:
+                validate_image_dimensions(*header_size)
+            with stage_timer("decode", model_id, "batch"):
+                item.image = decode_image(memoryview(data))
+            item.height, item.width = item.image.shape[:2]
+            if header_size is None:
+                validate_image_dimensions(item.width, item.height)
+        except HTTPException as e:
+            item.image, item.error = None, e.detail
+        except Exception as e:
+            item.image, item.error = None, str(e)
+        return item
+
+    async def _build_result(self, item: BatchItem, detections: Detections, model_id: str,
+                            render: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+        """Build the result line of one image, saving its annotated copy if requested."""
+        detections = detections.sorted_by_confidence()
+        result = {"index": item.index, "filename": item.filename, "success": True}
+        if "detections" in fields:
+            result["detections"] = detections.to_list()
+        if "count" in fields:
+            result["count"] = len(detections)
+        if "image_size" in fields:
+            result["image_size"] = f"{item.width}x{item.height}"
+
+        if render["format"] != "none":
+            result_filename = new_result_filename(render["format"])
+            await self.executor.run(
+                self.detection_service.save_annotated_image,
+                item.image, detections, result_filename, model_id, "batch",
+                encode_params(render["format"], render["quality"])
+            )
+            result["image_url"] = self.detection_service.result_store.url_for(result_filename)
+        return result
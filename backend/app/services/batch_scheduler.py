@@ -0,0 +1,186 @@
+"""Dynamic micro-batching scheduler for YOLO inference."""
+
+import asyncio
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.services.detections import Detections
+from app.utils.logger import app_logger as logger
+
+# Detection parameters that must match for requests to share a forward pass
+BATCH_KEY_PARAMS = ("imgsz", "conf", "iou", "max_det")
+
+# Upper bounds (ms) of the wait-time histogram buckets
+WAIT_TIME_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+BatchRunner = Callable[[str, Any, List[Any], Dict[str, Any]], Awaitable[List[Any]]]
+
+
+async def run_inline(model_id: str, model, images: List[Any], detect_params: Dict[str, Any]) -> List[Detections]:
+    """Run a batched forward pass directly on the calling thread."""
+    return [Detections.from_result(result) for result in model(images, **detect_params)]
+
+
+@dataclass
+class _PendingRequest:
+    """A single image waiting to join a batch."""
+    image: Any
+    future: asyncio.Future
+    enqueued_at: float
+
+
+@dataclass
+class _BatchLane:
+    """Queue of compatible requests for one model and detection config."""
+    model_id: str
+    model: Any
+    detect_params: Dict[str, Any]
+    pending: Deque[_PendingRequest] = field(default_factory=deque)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+
+class InferenceBatcher:
+    """Groups compatible inference requests into batched forward passes."""
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float, runner: BatchRunner = run_inline,
+                 on_wait: Optional[Callable[[str, float], None]] = None):
+        """Initialize the batcher; on_wait receives each request's model id and seconds spent queued."""
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.runner = runner
+        self.on_wait = on_wait
+        self._lanes: Dict[Tuple, _BatchLane] = {}
+
+        # Metrics
+        self.batch_sizes: Counter = Counter()
+        self.wait_time_buckets: Counter = Counter()
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.requests_total = 0
+        self.batches_total = 0
+
+    @staticmethod
+    def batch_key(model_id: str, detect_params: Dict[str, Any]) -> Tuple:
+        """Build the key under which requests can be batched together."""
+        return (model_id,) + tuple(detect_params.get(name) for name in BATCH_KEY_PARAMS) + (
+            tuple(sorted((k, repr(v)) for k, v in detect_params.items() if k not in BATCH_KEY_PARAMS)),
+        )
+
+    async def submit(self, model_id: str, model, image: Any, detect_params: Dict[str, Any]) -> Detections:
+        """Queue an image for inference and wait for its own result."""
+        key = self.batch_key(model_id, detect_params)
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = _BatchLane(model_id=model_id, model=model, detect_params=dict(detect_params))
+            self._lanes[key] = lane
+        lane.model = model
+
+        future = asyncio.get_running_loop().create_future()
+        lane.pending.append(_PendingRequest(image=image, future=future, enqueued_at=time.perf_counter()))
+        self.requests_total += 1
+        lane.wakeup.set()
+
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._drain(key, lane))
+
+        return await future
+
+    async def _drain(self, key: Tuple, lane: _BatchLane):
+        """Form and run batches until the lane is empty."""
+        try:
+            while lane.pending:
+                await self._wait_for_batch(lane)
+
+                batch = []
+                while lane.pending and len(batch) < self.max_batch_size:
+                    request = lane.pending.popleft()
+                    if not request.future.cancelled():
+                        batch.append(request)
+
+                if batch:
+                    await self._run_batch(lane, batch)
+        finally:
+            if not lane.pending and self._lanes.get(key) is lane:
+                del self._lanes[key]
+
+    async def _wait_for_batch(self, lane: _BatchLane):
+        """Wait until the batch is full or the oldest request hits its deadline."""
+        deadline = lane.pending[0].enqueued_at + self.max_wait
+
+        while len(lane.pending) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            lane.wakeup.clear()
+            try:
+                await asyncio.wait_for(lane.wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+
+    async def _run_batch(self, lane: _BatchLane, batch: List[_PendingRequest]):
+        """Run one forward pass and hand each caller its slice of the results."""
+        started = time.perf_counter()
+        self._record_batch(lane.model_id, batch, started)
+
+        try:
+            results = await self.runner(lane.model_id, lane.model, [request.image for request in batch], lane.detect_params)
+            if len(results) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            logger.error(f"Batched inference failed for {lane.model_id} (batch of {len(batch)}): {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        for request, result in zip(batch, results):
+            if not request.future.done():
+                request.future.set_result(result)
+
+    def _record_batch(self, model_id: str, batch: List[_PendingRequest], started: float):
+        """Update batch size and queue wait metrics."""
+        self.batches_total += 1
+        self.batch_sizes[len(batch)] += 1
+
+        for request in batch:
+            wait = started - request.enqueued_at
+            self.wait_time_total += wait
+            self.wait_time_max = max(self.wait_time_max, wait)
+            wait_ms = wait * 1000.0
+            bucket = next((str(b) for b in WAIT_TIME_BUCKETS_MS if wait_ms <= b), "+Inf")
+            self.wait_time_buckets[bucket] += 1
+            if self.on_wait is not None:
+                self.on_wait(model_id, wait)
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Get the number of queued requests per model."""
+        depth: Dict[str, int] = {}
+        for lane in self._lanes.values():
+            depth[lane.model_id] = depth.get(lane.model_id, 0) + len(lane.pending)
+        return depth
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler metrics for tuning the throughput/latency tradeoff."""
+        batched = sum(self.batch_sizes.values())
+        dispatched = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth(),
+            "active_lanes": len(self._lanes),
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "mean_batch_size": dispatched / batched if batched else 0.0,
+            "wait_time_ms": {
+                "mean": (self.wait_time_total / dispatched * 1000.0) if dispatched else 0.0,
+                "max": self.wait_time_max * 1000.0,
+                "histogram": {
+                    bucket: self.wait_time_buckets.get(bucket, 0)
+                    for bucket in [str(b) for b in WAIT_TIME_BUCKETS_MS] + ["+Inf"]
+                },
+            },
+        }
@@ -1,18 +1,43 @@
 """Object detection service using YOLO models."""
 
 import os
+import threading
 import uuid
 import time
-from typing import Dict, Any, List
-from PIL import Image
+from contextlib import nullcontext
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import cv2
 import numpy as np
 from fastapi import UploadFile
 
 from app.config import settings
+from app.models.backends import DEFAULT_IMGSZ, accepts_letterboxed_batch
 from app.models.yolo_manager import YOLOModelManager
+from app.services.batch_scheduler import InferenceBatcher
+from app.services.detections import Detections
+from app.services.frame_preprocessing import LetterboxBatcher, output_frame_size
+from app.services.frame_sampling import create_sampler
+from app.services.inference_executor import InferenceExecutor
+from app.services.rendering import (
+    RENDER_EXTENSIONS, LazyRenderStore, draw_detections, encode_params, new_result_filename, render_options
+)
+from app.services.regions import split_region
+from app.services.result_cache import ResultCache, make_cache_key
+from app.services.result_store import ResultStore
+from app.services.tiling import merge_detections, shift_detections, tile_views, tile_windows, tiling_options
+from app.services.tracker import IoUTracker
+from app.services.video_pipeline import PipelineResult, VideoPipeline
 from app.utils.logger import app_logger as logger
-from app.utils.file_validator import validate_image_dimensions
+from app.utils.file_validator import validate_image_dimensions, validate_video_duration
+from app.utils.ingest import (
+    choose_reduce_factor, copy_upload, decode_image, map_upload, probe_image_size, probe_video, read_upload,
+    resolve_scratch_dir
+)
+from app.utils.metrics import observe_stage, stage_timer
+
+# Video pipeline stage names as reported in the stage latency metrics
+# (the encode stage also draws boxes and writes the frame)
+_PIPELINE_STAGES = {"decode": "decode", "infer": "inference", "encode": "encode"}
 
 
 class DetectionService:
@@ -21,101 +46,306 @@ class DetectionService:
     def __init__(self, model_manager: YOLOModelManager):
         """Initialize the detection service."""
         self.model_manager = model_manager
-        self._ensure_static_directory()
-
-    def _ensure_static_directory(self):
-        """Ensure the static directory exists for storing results."""
-        os.makedirs("static", exist_ok=True)
-
-    async def process_image(self, file: UploadFile, model_id: str, detection_config: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Process an image for object detection."""
+        self.executor = InferenceExecutor(
+            kind=settings.inference_executor,
+            max_workers=settings.inference_workers,
+            io_workers=settings.blocking_io_workers,
+            max_pending=settings.inference_max_pending,
+            retry_after=settings.inference_retry_after,
+            preload_models=settings.preload_models
+        )
+        self.batcher = InferenceBatcher(
+            max_batch_size=settings.inference_max_batch_size,
+            max_wait_ms=settings.inference_max_batch_wait_ms,
+            runner=self.executor.infer,
+            on_wait=lambda model_id, wait: observe_stage("batch_wait", model_id, "image", wait)
+        )
+        self.result_cache = ResultCache(
+            max_bytes=settings.result_cache_max_bytes,
+            disk_path=settings.result_cache_disk_path or None,
+            disk_max_bytes=settings.result_cache_disk_max_bytes
+        ) if settings.result_cache_enabled else None
+        self.scratch_dir = resolve_scratch_dir(settings.scratch_dir, settings.max_file_size)
+        self.result_store = ResultStore(
+            root=settings.result_dir,
+            shard_levels=settings.result_shard_levels,
+            ttls={"image": settings.result_image_ttl, "video": settings.result_video_ttl},
+            max_bytes=settings.result_store_max_bytes,
+            scratch_dirs={
+                self.scratch_dir: settings.scratch_max_age,
+                settings.render_pending_dir: settings.result_image_ttl or settings.scratch_max_age
+            },
+            partial_max_age=settings.scratch_max_age,
+            shared=settings.workers > 1
+        )
+        self.lazy_renders = LazyRenderStore(settings.render_pending_dir, self.result_store)
+
+    def lease_model(self, model_id: str):
+        """Pin the in-process model for a request (process workers hold their own copies)."""
+        if self.executor.uses_processes:
+            return nullcontext(None)
+        return self.model_manager.lease(model_id)
+
+    async def warmup_models(self, model_ids: List[str]):
+        """Load models and run dummy inferences so first requests skip one-time setup costs."""
+        for model_id in model_ids:
+            if model_id not in settings.available_models:
+                logger.warning(f"Skipping preload of unknown model: {model_id}")
+                continue
+
+            start_time = time.time()
+            async with self.model_manager.lease(model_id) as model:
+                if settings.model_warmup_enabled:
+                    warmup_start = time.time()
+                    await self.executor.run(self._warmup_model, model)
+                    self.model_manager.record_warmup(model_id, time.time() - warmup_start)
+            logger.info(f"Preloaded model {model_id} in {time.time() - start_time:.2f}s")
+
+    def _warmup_model(self, model):
+        """Run one blank frame through the model at each common input size."""
+        for imgsz in settings.model_warmup_imgsz:
+            blank = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+            self.executor.infer_sync(model, [blank], {"imgsz": imgsz, "conf": settings.detection_confidence_threshold})
+
+    async def process_image(self, file: UploadFile, model_id: str, detection_config: Dict[str, Any] = None,
+                            tiling_config: Dict[str, Any] = None, render_config: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Process an image for object detection, optionally as overlapping tiles."""
 
         start_time = time.time()
+        tiling = tiling_options(tiling_config) if tiling_config is not None else None
+        render = render_options(render_config)
 
         try:
-            # Read image
-            image_data = await file.read()
-            image = Image.open(file.file)
-
-            # Validate dimensions
-            validate_image_dimensions(image.width, image.height)
-
-            # Convert to numpy array
-            image_np = np.array(image)
-
-            # Get model
-            model = await self.model_manager.get_model(model_id)
-
-            # Prepare detection parameters
-            detect_params = {
-                'conf': settings.detection_confidence_threshold
-            }
-
-            # Override with custom config if provided
-            if detection_config:
-                detect_params.update(detection_config)
-
-            # Perform detection
-            results = model(image_np, **detect_params)
-
-            # Process results
-            detections = self._process_detection_results(results)
-
-            # Save result image with bounding boxes
-            result_filename = f"result_{uuid.uuid4().hex}.jpg"
-            result_path = os.path.join("static", result_filename)
-
-            # Draw bounding boxes on image
-            annotated_image = self._draw_detections(image_np.copy(), detections)
-            Image.fromarray(annotated_image).save(result_path)
+            async with self.executor.admission():
+                # Read and decode the upload once, off the event loop
+                target_size = (detection_config or {}).get('imgsz', 640)
+                image_np, width, height, scale = await self.executor.run(
+                    self._ingest_image, file.file, target_size, model_id, tiling is not None
+                )
+
+                # Prepare detection parameters
+                detect_params = {
+                    'conf': settings.detection_confidence_threshold
+                }
+
+                # Override with custom config if provided
+                if detection_config:
+                    detect_params.update(detection_config)
+
+                # Identical pixels with the same model and config reuse the stored result
+                cache_key, cached = None, None
+                if self.result_cache is not None:
+                    cache_key, cached = await self.executor.run(
+                        self._lookup_cached_result, image_np, model_id, detect_params, tiling
+                    )
+
+                detections = None
+                if cached is not None:
+                    detections_list = cached["detections"]
+                    result_filename = cached["result_filename"]
+                else:
+                    result_filename = None
+                    # Only the window around the ROI (in decoded pixels) goes through the model
+                    model_params, region = split_region(detect_params)
+                    region = region.scaled(1 / scale) if region is not None else None
+                    image_in, origin = region.crop(image_np) if region is not None else (image_np, (0, 0))
+                    # Perform detection (batched with compatible concurrent requests)
+                    async with self.lease_model(model_id) as model:
+                        if tiling is not None:
+                            detections = await self._detect_tiled(model_id, model, image_in, model_params, tiling)
+                        elif settings.inference_batching_enabled:
+                            detections = await self.batcher.submit(model_id, model, image_in, model_params)
+                        else:
+                            detections = (await self.executor.infer(model_id, model, [image_in], model_params))[0]
+                    with stage_timer("postprocess", model_id, "image"):
+                        if region is not None:
+                            detections = region.restore(detections, origin)
+                        detections = detections.sorted_by_confidence()
+                        detections_list = detections.scaled(scale).to_list()
+
+                # Annotate only on request, unless the stored result already has an image in this format
+                rendered = render["format"] != "none"
+                if rendered and not (result_filename or "").endswith(RENDER_EXTENSIONS[render["format"]]):
+                    if detections is None:
+                        detections = Detections.from_list(detections_list).scaled(1 / scale)
+                    result_filename = await self._render_result(
+                        file, image_np, detections, detections_list, model_id, render
+                    )
+
+                if cache_key is not None and (cached is None or cached["result_filename"] != result_filename):
+                    await self.executor.run(self.result_cache.put, cache_key, {
+                        "detections": detections_list,
+                        "result_filename": result_filename
+                    })
 
             processing_time = time.time() - start_time
+            observe_stage("total", model_id, "image", processing_time)
 
             return {
                 "success": True,
-                "detections": detections,
-                "image_url": f"/static/{result_filename}",
+                "detections": detections_list,
+                "image_url": self.result_store.url_for(result_filename) if rendered else None,
                 "original_filename": file.filename,
                 "model_used": model_id,
-                "image_size": f"{image.width}x{image.height}"
+                "image_size": f"{width}x{height}",
+                "cache": "miss" if cached is None else "hit"
             }
 
         except Exception as e:
             logger.error(f"Image processing failed: {e}")
             raise
 
-    async def process_video(self, file: UploadFile, model_id: str, detection_config: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _ingest_image(self, source, target_size: int, model_id: str,
+                      tiled: bool = False) -> Tuple[np.ndarray, int, int, int]:
+        """Read an upload once, validate its header dimensions and decode it.
+
+        Returns the BGR image, the source width and height, and the factor
+        the image was downscaled by during JPEG decoding. Tiled requests are
+        checked against the larger tiled limits, decoded at full resolution
+        and, once spooled to disk, decoded straight from a memory map.
+        """
+        if tiled:
+            limits = (settings.max_tiled_image_width, settings.max_tiled_image_height)
+            read_start = time.perf_counter()
+            with map_upload(source, settings.max_file_size) as data:
+                observe_stage("read", model_id, "image", time.perf_counter() - read_start)
+                return self._decode_upload(data, target_size, model_id, limits, reduce=False)
+
+        with stage_timer("read", model_id, "image"):
+            data = read_upload(source, settings.max_file_size)
+        return self._decode_upload(data, target_size, model_id, (None, None), reduce=True)
+
+    def _decode_upload(self, data: memoryview, target_size: int, model_id: str,
+                       limits: Tuple[Optional[int], Optional[int]], reduce: bool,
+                       endpoint: str = "image") -> Tuple[np.ndarray, int, int, int]:
+        """Validate header dimensions against the limits and decode the image."""
+        header_size = probe_image_size(data)
+        if header_size is not None:
+            validate_image_dimensions(*header_size, *limits)
+
+        reduce_factor = 1
+        if reduce and settings.reduced_jpeg_decode and header_size is not None and data[:3] == b"\xff\xd8\xff":
+            reduce_factor = choose_reduce_factor(*header_size, target_size)
+
+        with stage_timer("decode", model_id, endpoint):
+            image_np = decode_image(data, reduce_factor)
+        if header_size is None:
+            header_size = (image_np.shape[1], image_np.shape[0])
+            validate_image_dimensions(*header_size, *limits)
+
+        return image_np, header_size[0], header_size[1], reduce_factor
+
+    async def _detect_tiled(self, model_id: str, model, image_np: np.ndarray, detect_params: Dict[str, Any],
+                            tiling: Dict[str, Any]) -> Detections:
+        """Detect on overlapping tiles (plus the whole frame, if enabled) and merge the results."""
+        height, width = image_np.shape[:2]
+        windows = tile_windows(width, height, tiling["tile_size"], tiling["overlap"])
+        tiles = tile_views(image_np, windows)
+        tile_params = {**detect_params, "imgsz": tiling["tile_size"]}
+
+        parts = []
+        for start in range(0, len(tiles), settings.tile_batch_size):
+            batch = await self.executor.infer(
+                model_id, model, tiles[start:start + settings.tile_batch_size], tile_params
+            )
+            for (x1, y1, _, _), detections in zip(windows[start:], batch):
+                parts.append(shift_detections(detections, x1, y1))
+
+        # A downscaled pass over the whole frame finds objects too large for any single tile
+        if tiling["full_frame"] and len(windows) > 1:
+            parts.extend(await self.executor.infer(model_id, model, [image_np], detect_params))
+
+        with stage_timer("postprocess", model_id, "image"):
+            merged = merge_detections(Detections.concatenate(parts), tiling["merge"], tiling["merge_iou"])
+            merged = merged.sorted_by_confidence().select(slice(0, detect_params.get("max_det", 300)))
+        logger.debug("Tiled detection: {} tiles, {} detections after {}", len(windows), len(merged), tiling["merge"])
+        return merged
+
+    def _lookup_cached_result(self, image_np: np.ndarray, model_id: str, detect_params: Dict[str, Any],
+                              tiling: Dict[str, Any] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Hash the decoded image and look up a previous result whose image still exists."""
+        cache_key = make_cache_key(image_np, model_id, detect_params, {"tiling": tiling} if tiling else None)
+        cached = self.result_cache.get(
+            cache_key, is_valid=lambda value: self._result_image_exists(value["result_filename"])
+        )
+        return cache_key, cached
+
+    def _result_image_exists(self, filename: Optional[str]) -> bool:
+        """Whether a result's annotated image (if it has one) is on disk or waiting to be rendered."""
+        if filename is None:
+            return True
+        return self.result_store.exists(filename) or self.lazy_renders.is_pending(filename)
+
+    async def _render_result(self, file: UploadFile, image_np: np.ndarray, detections: Detections,
+                             detections_list: List[Dict[str, Any]], model_id: str, render: Dict[str, Any]) -> str:
+        """Save the annotated image now, or keep what is needed to render it on first GET."""
+        filename = new_result_filename(render["format"])
+        if render["lazy"]:
+            await self.executor.run(
+                self.lazy_renders.save, filename, file.file, detections_list, render["format"], render["quality"]
+            )
+        else:
+            await self.executor.run(
+                self.save_annotated_image, image_np, detections, filename, model_id,
+                "image", encode_params(render["format"], render["quality"])
+            )
+        return filename
+
+    def save_annotated_image(self, image_np: np.ndarray, detections: Detections, filename: str, model_id: str,
+                             endpoint: str = "image", params: List[int] = None):
+        """Draw bounding boxes on the decoded image in place and save it to the result store."""
+        with stage_timer("draw", model_id, endpoint):
+            annotated_image = draw_detections(image_np, detections)
+
+        with stage_timer("encode", model_id, endpoint):
+            ok, encoded = cv2.imencode(os.path.splitext(filename)[1], annotated_image, params or [])
+        if not ok:
+            raise ValueError(f"Could not encode result image: {filename}")
+
+        with stage_timer("save", model_id, endpoint):
+            self._write_file(self.result_store.prepare(filename), encoded)
+            self.result_store.add(filename)
+
+    async def process_video(self, file: UploadFile, model_id: str, detection_config: Dict[str, Any] = None,
+                            sampling_config: Dict[str, Any] = None) -> Dict[str, Any]:
         """Process a video for object detection."""
 
         start_time = time.time()
+        temp_video_path = self.result_store.scratch_path(self.scratch_dir, file.filename)
 
         try:
-            # Save uploaded video temporarily
-            temp_video_path = f"temp_{uuid.uuid4().hex}_{file.filename}"
-            with open(temp_video_path, "wb") as temp_file:
-                content = await file.read()
-                temp_file.write(content)
-
-            # Get model
-            model = await self.model_manager.get_model(model_id)
-
-            # Process video
-            result_filename, total_frames = self._process_video_file(
-                temp_video_path, model, model_id, detection_config
-            )
+            async with self.executor.admission():
+                # Stream the upload to scratch space in chunks
+                read_start = time.time()
+                await self.executor.run(copy_upload, file.file, temp_video_path, settings.max_file_size)
+                observe_stage("read", model_id, "video", time.time() - read_start)
+
+                # Reject over-long videos from the container headers, before decoding any frame
+                with stage_timer("probe", model_id, "video"):
+                    video_info = await self.executor.run(probe_video, temp_video_path)
+                    validate_video_duration(video_info.duration)
+
+                # Decode/encode on the I/O pool; inference batches go to the inference pool
+                async with self.lease_model(model_id) as model:
+                    result_filename, pipeline_result = await self.executor.run(
+                        self._process_video_file, temp_video_path, model, model_id, detection_config, sampling_config
+                    )
 
-            # Clean up temp file
             os.remove(temp_video_path)
 
             processing_time = time.time() - start_time
+            self.observe_pipeline(pipeline_result, model_id, "video")
+            observe_stage("total", model_id, "video", processing_time)
 
             return {
                 "success": True,
-                "video_url": f"/static/{result_filename}",
+                "video_url": self.result_store.url_for(result_filename),
                 "original_filename": file.filename,
                 "model_used": model_id,
-                "total_frames": total_frames,
-                "processing_fps": total_frames / processing_time if processing_time > 0 else 0
+                "total_frames": pipeline_result.total_frames,
+                "processing_fps": pipeline_result.total_frames / processing_time if processing_time > 0 else 0,
+                "inference_ratio": pipeline_result.inference_ratio,
+                "pipeline_stats": pipeline_result.stats()
             }
 
         except Exception as e:
@@ -125,8 +355,35 @@ class DetectionService:
                 os.remove(temp_video_path)
             raise
 
-    def _process_video_file(self, video_path: str, model, model_id: str, detection_config: Dict[str, Any] = None) -> tuple[str, int]:
-        """Process video file and create annotated output."""
+    @staticmethod
+    def observe_pipeline(result: PipelineResult, model_id: str, endpoint: str):
+        """Record the busy time of each video pipeline stage as request stages."""
+        for name, stage in result.stages.items():
+            observe_stage(_PIPELINE_STAGES.get(name, name), model_id, endpoint, stage.busy_time)
+
+    @staticmethod
+    def _write_file(path: str, content: bytes):
+        """Write bytes to a file."""
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def _process_video_file(
+        self,
+        video_path: str,
+        model,
+        model_id: str,
+        detection_config: Dict[str, Any] = None,
+        sampling_config: Dict[str, Any] = None,
+        cancel_event: Optional[threading.Event] = None,
+        on_start: Optional[Callable[[int, float], None]] = None,
+        on_frame: Optional[Callable[[int, Optional[Detections], bool], None]] = None,
+        endpoint: str = "video"
+    ) -> Tuple[str, PipelineResult]:
+        """Process video file and create annotated output.
+
+        The output is written under a partial name and renamed into place once
+        complete, so a result file that exists is always fully written.
+        """
 
         cap = cv2.VideoCapture(video_path)
 
@@ -134,17 +391,25 @@ class DetectionService:
             raise ValueError("Could not open video file")
 
         # Get video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        source_fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = int(source_fps)
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # A container estimate (often low for VFR files): only for progress, decoding runs to the end
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
+        if on_start is not None:
+            on_start(total_frames, fps)
+
         # Create output video
         result_filename = f"result_{uuid.uuid4().hex}.mp4"
-        result_path = os.path.join("static", result_filename)
+        result_path = self.result_store.prepare(result_filename)
+        partial_path = self.result_store.partial_path(result_filename)
 
+        # Frames are downscaled right after decoding; reported boxes stay in source coordinates
+        frame_size = output_frame_size(width, height, settings.video_output_max_side)
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(result_path, fourcc, fps, (width, height))
+        out = cv2.VideoWriter(partial_path, fourcc, fps, frame_size)
 
         if not out.isOpened():
             raise ValueError("Could not create output video file")
@@ -158,102 +423,78 @@ class DetectionService:
         if detection_config:
             detect_params.update(detection_config)
 
-        frame_count = 0
-        processed_frames = 0
+        # Choose which frames run inference; skipped frames get tracked boxes
+        sampler = create_sampler(sampling_config, source_fps)
+        track = (sampling_config or {}).get("track")
+        tracker = None
+        if track or (track is None and settings.video_tracking_enabled):
+            tracker = IoUTracker(
+                iou_threshold=settings.tracker_iou_threshold,
+                max_age=settings.tracker_max_age
+            )
 
-        try:
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                # Perform detection every 3 frames for performance
-                if frame_count % 3 == 0:
-                    results = model(frame, **detect_params)
-                    detections = self._process_detection_results(results)
-                    annotated_frame = self._draw_detections(frame.copy(), detections)
-                    processed_frames += 1
-                else:
-                    annotated_frame = frame
+        # Frames are cropped to the window around the ROI (in output frame pixels) before inference
+        detect_params, region = split_region(detect_params)
+        region = region.scaled(frame_size[0] / width) if region is not None else None
+        infer_size = region.crop_size(*frame_size) if region is not None else frame_size
+
+        infer_batch = lambda frames: self.executor.infer_blocking(model_id, model, frames, detect_params, endpoint)
+        if settings.video_letterbox_reuse and accepts_letterboxed_batch(model_id):
+            batcher = LetterboxBatcher(
+                infer_size, detect_params.get("imgsz", DEFAULT_IMGSZ), settings.video_inference_batch_size
+            )
+            infer_batch = batcher.wrap(infer_batch)
+        if region is not None:
+            infer_batch = region.wrap(infer_batch, frame_size)
+
+        if on_frame is not None and frame_size != (width, height):
+            report_frame, scale = on_frame, width / frame_size[0]
+            on_frame = lambda index, detections, inferred: report_frame(
+                index, detections.scaled(scale) if detections is not None else None, inferred
+            )
 
-                out.write(annotated_frame)
-                frame_count += 1
+        pipeline = VideoPipeline(
+            capture=cap,
+            writer=out,
+            infer_batch=infer_batch,
+            draw=draw_detections,
+            should_infer=sampler.should_infer,
+            tracker=tracker,
+            batch_size=settings.video_inference_batch_size,
+            queue_size=settings.video_pipeline_queue_size,
+            cancel_event=cancel_event,
+            on_frame=on_frame,
+            frame_size=frame_size if frame_size != (width, height) else None,
+            reuse_frames=True
+        )
 
-                if frame_count >= total_frames:
-                    break
+        try:
+            result = pipeline.run()
 
             # Ensure all frames are written
             out.release()
             cap.release()
 
             # Verify the file was created and has content
-            if not os.path.exists(result_path) or os.path.getsize(result_path) == 0:
+            if not os.path.exists(partial_path) or os.path.getsize(partial_path) == 0:
                 raise ValueError("Failed to create output video file")
+            os.replace(partial_path, result_path)
+            self.result_store.add(result_filename)
 
-            logger.info(f"Processed video: {total_frames} frames, {processed_frames} with detection, output: {result_filename}")
+            logger.info(
+                f"Processed video: {result.total_frames} frames, {result.inferred_frames} with detection "
+                f"({type(sampler).__name__}), "
+                f"{result.fps:.1f} FPS, output: {result_filename}"
+            )
+            logger.info(f"Video pipeline stages: {result.stats()}")
 
-            return result_filename, total_frames
+            return result_filename, result
 
         except Exception as e:
             # Clean up resources
             cap.release()
             out.release()
             # Remove incomplete file
-            if os.path.exists(result_path):
-                os.remove(result_path)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
             raise e
-
-    def _process_detection_results(self, results) -> List[Dict[str, Any]]:
-        """Process YOLO detection results into a standardized format."""
-
-        detections = []
-
-        for result in results:
-            boxes = result.boxes
-
-            if boxes is not None:
-                for box in boxes:
-                    # Get bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-
-                    # Get confidence and class
-                    confidence = float(box.conf[0].cpu().numpy())
-                    class_id = int(box.cls[0].cpu().numpy())
-
-                    # Get class name
-                    class_name = result.names[class_id] if hasattr(result, 'names') else f"class_{class_id}"
-
-                    detections.append({
-                        "class": class_name,
-                        "confidence": confidence,
-                        "bbox": [float(x1), float(y1), float(x2), float(y2)]
-                    })
-
-        # Sort by confidence (highest first)
-        detections.sort(key=lambda x: x["confidence"], reverse=True)
-
-        return detections
-
-    def _draw_detections(self, image: np.ndarray, detections: List[Dict[str, Any]]) -> np.ndarray:
-        """Draw bounding boxes and labels on image."""
-
-        for detection in detections:
-            bbox = detection["bbox"]
-            confidence = detection["confidence"]
-            class_name = detection["class"]
-
-            # Extract coordinates
-            x1, y1, x2, y2 = map(int, bbox)
-
-            # Choose color based on class (simple approach)
-            color = (0, 255, 0)  # Green for all detections
-
-            # Draw bounding box
-            cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
-
-            # Draw label
-            label = ".2f"
-            cv2.putText(image, label, (x1, y1 - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-
-        return image
@@ -0,0 +1,123 @@
+"""Columnar detection results shared by inference, drawing and serialization."""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+
+@dataclass
+class Detections:
+    """Struct-of-arrays detection set: one row per box."""
+
+    xyxy: np.ndarray  # (N, 4) float32 box corners
+    confidence: np.ndarray  # (N,) float32
+    class_id: np.ndarray  # (N,) int32
+    names: Dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def empty(cls, names: Dict[int, str] = None) -> "Detections":
+        """Create a detection set without boxes."""
+        return cls(
+            xyxy=np.zeros((0, 4), dtype=np.float32),
+            confidence=np.zeros((0,), dtype=np.float32),
+            class_id=np.zeros((0,), dtype=np.int32),
+            names=dict(names or {})
+        )
+
+    @classmethod
+    def from_result(cls, result) -> "Detections":
+        """Extract one YOLO result with a single device-to-host transfer."""
+        names = dict(getattr(result, "names", None) or {})
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(names)
+
+        return cls.from_data(boxes.data.cpu().numpy(), names)
+
+    @classmethod
+    def from_data(cls, data: np.ndarray, names: Dict[int, str] = None) -> "Detections":
+        """Build from an (N, 6) [x1, y1, x2, y2, conf, cls] array, or (N, 7) with a track id."""
+        return cls(
+            xyxy=np.ascontiguousarray(data[:, :4], dtype=np.float32),
+            confidence=data[:, -2].astype(np.float32),
+            class_id=data[:, -1].astype(np.int32),
+            names=dict(names or {})
+        )
+
+    @classmethod
+    def concatenate(cls, parts: Iterable["Detections"]) -> "Detections":
+        """Merge several detection sets into one."""
+        parts = list(parts)
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+
+        names: Dict[int, str] = {}
+        for part in parts:
+            names.update(part.names)
+        return cls(
+            xyxy=np.concatenate([part.xyxy for part in parts]),
+            confidence=np.concatenate([part.confidence for part in parts]),
+            class_id=np.concatenate([part.class_id for part in parts]),
+            names=names
+        )
+
+    @classmethod
+    def from_list(cls, items: List[Dict[str, Any]]) -> "Detections":
+        """Rebuild a detection set from API response dicts (e.g. a stored result)."""
+        if not items:
+            return cls.empty()
+
+        class_ids: Dict[str, int] = {}
+        for item in items:
+            class_ids.setdefault(item["class"], len(class_ids))
+        return cls(
+            xyxy=np.array([item["bbox"] for item in items], dtype=np.float32).reshape(-1, 4),
+            confidence=np.array([item["confidence"] for item in items], dtype=np.float32),
+            class_id=np.array([class_ids[item["class"]] for item in items], dtype=np.int32),
+            names={class_id: name for name, class_id in class_ids.items()}
+        )
+
+    def __len__(self) -> int:
+        return len(self.confidence)
+
+    def select(self, index) -> "Detections":
+        """Select rows with a boolean mask or index array."""
+        return Detections(
+            xyxy=self.xyxy[index],
+            confidence=self.confidence[index],
+            class_id=self.class_id[index],
+            names=self.names
+        )
+
+    def scaled(self, factor: float) -> "Detections":
+        """Scale box coordinates, e.g. back to the source resolution."""
+        if factor == 1:
+            return self
+        return Detections(
+            xyxy=self.xyxy * np.float32(factor),
+            confidence=self.confidence,
+            class_id=self.class_id,
+            names=self.names
+        )
+
+    def sorted_by_confidence(self) -> "Detections":
+        """Order detections by confidence (highest first)."""
+        return self.select(np.argsort(-self.confidence, kind="stable"))
+
+    def class_names(self) -> List[str]:
+        """Get the class name of every detection."""
+        names = self.names
+        return [names.get(class_id, f"class_{class_id}") for class_id in self.class_id.tolist()]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Build JSON-ready detection dicts for the API response."""
+        return [
+            {"class": class_name, "confidence": confidence, "bbox": bbox}
+            for class_name, confidence, bbox in zip(
+                self.class_names(), self.confidence.tolist(), self.xyxy.tolist()
+            )
+        ]
+
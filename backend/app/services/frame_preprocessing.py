@@ -0,0 +1,75 @@
+"""Video frame preprocessing: letterboxing same-size frames into a reused model input batch."""
+
+from typing import Callable, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.models.backends import LETTERBOX_COLOR, letterbox_geometry
+from app.services.detections import Detections
+
+_SCALE = np.float32(1 / 255)
+
+
+def output_frame_size(width: int, height: int, max_side: int) -> Tuple[int, int]:
+    """Size that fits the longer side within max_side (0 keeps the source size), rounded to even numbers."""
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    ratio = max_side / max(width, height)
+    return max(2, int(width * ratio) // 2 * 2), max(2, int(height * ratio) // 2 * 2)
+
+
+class LetterboxBatcher:
+    """Letterboxes frames of one size into a preallocated RGB NCHW float32 batch.
+
+    All buffers are allocated once for the (imgsz, frame size) pair. The
+    padding is filled once and each frame only rewrites the resized
+    interior; the BGR to RGB swap, HWC to CHW transpose and scaling to
+    [0, 1] happen in a single write into the batch.
+    """
+
+    def __init__(self, frame_size: Tuple[int, int], imgsz: int, max_batch: int):
+        """Allocate the buffers for frames of frame_size (width, height)."""
+        width, height = frame_size
+        self.frame_size = frame_size
+        self.ratio, self._resized_size, (left, top, right, bottom) = letterbox_geometry(width, height, imgsz)
+        self.pad = (left, top)
+
+        new_width, new_height = self._resized_size
+        self._canvas = np.empty((top + new_height + bottom, left + new_width + right, 3), dtype=np.uint8)
+        self._canvas[:] = LETTERBOX_COLOR
+        self._interior = self._canvas[top:top + new_height, left:left + new_width]
+        self._batch = np.empty((max(1, max_batch), 3, *self._canvas.shape[:2]), dtype=np.float32)
+
+    def fill(self, frames: Sequence[np.ndarray]) -> np.ndarray:
+        """Letterbox frames into the batch; the returned view is overwritten by the next call."""
+        if len(frames) > len(self._batch):
+            raise ValueError(f"Batch of {len(frames)} frames exceeds the buffer of {len(self._batch)}")
+
+        for slot, frame in zip(self._batch, frames):
+            if frame.shape[1::-1] != self.frame_size:
+                raise ValueError(f"Frame size {frame.shape[1::-1]} does not match {self.frame_size}")
+            if self._resized_size != self.frame_size:
+                cv2.resize(frame, self._resized_size, dst=self._interior, interpolation=cv2.INTER_LINEAR)
+            else:
+                self._interior[:] = frame
+            np.multiply(self._canvas[..., ::-1].transpose(2, 0, 1), _SCALE, out=slot, casting="unsafe")
+        return self._batch[:len(frames)]
+
+    def to_frame(self, detections: Detections) -> Detections:
+        """Map boxes from batch coordinates back onto the frame."""
+        if not len(detections):
+            return detections
+        width, height = self.frame_size
+        xyxy = detections.xyxy - np.array(self.pad * 2, dtype=np.float32)
+        xyxy /= np.float32(self.ratio)
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+        return Detections(xyxy=xyxy, confidence=detections.confidence, class_id=detections.class_id,
+                          names=detections.names)
+
+    def wrap(self, infer: Callable[[np.ndarray], List[Detections]]) -> Callable[[List[np.ndarray]], List[Detections]]:
+        """Turn inference on letterboxed batches into inference on frames."""
+        def infer_frames(frames: List[np.ndarray]) -> List[Detections]:
+            return [self.to_frame(detections) for detections in infer(self.fill(frames))]
+        return infer_frames
@@ -0,0 +1,123 @@
+"""Frame sampling policies deciding which video frames run inference."""
+
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+
+SAMPLE_POLICIES = ("stride", "scene_change", "target_fps")
+
+# Size of the grayscale thumbnail compared by the scene-change policy
+_THUMBNAIL_SIZE = (64, 36)
+
+
+class FrameSampler:
+    """Base policy: decides per frame whether to run inference."""
+
+    def __init__(self):
+        self.frames_seen = 0
+        self.frames_inferred = 0
+
+    def should_infer(self, index: int, frame: np.ndarray) -> bool:
+        """Record the decision for a frame and return it."""
+        self.frames_seen += 1
+        decision = self._decide(index, frame)
+        self.frames_inferred += decision
+        return decision
+
+    def _decide(self, index: int, frame: np.ndarray) -> bool:
+        raise NotImplementedError
+
+    @property
+    def inference_ratio(self) -> float:
+        """Fraction of frames that ran inference."""
+        return self.frames_inferred / self.frames_seen if self.frames_seen else 0.0
+
+
+class FixedStrideSampler(FrameSampler):
+    """Infer every Nth frame."""
+
+    def __init__(self, stride: int):
+        super().__init__()
+        self.stride = max(1, stride)
+
+    def _decide(self, index: int, frame: np.ndarray) -> bool:
+        return index % self.stride == 0
+
+
+class SceneChangeSampler(FrameSampler):
+    """Infer when the frame differs enough from the last inferred frame.
+
+    Frames are compared as small grayscale thumbnails, either by mean absolute
+    pixel difference or by histogram distance. A frame is always inferred once
+    max_stride frames have passed, so slow drift is still picked up.
+    """
+
+    def __init__(self, threshold: float, max_stride: int, method: str = "diff"):
+        super().__init__()
+        self.threshold = threshold
+        self.max_stride = max(1, max_stride)
+        self.method = method
+        self._reference: Optional[np.ndarray] = None
+        self._last_index = -self.max_stride
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, _THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def _delta(self, thumbnail: np.ndarray) -> float:
+        if self.method == "histogram":
+            current = cv2.calcHist([thumbnail], [0], None, [32], [0, 256])
+            reference = cv2.calcHist([self._reference], [0], None, [32], [0, 256])
+            # Bhattacharyya distance is 0..1, scale to the 0..255 diff range
+            return cv2.compareHist(current, reference, cv2.HISTCMP_BHATTACHARYYA) * 255.0
+        return float(cv2.absdiff(thumbnail, self._reference).mean())
+
+    def _decide(self, index: int, frame: np.ndarray) -> bool:
+        thumbnail = self._thumbnail(frame)
+        if (
+            self._reference is None
+            or index - self._last_index >= self.max_stride
+            or self._delta(thumbnail) >= self.threshold
+        ):
+            self._reference = thumbnail
+            self._last_index = index
+            return True
+        return False
+
+
+class TargetFPSSampler(FrameSampler):
+    """Infer at a fixed rate regardless of the source frame rate."""
+
+    def __init__(self, source_fps: float, target_fps: float):
+        super().__init__()
+        self.step = max(source_fps, 1.0) / max(target_fps, 1e-3)
+        self._last_slot = -1
+
+    def _decide(self, index: int, frame: np.ndarray) -> bool:
+        slot = int(index / self.step)
+        if slot != self._last_slot:
+            self._last_slot = slot
+            return True
+        return False
+
+
+def create_sampler(sampling_config: Optional[Dict[str, Any]], source_fps: float) -> FrameSampler:
+    """Build the frame sampler for a request, falling back to configured defaults."""
+    config = sampling_config or {}
+    policy = config.get("policy") or settings.video_sample_policy
+
+    if policy == "scene_change":
+        return SceneChangeSampler(
+            threshold=config.get("scene_threshold") or settings.video_scene_change_threshold,
+            max_stride=config.get("stride") or settings.video_max_stride,
+            method=config.get("scene_method") or "diff"
+        )
+    if policy == "target_fps":
+        return TargetFPSSampler(source_fps, config.get("target_fps") or settings.video_target_fps)
+    if policy == "stride":
+        return FixedStrideSampler(config.get("stride") or settings.video_sample_stride)
+
+    raise ValueError(f"Unknown frame sampling policy: {policy}")
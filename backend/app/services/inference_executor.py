@@ -0,0 +1,234 @@
+"""Executor pools that keep inference and blocking I/O off the event loop."""
+
+import asyncio
+import functools
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models.backends import run_detection
+from app.services.detections import Detections
+from app.utils.logger import app_logger as logger
+from app.utils.metrics import EXECUTOR_REJECTED, observe_stage
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the admission queue is full and a request must be rejected."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full, retry later")
+        self.retry_after = retry_after
+
+
+# Models loaded inside a process-pool worker, keyed by model id, least recently used first
+_worker_models: "OrderedDict[str, Any]" = OrderedDict()
+
+
+def _load_worker_model(model_id: str):
+    """Load a model inside a worker process, evicting the least recently used beyond the residency limits."""
+    if model_id in _worker_models:
+        _worker_models.move_to_end(model_id)
+        return _worker_models[model_id]
+
+    from app.models.backends import backend_for, ensure_artifact, load_artifact
+    from app.models.yolo_manager import model_size_bytes
+
+    backend = backend_for(model_id)
+    model = load_artifact(ensure_artifact(model_id, backend), backend)
+    _worker_models[model_id] = model
+
+    # A worker runs one call at a time, so every other model is idle
+    budget = settings.model_memory_budget_mb * 1024 * 1024
+    while len(_worker_models) > 1 and (
+        (settings.max_resident_models and len(_worker_models) > settings.max_resident_models)
+        or (budget and sum(model_size_bytes(resident) for resident in _worker_models.values()) > budget)
+    ):
+        evicted, _ = _worker_models.popitem(last=False)
+        logger.info(f"Worker evicted model {evicted} to load {model_id}")
+    return model
+
+
+def _init_worker(model_ids: List[str]):
+    """Preload and warm up models when a process-pool worker starts."""
+    import numpy as np
+
+    from app.utils.workers import configure_threads
+
+    # Every server worker runs inference_workers of these processes
+    configure_threads(settings.workers * settings.inference_workers)
+
+    for model_id in model_ids:
+        if model_id in settings.available_models:
+            model = _load_worker_model(model_id)
+            if settings.model_warmup_enabled:
+                for imgsz in settings.model_warmup_imgsz:
+                    run_detection(model, [np.zeros((imgsz, imgsz, 3), dtype=np.uint8)], {"imgsz": imgsz})
+
+
+def _worker_infer(model_id: str, images: List[Any], detect_params: Dict[str, Any]) -> Tuple[List[Detections], float, float]:
+    """Run inference inside a worker process; returns detections and wall-clock start/end times."""
+    started = time.time()
+    detections = run_detection(_load_worker_model(model_id), images, detect_params)
+    return detections, started, time.time()
+
+
+def _worker_model_names(model_id: str) -> Dict[int, str]:
+    """Get the class names of a model, loading it inside a worker process if needed."""
+    return dict(_load_worker_model(model_id).names)
+
+
+class InferenceExecutor:
+    """Runs YOLO inference and blocking work on dedicated pools with bounded admission."""
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 2,
+        io_workers: int = 4,
+        max_pending: int = 32,
+        retry_after: int = 2,
+        preload_models: Optional[List[str]] = None
+    ):
+        """Initialize the executor pools."""
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected_total = 0
+        self.inference_pending = 0  # inference calls submitted to the pool and not finished
+        self._pending_guard = threading.Lock()
+        # Weak keys, so the lock of an unloaded model goes away with the model
+        self._model_locks: "weakref.WeakKeyDictionary[Any, threading.Lock]" = weakref.WeakKeyDictionary()
+        self._model_locks_guard = threading.Lock()
+        self._model_names: Dict[str, Dict[int, str]] = {}  # class names of models held by process workers
+
+        if kind == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(list(preload_models or []),)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="blocking-io")
+
+        logger.info(f"Inference executor: {kind} pool, {max_workers} workers, {max_pending} max pending")
+
+    @property
+    def uses_processes(self) -> bool:
+        """Whether inference runs in worker processes with their own models."""
+        return self.kind == "process"
+
+    @property
+    def queue_depth(self) -> int:
+        """Inference calls submitted to the pool and waiting for a free worker."""
+        return max(0, self.inference_pending - self.max_workers)
+
+    @asynccontextmanager
+    async def admission(self):
+        """Admit a request into the bounded queue or reject it when saturated."""
+        if self.in_flight >= self.max_pending:
+            self.rejected_total += 1
+            EXECUTOR_REJECTED.inc()
+            raise ExecutorSaturatedError(self.retry_after)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def model_lock(self, model) -> threading.Lock:
+        """Get the lock serializing calls into one in-process model."""
+        with self._model_locks_guard:
+            return self._model_locks.setdefault(model, threading.Lock())
+
+    def infer_sync(self, model, images, detect_params: Dict[str, Any]) -> List[Detections]:
+        """Run inference on an in-process model from a worker thread."""
+        with self.model_lock(model):
+            return run_detection(model, images, detect_params)
+
+    def _timed_infer_sync(self, model, images, detect_params: Dict[str, Any]) -> Tuple[List[Detections], float, float]:
+        """Run infer_sync and return its detections with wall-clock start/end times."""
+        started = time.time()
+        detections = self.infer_sync(model, images, detect_params)
+        return detections, started, time.time()
+
+    def _submit(self, model_id: str, model, images: List[Any], detect_params: Dict[str, Any]) -> Future:
+        """Queue an inference call on the pool, counting it as pending until it finishes."""
+        with self._pending_guard:
+            self.inference_pending += 1
+        if self.uses_processes:
+            future = self._pool.submit(_worker_infer, model_id, images, detect_params)
+        else:
+            future = self._pool.submit(self._timed_infer_sync, model, images, detect_params)
+        future.add_done_callback(self._finish_pending)
+        return future
+
+    def _finish_pending(self, _: Future):
+        with self._pending_guard:
+            self.inference_pending -= 1
+
+    async def infer(self, model_id: str, model, images: List[Any], detect_params: Dict[str, Any],
+                    endpoint: str = "image") -> List[Detections]:
+        """Run inference on the pool without blocking the event loop.
+
+        Time spent waiting for a pool worker and running the model are
+        recorded as the queue_wait and inference stages of the endpoint.
+        """
+        submitted = time.time()
+        detections, started, finished = await asyncio.wrap_future(
+            self._submit(model_id, model, images, detect_params)
+        )
+
+        observe_stage("queue_wait", model_id, endpoint, max(started - submitted, 0.0))
+        observe_stage("inference", model_id, endpoint, finished - started)
+        return detections
+
+    def infer_blocking(self, model_id: str, model, images: List[Any], detect_params: Dict[str, Any],
+                       endpoint: str = "video") -> List[Detections]:
+        """Run inference on the pool from a blocking thread (video pipelines), waiting for the result.
+
+        Only the queue_wait stage is recorded; the pipeline reports its
+        own inference stage.
+        """
+        submitted = time.time()
+        detections, started, _ = self._submit(model_id, model, images, detect_params).result()
+        observe_stage("queue_wait", model_id, endpoint, max(started - submitted, 0.0))
+        return detections
+
+    async def model_names(self, model_id: str) -> Dict[int, str]:
+        """Get the class names of a model held by the process workers, asking a worker once per model."""
+        if model_id not in self._model_names:
+            self._model_names[model_id] = await asyncio.wrap_future(self._pool.submit(_worker_model_names, model_id))
+        return self._model_names[model_id]
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run blocking decode/encode/file work on the I/O thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, functools.partial(fn, *args, **kwargs))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor saturation metrics."""
+        return {
+            "kind": self.kind,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_pending": self.max_pending,
+            "rejected_total": self.rejected_total
+        }
+
+    def shutdown(self):
+        """Shut down the executor pools."""
+        logger.info("Shutting down inference executor")
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
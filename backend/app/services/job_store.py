@@ -0,0 +1,164 @@
+"""SQLite-backed persistence for background video jobs."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_COLUMNS = (
+    "id", "status", "model_id", "config", "input_path", "original_filename",
+    "result_filename", "detections_path", "total_frames", "frames_done", "fps",
+    "pipeline_stats", "error", "created_at", "started_at", "finished_at", "updated_at",
+    "sampling", "inference_ratio", "cancel_requested"
+)
+
+_JSON_COLUMNS = ("config", "pipeline_stats", "sampling")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    config TEXT,
+    input_path TEXT,
+    original_filename TEXT,
+    result_filename TEXT,
+    detections_path TEXT,
+    total_frames INTEGER DEFAULT 0,
+    frames_done INTEGER DEFAULT 0,
+    fps REAL DEFAULT 0,
+    pipeline_stats TEXT,
+    error TEXT,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL,
+    sampling TEXT,
+    inference_ratio REAL,
+    cancel_requested INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+"""
+
+
+class JobStore:
+    """Stores job state in a local SQLite database so it survives restarts."""
+
+    def __init__(self, db_path: str):
+        """Set up the store; the database is opened (and created if needed) on first use."""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The database connection; callers hold the store lock."""
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def create(self, job_id: str, **fields) -> Dict[str, Any]:
+        """Insert a new job in the queued state."""
+        now = time.time()
+        record = {"id": job_id, "status": QUEUED, "created_at": now, "updated_at": now, **fields}
+        names = [name for name in _COLUMNS if name in record]
+        values = [self._encode(name, record[name]) for name in names]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+                values
+            )
+        return self.get(job_id)
+
+    def update(self, job_id: str, **fields):
+        """Update fields of an existing job."""
+        fields["updated_at"] = time.time()
+        names = [name for name in fields if name in _COLUMNS]
+        values = [self._encode(name, fields[name]) for name in names]
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?",
+                values + [job_id]
+            )
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Flag a queued or running job for cancellation by whichever worker runs it."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET cancel_requested = 1, updated_at = ? "
+                f"WHERE id = ? AND status IN ({', '.join('?' for _ in ACTIVE_STATES)})",
+                [time.time(), job_id, *ACTIVE_STATES]
+            )
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        """Whether cancellation of a job has been requested."""
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def list(self, limit: int = 50, statuses: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """List the most recent jobs, optionally filtered by status."""
+        query = "SELECT * FROM jobs"
+        params: List[Any] = []
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def find_by_result(self, result_filename: str) -> Optional[Dict[str, Any]]:
+        """Get the job that produces a given result file."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE result_filename = ? ORDER BY created_at DESC LIMIT 1",
+                (result_filename,)
+            ).fetchone()
+        return self._decode(row) if row else None
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def _encode(name: str, value: Any) -> Any:
+        if name in _JSON_COLUMNS and value is not None:
+            return json.dumps(value)
+        return value
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for name in _JSON_COLUMNS:
+            if record.get(name):
+                record[name] = json.loads(record[name])
+        return record
@@ -0,0 +1,313 @@
+"""Live detection on a stream of encoded frames sent over a WebSocket.
+
+Frames are binary messages (JPEG, PNG, ...). Only the most recent frame
+waits for inference: a frame that arrives while an older one is still
+waiting replaces it, so a client sending faster than the model keeps
+getting results for its newest frames instead of a growing backlog.
+
+Text messages carry JSON control commands:
+    {"type": "config", "model": "yolov8s", "confidence": 0.4, "format": "binary", ...}
+
+Results are sent per processed frame, either as compact JSON
+    {"type": "detections", "frame": 7, "dropped": 2, "latency_ms": 41.3,
+     "size": [1280, 720], "detections": [[x1, y1, x2, y2, conf, class_id], ...]}
+or as a binary message: BINARY_HEADER followed by one little-endian
+float32 row [x1, y1, x2, y2, conf, class_id] per detection. Errors and
+control replies are always JSON text.
+"""
+
+import asyncio
+import json
+import struct
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, WebSocket
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import settings
+from app.models.backends import DEFAULT_IMGSZ
+from app.models.yolo_manager import ModelLoadTimeoutError
+from app.services.detections import Detections
+from app.services.inference_executor import ExecutorSaturatedError
+from app.utils.logger import app_logger as logger
+from app.utils.metrics import observe_stage
+
+LIVE_FORMATS = ("json", "binary")
+
+# Binary result header: frame number, frames dropped so far, detection count,
+# source width and height, and latency from receipt to result in milliseconds
+BINARY_HEADER = struct.Struct("<IIIHHf")
+
+# Metrics endpoint label for live streams
+_ENDPOINT = "ws"
+
+
+class LiveConfigError(ValueError):
+    """Raised for an invalid live detection setting."""
+
+
+@dataclass
+class LiveConfig:
+    """Per-connection detection settings."""
+
+    model_id: str
+    detect_params: Dict[str, Any] = field(default_factory=dict)
+    output_format: str = "json"
+    latency_budget_ms: float = 0.0
+
+    def updated(self, changes: Dict[str, Any]) -> "LiveConfig":
+        """Apply the fields of a config message, validating them."""
+        config = replace(self, detect_params=dict(self.detect_params))
+        if changes.get("model") is not None:
+            config.model_id = changes["model"]
+        for field_name, param in (("confidence", "conf"), ("iou", "iou"), ("max_det", "max_det"), ("imgsz", "imgsz")):
+            if changes.get(field_name) is not None:
+                config.detect_params[param] = changes[field_name]
+        if changes.get("format") is not None:
+            config.output_format = changes["format"]
+        if changes.get("latency_budget_ms") is not None:
+            config.latency_budget_ms = float(changes["latency_budget_ms"])
+        config.validate()
+        return config
+
+    def validate(self):
+        """Check the settings against the allowed models, formats and ranges."""
+        if self.model_id not in settings.available_models:
+            raise LiveConfigError(f"Invalid model: {self.model_id}")
+        if self.output_format not in LIVE_FORMATS:
+            raise LiveConfigError(f"Invalid format: {self.output_format}. Allowed: {', '.join(LIVE_FORMATS)}")
+        if self.latency_budget_ms < 0:
+            raise LiveConfigError("latency_budget_ms must not be negative")
+        for param in ("conf", "iou"):
+            if not 0.0 <= float(self.detect_params.get(param, 0.0)) <= 1.0:
+                raise LiveConfigError(f"{param} must be between 0.0 and 1.0")
+        for param in ("max_det", "imgsz"):
+            if param in self.detect_params and int(self.detect_params[param]) < 1:
+                raise LiveConfigError(f"{param} must be positive")
+
+    def describe(self) -> Dict[str, Any]:
+        """Get the settings as sent back to the client."""
+        return {
+            "model": self.model_id,
+            "params": self.detect_params,
+            "format": self.output_format,
+            "latency_budget_ms": self.latency_budget_ms
+        }
+
+
+def pack_detections(frame: int, dropped: int, width: int, height: int,
+                    latency_ms: float, detections: Detections) -> bytes:
+    """Encode a result as BINARY_HEADER plus float32 detection rows."""
+    rows = np.empty((len(detections), 6), dtype="<f4")
+    rows[:, :4] = detections.xyxy
+    rows[:, 4] = detections.confidence
+    rows[:, 5] = detections.class_id
+    header = BINARY_HEADER.pack(frame, dropped, len(detections), width, height, latency_ms)
+    return header + rows.tobytes()
+
+
+def compact_detections(detections: Detections) -> list:
+    """Encode detections as short [x1, y1, x2, y2, conf, class_id] rows."""
+    # Round in float64: rounded float32 values still print with float32's error, e.g. 0.8999999761581421
+    boxes = np.round(detections.xyxy.astype(np.float64), 1).tolist()
+    confidences = np.round(detections.confidence.astype(np.float64), 3).tolist()
+    return [
+        [*box, confidence, class_id]
+        for box, confidence, class_id in zip(boxes, confidences, detections.class_id.tolist())
+    ]
+
+
+class LiveDetectionSession:
+    """One WebSocket connection: receives frames and sends detections, latest frame first."""
+
+    def __init__(self, websocket: WebSocket, detection_service, config: LiveConfig):
+        """Create a session for an accepted WebSocket."""
+        self.websocket = websocket
+        self.service = detection_service
+        self.config = config
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.dropped = 0
+        self._latest: Optional[Tuple[int, bytes, float]] = None  # frame number, data, receive time
+        self._frame_ready = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+
+    async def run(self):
+        """Serve the connection until the client disconnects or goes idle."""
+        if not await self._announce(self.config, "ready"):
+            return
+
+        processor = asyncio.create_task(self._process())
+        try:
+            await self._receive()
+        finally:
+            processor.cancel()
+            try:
+                await processor
+            except (asyncio.CancelledError, WebSocketDisconnect):
+                pass
+        logger.info(
+            f"Live stream closed: {self.frames_received} frames received, "
+            f"{self.frames_processed} processed, {self.dropped} dropped"
+        )
+
+    async def _announce(self, config: LiveConfig, message_type: str) -> bool:
+        """Load the model and send the settings with the class names; False if it could not load."""
+        try:
+            async with self.service.lease_model(config.model_id) as model:
+                # Process workers hold their own models, so none is leased here
+                if model is None:
+                    names = await self.service.executor.model_names(config.model_id)
+                else:
+                    names = getattr(model, "names", None)
+        except ModelLoadTimeoutError as e:
+            await self._send_json({"type": "error", "error": str(e)})
+            return False
+        except Exception as e:
+            logger.error(f"Could not load model {config.model_id} for a live stream: {e}")
+            await self._send_json({"type": "error", "error": f"Model could not be loaded: {str(e)}"})
+            return False
+        await self._send_json({"type": message_type, **config.describe(), "names": names})
+        return True
+
+    async def _receive(self):
+        """Read messages, keeping only the newest frame waiting for inference."""
+        timeout = settings.ws_idle_timeout or None
+        while True:
+            try:
+                message = await asyncio.wait_for(self.websocket.receive(), timeout)
+            except asyncio.TimeoutError:
+                logger.info("Closing idle live stream")
+                await self.websocket.close(code=1000, reason="Idle timeout")
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes") is not None:
+                await self._accept_frame(message["bytes"])
+            elif message.get("text") is not None:
+                await self._handle_command(message["text"])
+
+    async def _accept_frame(self, data: bytes):
+        """Put a frame in the waiting slot, dropping the one it replaces."""
+        frame = self.frames_received
+        self.frames_received += 1
+        if len(data) > settings.ws_max_frame_size:
+            await self._send_json({
+                "type": "error", "frame": frame,
+                "error": f"Frame too large. Maximum size: {settings.ws_max_frame_size / (1024*1024):.1f}MB"
+            })
+            return
+
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = (frame, data, time.perf_counter())
+        self._frame_ready.set()
+
+    async def _handle_command(self, text: str):
+        """Apply a JSON control message."""
+        try:
+            command = json.loads(text)
+            if not isinstance(command, dict) or command.get("type") != "config":
+                raise LiveConfigError("Expected a JSON object with type 'config'")
+            config = self.config.updated(command)
+        except (ValueError, TypeError) as e:
+            await self._send_json({"type": "error", "error": str(e)})
+            return
+
+        if await self._announce(config, "config"):
+            self.config = config
+            logger.info(f"Live stream reconfigured: {config.describe()}")
+
+    async def _process(self):
+        """Run detection on the newest frame whenever one is waiting."""
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            if self._latest is None:
+                continue
+            frame, data, received = self._latest
+            self._latest = None
+            config = self.config
+
+            try:
+                result = await self._detect(data, received, config)
+            except ExecutorSaturatedError:
+                result = None
+            except HTTPException as e:
+                await self._send_json({"type": "error", "frame": frame, "error": e.detail})
+                continue
+            except ModelLoadTimeoutError as e:
+                await self._send_json({"type": "error", "frame": frame, "error": str(e)})
+                continue
+            except Exception as e:
+                logger.error(f"Live detection failed on frame {frame}: {e}")
+                await self._send_json({"type": "error", "frame": frame, "error": f"Detection failed: {str(e)}"})
+                continue
+
+            if result is None:
+                self.dropped += 1
+                continue
+            self.frames_processed += 1
+            detections, width, height = result
+            latency = time.perf_counter() - received
+            observe_stage("total", config.model_id, _ENDPOINT, latency)
+            await self._send_result(config, frame, width, height, latency * 1000, detections)
+
+    def _over_budget(self, received: float, config: LiveConfig) -> bool:
+        """Check whether a frame has already waited longer than the latency budget."""
+        return config.latency_budget_ms > 0 and (time.perf_counter() - received) * 1000 > config.latency_budget_ms
+
+    async def _detect(self, data: bytes, received: float,
+                      config: LiveConfig) -> Optional[Tuple[Detections, int, int]]:
+        """Decode and detect one frame; None if it ran out of latency budget first."""
+        if self._over_budget(received, config):
+            return None
+
+        service = self.service
+        model_id = config.model_id
+        detect_params = {"conf": settings.detection_confidence_threshold, **config.detect_params}
+        async with service.executor.admission():
+            image_np, width, height, scale = await service.executor.run(
+                service._decode_upload, memoryview(data), detect_params.get("imgsz", DEFAULT_IMGSZ),
+                model_id, (None, None), True, _ENDPOINT
+            )
+            # Decoding can take a while on a busy server; skip inference if the result would be stale anyway
+            if self._over_budget(received, config):
+                return None
+
+            async with service.lease_model(model_id) as model:
+                if settings.inference_batching_enabled:
+                    detections = await service.batcher.submit(model_id, model, image_np, detect_params)
+                else:
+                    detections = (await service.executor.infer(
+                        model_id, model, [image_np], detect_params, endpoint=_ENDPOINT
+                    ))[0]
+
+        return detections.scaled(scale), width, height
+
+    async def _send_result(self, config: LiveConfig, frame: int, width: int, height: int,
+                           latency_ms: float, detections: Detections):
+        """Send one frame's detections in the connection's format."""
+        if config.output_format == "binary":
+            payload = pack_detections(frame, self.dropped, width, height, latency_ms, detections)
+            async with self._send_lock:
+                await self.websocket.send_bytes(payload)
+            return
+
+        await self._send_json({
+            "type": "detections",
+            "frame": frame,
+            "dropped": self.dropped,
+            "latency_ms": round(latency_ms, 1),
+            "size": [width, height],
+            "detections": compact_detections(detections)
+        })
+
+    async def _send_json(self, message: Dict[str, Any]):
+        """Send a JSON text message; the receiver and processor tasks both send."""
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message, separators=(",", ":")))
@@ -0,0 +1,172 @@
+"""Regions of interest: infer only on the ROI's bounding window and keep detections inside the ROI.
+
+A region is a list of rectangles [x1, y1, x2, y2] and polygons
+[[x, y], [x, y], ...] in source image pixels. A detection belongs to the
+region when its box center lies inside any of its shapes.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.detections import Detections
+from app.services.tiling import shift_detections
+
+# Limits on a request's region, to keep parsing and containment tests cheap
+MAX_ROI_SHAPES = 32
+MAX_POLYGON_VERTICES = 256
+
+# Crop windows are never smaller than one network stride
+_MIN_CROP_SIZE = 32
+
+
+def parse_roi(value: str) -> List[List[Any]]:
+    """Parse and validate a JSON list of rectangles and polygons; raises ValueError."""
+    try:
+        shapes = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"roi is not valid JSON: {e}")
+    if not isinstance(shapes, list) or not shapes:
+        raise ValueError("roi must be a non-empty list of rectangles and polygons")
+    if len(shapes) > MAX_ROI_SHAPES:
+        raise ValueError(f"roi has too many shapes. Maximum: {MAX_ROI_SHAPES}")
+
+    parsed = []
+    for shape in shapes:
+        if _is_number_list(shape, 4):
+            x1, y1, x2, y2 = (float(v) for v in shape)
+            if x2 <= x1 or y2 <= y1:
+                raise ValueError("roi rectangles must be [x1, y1, x2, y2] with x2 > x1 and y2 > y1")
+            parsed.append([x1, y1, x2, y2])
+        elif isinstance(shape, list) and 3 <= len(shape) <= MAX_POLYGON_VERTICES and all(
+            _is_number_list(point, 2) for point in shape
+        ):
+            parsed.append([[float(x), float(y)] for x, y in shape])
+        else:
+            raise ValueError(
+                f"Each roi shape must be a rectangle [x1, y1, x2, y2] or a polygon of 3 to "
+                f"{MAX_POLYGON_VERTICES} [x, y] points"
+            )
+    return parsed
+
+
+def _is_number_list(value: Any, length: int) -> bool:
+    return isinstance(value, list) and len(value) == length and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in value
+    )
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Even-odd rule test of (M, 2) points against a (K, 2) polygon, all edges at once."""
+    x, y = points[:, :1], points[:, 1:]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    spans = (y1 > y) != (y2 > y)  # (M, K): edge crosses the point's horizontal line
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(spans & (x < crossing_x), axis=1) % 2 == 1
+
+
+class RegionOfInterest:
+    """Rectangles and polygons, tested together against all detections at once."""
+
+    def __init__(self, rects: np.ndarray, polygons: List[np.ndarray]):
+        """Create a region from (N, 4) rectangles and (K, 2) polygons."""
+        self.rects = rects
+        self.polygons = polygons
+
+    @classmethod
+    def from_config(cls, shapes: Optional[List[List[Any]]]) -> Optional["RegionOfInterest"]:
+        """Build a region from parsed roi shapes; None without shapes."""
+        if not shapes:
+            return None
+        rects = [shape for shape in shapes if not isinstance(shape[0], list)]
+        polygons = [np.array(shape, dtype=np.float32) for shape in shapes if isinstance(shape[0], list)]
+        return cls(np.array(rects, dtype=np.float32).reshape(-1, 4), polygons)
+
+    def scaled(self, factor: float) -> "RegionOfInterest":
+        """Scale the shapes, e.g. onto a downscaled decode of the image."""
+        if factor == 1:
+            return self
+        factor = np.float32(factor)
+        return RegionOfInterest(self.rects * factor, [polygon * factor for polygon in self.polygons])
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Bounding box (x1, y1, x2, y2) of all shapes."""
+        corners = [self.rects[:, :2], self.rects[:, 2:]] + self.polygons
+        points = np.concatenate(corners)
+        return (*points.min(axis=0).tolist(), *points.max(axis=0).tolist())
+
+    def crop_window(self, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """Integer window covering the region inside a width x height image; None if that is the whole image."""
+        x1, y1, x2, y2 = self.bounds()
+        x1, y1 = max(0, int(np.floor(x1))), max(0, int(np.floor(y1)))
+        x2, y2 = min(width, int(np.ceil(x2))), min(height, int(np.ceil(y2)))
+        # Grow degenerate or off-image windows to a minimal size; containment still filters them
+        x1, x2 = _fit_span(x1, x2, width)
+        y1, y2 = _fit_span(y1, y2, height)
+        if (x1, y1, x2, y2) == (0, 0, width, height):
+            return None
+        return x1, y1, x2, y2
+
+    def crop_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Size of the window inference runs on for a width x height image."""
+        x1, y1, x2, y2 = self.crop_window(width, height) or (0, 0, width, height)
+        return x2 - x1, y2 - y1
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Which (M, 2) points lie inside any shape."""
+        x, y = points[:, :1], points[:, 1:]
+        rects = self.rects
+        inside = ((x >= rects[:, 0]) & (x <= rects[:, 2]) & (y >= rects[:, 1]) & (y <= rects[:, 3])).any(axis=1)
+        for polygon in self.polygons:
+            inside |= points_in_polygon(points, polygon)
+        return inside
+
+    def keep_inside(self, detections: Detections) -> Detections:
+        """Drop detections whose box center is outside the region."""
+        if not len(detections):
+            return detections
+        centers = (detections.xyxy[:, :2] + detections.xyxy[:, 2:]) / 2
+        return detections.select(self.contains(centers))
+
+    def crop(self, image: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """View of the image inside the region's window, with the window's top-left corner."""
+        window = self.crop_window(image.shape[1], image.shape[0])
+        if window is None:
+            return image, (0, 0)
+        x1, y1, x2, y2 = window
+        return image[y1:y2, x1:x2], (x1, y1)
+
+    def restore(self, detections: Detections, origin: Tuple[int, int]) -> Detections:
+        """Move detections from the cropped window back onto the image and keep those inside the region."""
+        return self.keep_inside(shift_detections(detections, *origin))
+
+    def wrap(self, infer: Callable[[List[np.ndarray]], List[Detections]],
+             frame_size: Tuple[int, int]) -> Callable[[List[np.ndarray]], List[Detections]]:
+        """Turn inference on cropped frames of frame_size into inference on whole frames."""
+        window = self.crop_window(*frame_size) or (0, 0, *frame_size)
+        x1, y1, x2, y2 = window
+
+        def infer_frames(frames: List[np.ndarray]) -> List[Detections]:
+            detections = infer([frame[y1:y2, x1:x2] for frame in frames])
+            return [self.restore(result, (x1, y1)) for result in detections]
+        return infer_frames
+
+
+def _fit_span(start: int, end: int, limit: int) -> Tuple[int, int]:
+    """Widen [start, end) to at least _MIN_CROP_SIZE (or the whole axis) and keep it inside [0, limit]."""
+    size = min(limit, _MIN_CROP_SIZE)
+    if end - start >= size:
+        return start, end
+    start = min(max(0, start), limit - size)
+    return start, start + size
+
+
+def split_region(detect_params: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[RegionOfInterest]]:
+    """Separate the roi from the parameters passed to the model."""
+    if "roi" not in detect_params:
+        return detect_params, None
+    params = {key: value for key, value in detect_params.items() if key != "roi"}
+    return params, RegionOfInterest.from_config(detect_params["roi"])
@@ -0,0 +1,149 @@
+"""Annotated result images: drawing, output formats and lazy rendering on first request."""
+
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from typing import Any, BinaryIO, Dict, List
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.detections import Detections
+from app.utils.ingest import decode_image
+from app.utils.logger import app_logger as logger
+
+RENDER_FORMATS = ("none", "jpeg", "webp", "png")
+RENDER_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+
+_BOX_COLOR = (0, 255, 0)  # Green for all detections
+_RESULT_NAME = re.compile(r"^result_[0-9a-f]{32}\.(jpg|webp|png)$")
+
+
+def render_options(render_config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Fill in configured defaults for the render options a request left out."""
+    options = {
+        "format": settings.render_format,
+        "quality": settings.render_quality,
+        "lazy": settings.render_lazy
+    }
+    options.update(render_config or {})
+    if options["format"] not in RENDER_FORMATS:
+        raise ValueError(f"Unknown render format: {options['format']}")
+    return options
+
+
+def new_result_filename(render_format: str) -> str:
+    """Generate a unique result image name for a format."""
+    return f"result_{uuid.uuid4().hex}{RENDER_EXTENSIONS[render_format]}"
+
+
+def encode_params(render_format: str, quality: int) -> List[int]:
+    """cv2.imencode parameters for a format (quality applies to jpeg and webp)."""
+    if render_format == "jpeg":
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if render_format == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    if render_format == "png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, settings.render_png_compression]
+    return []
+
+
+def draw_detections(image: np.ndarray, detections: Detections) -> np.ndarray:
+    """Draw bounding boxes and labels on the image in place."""
+    if not len(detections):
+        return image
+
+    boxes = np.rint(detections.xyxy).astype(np.int32)
+    labels = [
+        f"{class_name} {confidence:.2f}"
+        for class_name, confidence in zip(detections.class_names(), detections.confidence.tolist())
+    ]
+
+    # All boxes in one call, as closed (x1,y1)-(x2,y1)-(x2,y2)-(x1,y2) outlines
+    outlines = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+    cv2.polylines(image, list(outlines), True, _BOX_COLOR, 2)
+
+    for (x1, y1), label in zip(boxes[:, :2].tolist(), labels):
+        cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, _BOX_COLOR, 2)
+
+    return image
+
+
+class LazyRenderStore:
+    """Uploads and detections of results whose annotated image is rendered on first GET.
+
+    Each pending result keeps a copy of the original upload and its
+    detections (in source-image coordinates) under the store directory.
+    The first request for the image renders it into the result store, which
+    then serves it like any other result, and drops the pending files.
+    """
+
+    def __init__(self, directory: str, result_store):
+        """Initialize the store; its directory is created with the first pending image."""
+        self.directory = directory
+        self.result_store = result_store
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _paths(self, filename: str):
+        base = os.path.join(self.directory, filename)
+        return base + ".src", base + ".json"
+
+    def save(self, filename: str, source: BinaryIO, detections: List[Dict[str, Any]], render_format: str, quality: int):
+        """Keep an upload and its detections until the result image is requested."""
+        source_path, meta_path = self._paths(filename)
+        os.makedirs(self.directory, exist_ok=True)
+        source.seek(0)
+        with open(source_path, "wb") as f:
+            shutil.copyfileobj(source, f)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"detections": detections, "format": render_format, "quality": quality}, f)
+
+    def is_pending(self, filename: str) -> bool:
+        """Whether a result image (given by name or static path) is waiting to be rendered."""
+        filename = os.path.basename(filename)
+        return bool(_RESULT_NAME.match(filename)) and os.path.exists(self._paths(filename)[1])
+
+    def render(self, filename: str) -> bool:
+        """Render a pending result into the result store; False if nothing is pending."""
+        filename = os.path.basename(filename)
+        with self._locks_guard:
+            lock = self._locks.setdefault(filename, threading.Lock())
+
+        with lock:
+            try:
+                if self.result_store.exists(filename):
+                    return True
+                if not self.is_pending(filename):
+                    return False
+
+                source_path, meta_path = self._paths(filename)
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                with open(source_path, "rb") as f:
+                    image = decode_image(memoryview(f.read()))
+
+                draw_detections(image, Detections.from_list(meta["detections"]))
+                ok, encoded = cv2.imencode(
+                    RENDER_EXTENSIONS[meta["format"]], image, encode_params(meta["format"], meta["quality"])
+                )
+                if not ok:
+                    raise ValueError(f"Could not encode result image: {filename}")
+
+                partial_path = self.result_store.partial_path(filename)
+                with open(partial_path, "wb") as f:
+                    f.write(encoded)
+                os.replace(partial_path, self.result_store.prepare(filename))
+                self.result_store.add(filename)
+
+                os.remove(source_path)
+                os.remove(meta_path)
+                logger.info(f"Rendered lazy result image: {filename}")
+                return True
+            finally:
+                with self._locks_guard:
+                    self._locks.pop(filename, None)
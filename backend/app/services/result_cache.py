@@ -0,0 +1,219 @@
+"""Content-addressed cache of image detection results."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Defaults ultralytics applies when a parameter is not given, so omitted and
+# explicit default values share a cache entry
+_DEFAULT_PARAMS = {"conf": 0.25, "iou": 0.7, "max_det": 300, "imgsz": 640}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at);
+"""
+
+
+def normalize_params(detect_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce detection parameters to the ones that affect results, with defaults filled in."""
+    params = {**_DEFAULT_PARAMS, **{k: v for k, v in detect_params.items() if v is not None}}
+    return {
+        "conf": round(float(params["conf"]), 6),
+        "iou": round(float(params["iou"]), 6),
+        "max_det": int(params["max_det"]),
+        "imgsz": int(params["imgsz"]),
+        "classes": sorted(params["classes"]) if params.get("classes") else None,
+        "roi": params.get("roi")
+    }
+
+
+def make_cache_key(image: np.ndarray, model_id: str, detect_params: Dict[str, Any],
+                   extra: Optional[Dict[str, Any]] = None) -> str:
+    """Hash the decoded pixels together with the model, normalized config and any extra options."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps(
+        [model_id, normalize_params(detect_params), image.shape, str(image.dtype), extra or {}],
+        sort_keys=True
+    ).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+class _DiskTier:
+    """SQLite table of serialized results, evicting the least recently used rows."""
+
+    def __init__(self, db_path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self.bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, value: str) -> int:
+        """Store a value and return how many rows were evicted to fit it."""
+        size = len(value)
+        self.delete(key)
+        self._conn.execute(
+            "INSERT INTO results (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, size, time.time())
+        )
+        self.bytes += size
+
+        evicted = 0
+        while self.bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM results WHERE key != ? ORDER BY accessed_at LIMIT 1", (key,)
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (row[0],))
+            self.bytes -= row[1]
+            evicted += 1
+        return evicted
+
+    def delete(self, key: str):
+        row = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.bytes -= row[0]
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class ResultCache:
+    """Two-tier cache: an in-memory LRU bounded by bytes, backed by an optional SQLite file.
+
+    Values are JSON-serializable dicts. Their size is measured as the length
+    of their JSON encoding, which is also what the disk tier stores. Entries
+    found only on disk are promoted to memory.
+    """
+
+    def __init__(self, max_bytes: int, disk_path: Optional[str] = None, disk_max_bytes: int = 0):
+        """Initialize the cache; without a disk_path it is memory-only."""
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._disk = _DiskTier(disk_path, disk_max_bytes) if disk_path else None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def get(self, key: str, is_valid: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[Dict[str, Any]]:
+        """Look up a result, counting a hit or miss.
+
+        Entries rejected by is_valid (e.g. because their result image was
+        deleted) are dropped and counted as misses.
+        """
+        with self._lock:
+            encoded = None
+            entry = self._entries.get(key)
+            if entry is not None:
+                value = entry[0]
+            elif self._disk is not None:
+                encoded = self._disk.get(key)
+                value = json.loads(encoded) if encoded is not None else None
+            else:
+                value = None
+
+            if value is not None and is_valid is not None and not is_valid(value):
+                self._remove(key)
+                value = None
+
+            if value is None:
+                self.misses += 1
+                return None
+
+            if encoded is not None:
+                self._store_memory(key, value, len(encoded))
+                self.disk_hits += 1
+            else:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a result in both tiers."""
+        encoded = json.dumps(value)
+        with self._lock:
+            self._store_memory(key, value, len(encoded))
+            if self._disk is not None:
+                self.disk_evictions += self._disk.put(key, encoded)
+
+    def _remove(self, key: str):
+        """Drop an entry from both tiers."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        if self._disk is not None:
+            self._disk.delete(key)
+
+    def _store_memory(self, key: str, value: Dict[str, Any], size: int):
+        """Insert into the memory tier, evicting least recently used entries over budget."""
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters and tier sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "memory_max_bytes": self.max_bytes
+            }
+            if self._disk is not None:
+                stats.update({
+                    "disk_hits": self.disk_hits,
+                    "disk_evictions": self.disk_evictions,
+                    "disk_entries": self._disk.count(),
+                    "disk_bytes": self._disk.bytes,
+                    "disk_max_bytes": self._disk.max_bytes
+                })
+            return stats
+
+    def close(self):
+        """Close the disk tier."""
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
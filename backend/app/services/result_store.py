@@ -0,0 +1,286 @@
+"""Lifecycle of result files: sharded layout, per-kind TTLs, a disk quota and scratch cleanup."""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.utils.logger import app_logger as logger
+from app.utils.metrics import RESULT_STORE_EVICTIONS, RESULT_STORE_SWEEP_SECONDS
+
+ARTIFACT_KINDS = ("image", "video")
+_KIND_BY_EXTENSION = {".jpg": "image", ".webp": "image", ".png": "image", ".mp4": "video"}
+
+# Files being written; left behind only by a crash or a failed request
+_PARTIAL_PREFIX = "partial_"
+
+
+@dataclass(slots=True)
+class StoredArtifact:
+    """A result file tracked by the store."""
+
+    path: str
+    kind: str
+    size: int
+    created_at: float
+    accessed_at: float
+
+
+class ResultStore:
+    """Result files under a sharded directory, expired by TTL and evicted LRU over a byte quota.
+
+    Files live in nested two-hex-character directories derived from a hash
+    of their name, so no directory grows past a few thousand entries. An
+    in-memory index (rebuilt by scan() at startup) answers existence and
+    size checks without touching the file system. Scratch directories hold
+    temporary files that are deleted once older than their maximum age.
+
+    A shared store has other processes (server workers) writing to the same
+    root: lookups fall back to the file system for files this process has
+    not indexed, and each sweep re-indexes the root first.
+    """
+
+    def __init__(self, root: str, shard_levels: int, ttls: Dict[str, int], max_bytes: int,
+                 scratch_dirs: Dict[str, int] = None, partial_max_age: int = 3600, shared: bool = False):
+        """Initialize the store; a TTL or max_bytes of 0 disables that limit."""
+        self.root = root
+        self.shared = shared
+        self.shard_levels = shard_levels
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self.scratch_dirs = scratch_dirs or {}
+        self.partial_max_age = partial_max_age
+
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, StoredArtifact]" = OrderedDict()  # least recently used first
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.last_sweep_seconds: Optional[float] = None
+        self.last_sweep_at: Optional[float] = None
+
+    def _shard(self, filename: str) -> str:
+        """Relative shard directory of a file name."""
+        digest = hashlib.blake2b(filename.encode(), digest_size=4).hexdigest()
+        return os.path.join("", *(digest[2 * level:2 * level + 2] for level in range(self.shard_levels)))
+
+    def prepare(self, filename: str) -> str:
+        """Get the path to write a new result to, creating its shard directory."""
+        directory = os.path.join(self.root, self._shard(filename))
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, filename)
+
+    def partial_path(self, filename: str) -> str:
+        """Path to write a result under before renaming it into place."""
+        directory, name = os.path.split(self.prepare(filename))
+        return os.path.join(directory, _PARTIAL_PREFIX + name)
+
+    def scratch_path(self, directory: str, name: str) -> str:
+        """Unique path for a temporary file in a scratch directory."""
+        return os.path.join(directory, f"temp_{uuid.uuid4().hex}_{os.path.basename(name or 'upload')}")
+
+    def url_for(self, filename: str) -> str:
+        """URL of a result under the /static mount."""
+        with self._lock:
+            artifact = self._index.get(filename)
+        path = artifact.path if artifact is not None else os.path.join(self.root, self._shard(filename), filename)
+        return "/static/" + os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def add(self, filename: str):
+        """Track a result that was written to its prepared path, evicting others over the quota."""
+        path = os.path.join(self.root, self._shard(filename), filename)
+        kind = _KIND_BY_EXTENSION.get(os.path.splitext(filename)[1].lower(), "image")
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            self._track(filename, StoredArtifact(path, kind, size, now, now))
+            self._enforce_quota(keep=filename)
+
+    def _track(self, filename: str, artifact: StoredArtifact):
+        previous = self._index.pop(filename, None)
+        if previous is not None:
+            self.bytes -= previous.size
+        self._index[filename] = artifact
+        self.bytes += artifact.size
+
+    def touch(self, filename: str):
+        """Record an access, moving the result to the back of the eviction order."""
+        with self._lock:
+            artifact = self._index.get(filename)
+            if artifact is not None:
+                artifact.accessed_at = time.time()
+                self._index.move_to_end(filename)
+
+    def _lookup(self, filename: str) -> Optional[StoredArtifact]:
+        """Get a result's entry, indexing it from disk when another process of a shared store wrote it."""
+        with self._lock:
+            artifact = self._index.get(filename)
+        if artifact is not None or not self.shared or not filename.startswith("result_"):
+            return artifact
+
+        path = os.path.join(self.root, self._shard(filename), filename)
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        kind = _KIND_BY_EXTENSION.get(os.path.splitext(filename)[1].lower(), "image")
+        artifact = StoredArtifact(path, kind, stat.st_size, stat.st_mtime, stat.st_atime)
+        with self._lock:
+            self._track(filename, artifact)
+        return artifact
+
+    def exists(self, filename: str) -> bool:
+        """Whether a result is stored (from the index; shared stores also check the file system)."""
+        return self._lookup(filename) is not None
+
+    def stat(self, filename: str) -> Optional[StoredArtifact]:
+        """Get a stored result's entry."""
+        return self._lookup(filename)
+
+    def remove(self, filename: str, reason: str = "deleted") -> bool:
+        """Delete a result file and stop tracking it."""
+        self._lookup(filename)
+        with self._lock:
+            return self._delete(filename, reason)
+
+    def _delete(self, filename: str, reason: str) -> bool:
+        artifact = self._index.pop(filename, None)
+        if artifact is None:
+            return False
+        self.bytes -= artifact.size
+        try:
+            os.remove(artifact.path)
+        except FileNotFoundError:
+            pass
+        RESULT_STORE_EVICTIONS.labels(reason=reason).inc()
+        return True
+
+    def _enforce_quota(self, keep: Optional[str] = None):
+        """Evict least recently used results until the quota is met."""
+        if not self.max_bytes:
+            return
+        while self.bytes > self.max_bytes:
+            victim = next((name for name in self._index if name != keep), None)
+            if victim is None:
+                break
+            self._delete(victim, "quota")
+            self.evictions += 1
+
+    def scan(self):
+        """Create the directories, rebuild the index from disk and delete partial files left by a crash."""
+        started = time.perf_counter()
+        os.makedirs(self.root, exist_ok=True)
+        for directory in self.scratch_dirs:
+            os.makedirs(directory, exist_ok=True)
+        entries: List[Any] = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                kind = _KIND_BY_EXTENSION.get(os.path.splitext(name)[1].lower())
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.startswith(_PARTIAL_PREFIX):
+                    self._remove_stale(path, stat.st_mtime, self.partial_max_age)
+                elif kind is not None and name.startswith("result_"):
+                    entries.append((name, StoredArtifact(path, kind, stat.st_size, stat.st_mtime, stat.st_atime)))
+
+        entries.sort(key=lambda entry: entry[1].accessed_at)
+        with self._lock:
+            self._index.clear()
+            self.bytes = 0
+            for name, artifact in entries:
+                self._track(name, artifact)
+        self._clean_scratch()
+        logger.info(
+            f"Result store indexed {len(entries)} files ({self.bytes / (1024 * 1024):.1f}MB) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def sweep(self) -> Dict[str, int]:
+        """Delete expired results and scratch leftovers, then enforce the quota."""
+        started = time.perf_counter()
+        if self.shared:
+            self.scan()
+        now = time.time()
+        with self._lock:
+            expired = [
+                name for name, artifact in self._index.items()
+                if self.ttls.get(artifact.kind) and now - artifact.created_at > self.ttls[artifact.kind]
+            ]
+            for name in expired:
+                self._delete(name, "ttl")
+            self.expirations += len(expired)
+            evictions_before = self.evictions
+            self._enforce_quota()
+            evicted = self.evictions - evictions_before
+
+        scratch_removed = self._clean_scratch()
+        self.last_sweep_seconds = time.perf_counter() - started
+        self.last_sweep_at = now
+        RESULT_STORE_SWEEP_SECONDS.observe(self.last_sweep_seconds)
+        if expired or evicted or scratch_removed:
+            logger.info(
+                f"Result store sweep: {len(expired)} expired, {evicted} evicted, "
+                f"{scratch_removed} scratch files removed in {self.last_sweep_seconds:.3f}s"
+            )
+        return {"expired": len(expired), "evicted": evicted, "scratch_removed": scratch_removed}
+
+    def _clean_scratch(self) -> int:
+        """Delete scratch files older than their directory's maximum age."""
+        removed = 0
+        for directory, max_age in self.scratch_dirs.items():
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_file() and self._remove_stale(entry.path, entry.stat().st_mtime, max_age):
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+    @staticmethod
+    def _remove_stale(path: str, modified_at: float, max_age: int) -> bool:
+        if time.time() - modified_at <= max_age:
+            return False
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def run_sweeper(self, interval: float):
+        """Sweep periodically on a worker thread until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.sweep)
+            except Exception as e:
+                logger.error(f"Result store sweep failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stored bytes and files per kind, limits and sweep counters."""
+        with self._lock:
+            files = {kind: 0 for kind in ARTIFACT_KINDS}
+            for artifact in self._index.values():
+                files[artifact.kind] = files.get(artifact.kind, 0) + 1
+            return {
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "files": files,
+                "ttls": self.ttls,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "last_sweep_seconds": self.last_sweep_seconds,
+                "last_sweep_at": self.last_sweep_at
+            }
@@ -0,0 +1,444 @@
+"""Server-side detection on long-running sources: RTSP/HTTP URLs, capture devices and looping files.
+
+Each stream has one decoder thread that reads its source and keeps only
+the newest frame, capped to the stream's FPS. All streams share a fixed
+number of inference slots; a stream takes its newest frame only once it
+holds a slot, so when the node is saturated every stream keeps getting
+fresh results at a lower rate instead of building a backlog. Frames from
+streams with the same model and settings are batched together.
+
+Results are published to subscribers (SSE or WebSocket) as events; a slow
+subscriber loses its oldest events rather than slowing the stream down.
+"""
+
+import asyncio
+import fnmatch
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+import cv2
+
+from app.config import settings
+from app.services.live_detection import compact_detections
+from app.services.regions import split_region
+from app.utils.logger import app_logger as logger
+from app.utils.metrics import observe_stage
+
+# Stream states
+CONNECTING = "connecting"
+RUNNING = "running"
+RECONNECTING = "reconnecting"
+FINISHED = "finished"  # a non-looping file reached its end
+FAILED = "failed"  # gave up after stream_max_reconnect_attempts
+STOPPED = "stopped"
+TERMINAL_STATES = (FINISHED, FAILED, STOPPED)
+
+NETWORK_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https")
+
+# Frame rate assumed for files that do not report one
+_DEFAULT_FILE_FPS = 25.0
+
+# Metrics endpoint label for server-side streams
+_ENDPOINT = "stream"
+
+
+class StreamSourceError(ValueError):
+    """Raised for a source the server cannot or may not open."""
+
+
+class StreamLimitError(Exception):
+    """Raised when the node already runs the maximum number of streams."""
+
+
+def parse_source(source: str) -> Union[str, int]:
+    """Validate a source and convert a device index to the int OpenCV expects."""
+    source = source.strip()
+    scheme = urlsplit(source).scheme.lower()
+    if scheme in NETWORK_SCHEMES:
+        host = (urlsplit(source).hostname or "").lower()
+        allowed = settings.stream_allowed_hosts
+        if allowed and not any(fnmatch.fnmatch(host, pattern.lower()) for pattern in allowed):
+            raise StreamSourceError(f"Stream host not allowed: {host}")
+        return source
+    if scheme and scheme != "file":
+        raise StreamSourceError(f"Unsupported source scheme: {scheme}. Allowed: {', '.join(NETWORK_SCHEMES)}")
+
+    if not settings.stream_local_sources:
+        raise StreamSourceError("Local files and devices are disabled as stream sources")
+    if source.isdigit():
+        return int(source)
+    path = source[len("file://"):] if scheme == "file" else source
+    if not os.path.exists(path):
+        raise StreamSourceError(f"Source not found: {path}")
+    return path
+
+
+def redact_source(source: Union[str, int]) -> str:
+    """Hide the password of a source URL before it is logged or returned."""
+    source = str(source)
+    parts = urlsplit(source)
+    if parts.password is None:
+        return source
+    netloc = f"{parts.username}:***@{parts.hostname}" + (f":{parts.port}" if parts.port else "")
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+def open_capture(source: Union[str, int]) -> cv2.VideoCapture:
+    """Open a source with connect/read timeouts and a single decode thread."""
+    timeout_ms = int(settings.stream_open_timeout * 1000)
+    return cv2.VideoCapture(source, cv2.CAP_ANY, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms,
+        # Dozens of decoders share the node; one thread each avoids oversubscribing the cores
+        cv2.CAP_PROP_N_THREADS, 1
+    ])
+
+
+class LiveStream:
+    """One source: its decoder thread, newest-frame slot, statistics and subscribers."""
+
+    def __init__(self, source: Union[str, int], model_id: str, detect_params: Dict[str, Any],
+                 max_fps: float, loop_file: bool, event_loop: asyncio.AbstractEventLoop):
+        """Create a stream; call start() to begin decoding."""
+        self.id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.is_file = isinstance(source, str) and urlsplit(source).scheme not in NETWORK_SCHEMES
+        self.model_id = model_id
+        self.detect_params = detect_params
+        self.max_fps = max_fps
+        self.loop_file = loop_file
+        self.state = CONNECTING
+        self.created_at = time.time()
+        self.last_error: Optional[str] = None
+        self.reconnects = 0
+        self.frames_decoded = 0
+        self.frames_inferred = 0
+        self.frames_dropped = 0  # decoded and offered, but replaced before inference
+        self.inference_fps = 0.0
+        self.frame_ready = asyncio.Event()
+        self.source_ended = False  # the decoder thread has exited
+        self.task: Optional[asyncio.Task] = None
+        self._event_loop = event_loop
+        self._latest: Optional[Tuple[int, Any, float]] = None  # frame index, BGR frame, capture time
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._decode, name=f"stream-{self.id}", daemon=True)
+        self._subscribers: List[asyncio.Queue] = []
+        self._closed = False  # subscriptions have been ended
+        self._fps_window = (time.perf_counter(), 0)
+        self._next_emit = 0.0  # kept across reconnects and file loops so the FPS cap holds
+
+    def start(self):
+        """Start the decoder thread."""
+        self._thread.start()
+
+    @property
+    def ended(self) -> bool:
+        """Whether the stream reached a final state and no longer decodes."""
+        return self.state in TERMINAL_STATES
+
+    def stop(self):
+        """Ask the decoder thread to stop and end every subscription; call on the event loop."""
+        self._stop.set()
+        if self.state not in (FAILED, FINISHED):
+            self.state = STOPPED
+        self.close_subscriptions()
+
+    def close_subscriptions(self):
+        """Send the final status and end every subscription; call on the event loop."""
+        if self._closed:
+            return
+        self._closed = True
+        self.publish(self._status_event())
+        for queue in list(self._subscribers):
+            self._push(queue, None)
+
+    def join(self, timeout: float = None):
+        """Wait for the decoder thread to exit."""
+        self._thread.join(timeout)
+
+    # Decoder thread
+
+    def _decode(self):
+        """Run the decoder, then let the inference task know no more frames are coming."""
+        try:
+            self._read_source()
+        finally:
+            try:
+                self._event_loop.call_soon_threadsafe(self._end_of_source)
+            except RuntimeError:
+                pass  # event loop already closed during shutdown
+
+    def _read_source(self):
+        """Read the source until stopped, reconnecting with exponential backoff."""
+        delay = settings.stream_reconnect_initial_delay
+        failures = 0
+        while not self._stop.is_set():
+            capture = open_capture(self.source)
+            delivered = 0
+            if capture.isOpened():
+                self._set_state(RUNNING)
+                delivered = self._read_frames(capture)
+                if not delivered:
+                    self.last_error = "No frames could be read"
+                elif not self.is_file:
+                    self.last_error = "Source stopped sending frames"
+            else:
+                self.last_error = f"Could not open {redact_source(self.source)}"
+            capture.release()
+            if self._stop.is_set():
+                return
+
+            if delivered:
+                delay = settings.stream_reconnect_initial_delay
+                failures = 0
+                if self.is_file:
+                    if not self.loop_file:
+                        self._set_state(FINISHED)
+                        return
+                    continue  # start over without waiting
+
+            failures += 1
+            if settings.stream_max_reconnect_attempts and failures > settings.stream_max_reconnect_attempts:
+                logger.warning(f"Stream {self.id} failed after {failures} attempts: {self.last_error}")
+                self._set_state(FAILED)
+                return
+
+            self.reconnects += 1
+            self._set_state(RECONNECTING)
+            logger.warning(f"Stream {self.id}: {self.last_error}, retrying in {delay:.1f}s")
+            self._stop.wait(delay)
+            delay = min(delay * 2, settings.stream_reconnect_max_delay)
+
+    def _read_frames(self, capture: cv2.VideoCapture) -> int:
+        """Grab every frame, decoding only those the FPS cap lets through; returns frames delivered."""
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        # Files are read at their own frame rate so they stand in for a live source
+        file_fps = (capture.get(cv2.CAP_PROP_FPS) or _DEFAULT_FILE_FPS) if self.is_file else 0.0
+        started = time.perf_counter()
+        grabbed = delivered = 0
+        while not self._stop.is_set():
+            if file_fps:
+                ahead = started + grabbed / file_fps - time.perf_counter()
+                if ahead > 0 and self._stop.wait(ahead):
+                    break
+            if not capture.grab():
+                break
+            grabbed += 1
+            self.frames_decoded += 1
+
+            now = time.perf_counter()
+            if now < self._next_emit:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            self._next_emit = max(self._next_emit + interval, now)
+            delivered += 1
+            self._event_loop.call_soon_threadsafe(self._offer, self.frames_decoded - 1, frame, time.time())
+        return delivered
+
+    # Event loop side
+
+    def _offer(self, index: int, frame, captured_at: float):
+        """Make a frame the newest one, dropping the one it replaces."""
+        if self._latest is not None:
+            self.frames_dropped += 1
+        self._latest = (index, frame, captured_at)
+        self.frame_ready.set()
+
+    def _end_of_source(self):
+        """Mark the decoder as exited and wake the inference task; queued after the last frame."""
+        self.source_ended = True
+        self.frame_ready.set()
+
+    def take_frame(self) -> Optional[Tuple[int, Any, float]]:
+        """Take the newest frame, if any, leaving the slot empty."""
+        latest, self._latest = self._latest, None
+        # Once the decoder has exited the event stays set, so the inference task drains and ends
+        if not self.source_ended:
+            self.frame_ready.clear()
+        return latest
+
+    def record_inference(self):
+        """Count an inferred frame and refresh the inference rate about once per second."""
+        self.frames_inferred += 1
+        window_start, count = self._fps_window
+        now = time.perf_counter()
+        if now - window_start >= 1.0:
+            self.inference_fps = (count + 1) / (now - window_start)
+            self._fps_window = (now, 0)
+        else:
+            self._fps_window = (window_start, count + 1)
+
+    def _set_state(self, state: str):
+        """Change state and tell subscribers; safe to call from the decoder thread."""
+        if self.state in (STOPPED, FAILED, FINISHED) or self.state == state:
+            return
+        self.state = state
+        try:
+            self._event_loop.call_soon_threadsafe(self.publish, self._status_event())
+        except RuntimeError:
+            pass  # event loop already closed during shutdown
+
+    def _status_event(self) -> Dict[str, Any]:
+        return {"type": "status", "stream": self.id, "state": self.state, "error": self.last_error}
+
+    @contextmanager
+    def subscribe(self) -> Iterator[asyncio.Queue]:
+        """Register a subscriber queue for the block; None in the queue means the stream ended."""
+        queue = asyncio.Queue(maxsize=settings.stream_subscriber_queue_size)
+        if self._closed:
+            # Subscribed after the end: report the final state and end at once
+            self._push(queue, self._status_event())
+            self._push(queue, None)
+        self._subscribers.append(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.remove(queue)
+
+    def publish(self, event: Dict[str, Any]):
+        """Send an event to every subscriber."""
+        for queue in self._subscribers:
+            self._push(queue, event)
+
+    @staticmethod
+    def _push(queue: asyncio.Queue, event: Optional[Dict[str, Any]]):
+        """Queue an event, discarding the oldest one if the subscriber has fallen behind."""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get the stream settings, state and counters."""
+        return {
+            "stream_id": self.id,
+            "source": redact_source(self.source),
+            "model": self.model_id,
+            "params": self.detect_params,
+            "max_fps": self.max_fps,
+            "loop": self.loop_file,
+            "state": self.state,
+            "last_error": self.last_error,
+            "reconnects": self.reconnects,
+            "frames_decoded": self.frames_decoded,
+            "frames_inferred": self.frames_inferred,
+            "frames_dropped": self.frames_dropped,
+            "inference_fps": round(self.inference_fps, 2),
+            "subscribers": len(self._subscribers),
+            "created_at": self.created_at
+        }
+
+
+class StreamManager:
+    """Runs server-side streams with a shared, fixed inference budget."""
+
+    def __init__(self, detection_service, max_streams: int, inference_slots: int):
+        """Initialize the stream manager."""
+        self.detection_service = detection_service
+        self.max_streams = max_streams
+        self.inference_slots = max(1, inference_slots)
+        self.streams: Dict[str, LiveStream] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def add(self, source: str, model_id: str, detect_params: Dict[str, Any],
+                  max_fps: float, loop_file: bool) -> LiveStream:
+        """Validate a source, then start decoding it and detecting on its frames."""
+        if sum(1 for stream in self.streams.values() if not stream.ended) >= self.max_streams:
+            raise StreamLimitError(f"Maximum number of streams reached: {self.max_streams}")
+        # Ended streams stay listed for their final status until their room is needed, oldest first
+        for stream_id in [stream.id for stream in self.streams.values() if stream.ended]:
+            if len(self.streams) < self.max_streams:
+                break
+            self.streams.pop(stream_id)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.inference_slots)
+
+        stream = LiveStream(parse_source(source), model_id, detect_params, max_fps, loop_file,
+                            asyncio.get_running_loop())
+        self.streams[stream.id] = stream
+        stream.start()
+        stream.task = asyncio.create_task(self._run_inference(stream))
+        logger.info(f"Started stream {stream.id} from {redact_source(stream.source)} with model {model_id}")
+        return stream
+
+    def get(self, stream_id: str) -> Optional[LiveStream]:
+        """Get a running stream."""
+        return self.streams.get(stream_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Get the status of every stream."""
+        return [stream.get_status() for stream in self.streams.values()]
+
+    async def remove(self, stream_id: str) -> bool:
+        """Stop a stream and end its subscriptions."""
+        stream = self.streams.pop(stream_id, None)
+        if stream is None:
+            return False
+        stream.task.cancel()
+        stream.stop()
+        # The decoder may be blocked on a network read for up to the open timeout
+        await self.detection_service.executor.run(stream.join, settings.stream_open_timeout)
+        logger.info(f"Stopped stream {stream_id}")
+        return True
+
+    async def _run_inference(self, stream: LiveStream):
+        """Detect on the stream's newest frame each time it gets an inference slot, until the source ends."""
+        service = self.detection_service
+        detect_params, region = split_region({"conf": settings.detection_confidence_threshold, **stream.detect_params})
+        while True:
+            await stream.frame_ready.wait()
+            async with self._slots:
+                # Taken only now, so time spent waiting for a slot does not make the frame stale
+                latest = stream.take_frame()
+                if latest is None:
+                    if stream.source_ended:
+                        break
+                    continue
+                index, frame, captured_at = latest
+                started = time.perf_counter()
+                image, origin = region.crop(frame) if region is not None else (frame, (0, 0))
+                try:
+                    async with service.lease_model(stream.model_id) as model:
+                        if settings.inference_batching_enabled:
+                            detections = await service.batcher.submit(stream.model_id, model, image, detect_params)
+                        else:
+                            detections = (await service.executor.infer(
+                                stream.model_id, model, [image], detect_params, endpoint=_ENDPOINT
+                            ))[0]
+                    if region is not None:
+                        detections = region.restore(detections, origin)
+                except Exception as e:
+                    stream.last_error = f"Detection failed: {e}"
+                    logger.error(f"Stream {stream.id} detection failed on frame {index}: {e}")
+                    continue
+
+            stream.record_inference()
+            observe_stage("total", stream.model_id, _ENDPOINT, time.perf_counter() - started)
+            stream.publish({
+                "type": "detections",
+                "stream": stream.id,
+                "frame": index,
+                "timestamp": captured_at,
+                "latency_ms": round((time.time() - captured_at) * 1000, 1),
+                "size": [frame.shape[1], frame.shape[0]],
+                "detections": compact_detections(detections)
+            })
+
+        stream.close_subscriptions()
+        logger.info(f"Stream {stream.id} ended: {stream.state}")
+
+    def shutdown(self):
+        """Stop every stream."""
+        for stream in self.streams.values():
+            if stream.task is not None:
+                stream.task.cancel()
+            stream.stop()
+        for stream in self.streams.values():
+            stream.join(timeout=1.0)
+        self.streams.clear()
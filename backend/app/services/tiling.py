@@ -0,0 +1,118 @@
+"""Sliced inference for high-resolution images: overlapping tiles and detection merging."""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.backends import nms
+from app.services.detections import Detections
+
+TILE_MERGE_METHODS = ("nms", "wbf")
+
+
+def tiling_options(tiling_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in configured defaults for the tiling options a request left out."""
+    options = {
+        "tile_size": settings.tile_size,
+        "overlap": settings.tile_overlap,
+        "full_frame": settings.tile_full_frame,
+        "merge": settings.tile_merge,
+        "merge_iou": settings.tile_merge_iou
+    }
+    options.update(tiling_config)
+    if options["merge"] not in TILE_MERGE_METHODS:
+        raise ValueError(f"Unknown tile merge method: {options['merge']}")
+    return options
+
+
+def tile_windows(width: int, height: int, tile_size: int, overlap: float) -> List[Tuple[int, int, int, int]]:
+    """Cover an image with overlapping (x1, y1, x2, y2) tiles; the last row and column are aligned to the edge."""
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def tile_views(image: np.ndarray, windows: List[Tuple[int, int, int, int]]) -> List[np.ndarray]:
+    """Slice tiles as strided views of the image, without copying pixels."""
+    return [image[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+
+
+def shift_detections(detections: Detections, x: int, y: int) -> Detections:
+    """Move tile-relative boxes into full-image coordinates."""
+    if not len(detections) or (x == 0 and y == 0):
+        return detections
+    return Detections(
+        xyxy=detections.xyxy + np.array([x, y, x, y], dtype=np.float32),
+        confidence=detections.confidence,
+        class_id=detections.class_id,
+        names=detections.names
+    )
+
+
+def merge_detections(detections: Detections, method: str, iou_threshold: float) -> Detections:
+    """Collapse duplicates of the same object found in overlapping tiles, per class."""
+    if len(detections) < 2:
+        return detections
+    if method == "wbf":
+        return _fuse_boxes(detections, iou_threshold)
+
+    # Offset each class past the largest coordinate so boxes of different classes never overlap
+    offsets = detections.class_id.astype(np.float32)[:, None] * (float(detections.xyxy.max()) + 1)
+    return detections.select(nms(detections.xyxy + offsets, detections.confidence, iou_threshold))
+
+
+def _fuse_boxes(detections: Detections, iou_threshold: float) -> Detections:
+    """Weighted box fusion: average overlapping same-class boxes, weighted by confidence.
+
+    Boxes are matched by intersection over the smaller box, so a box cut
+    off at a tile border still joins the full box from a neighbouring tile.
+    A fused box keeps the highest confidence of its members.
+    """
+    order = np.argsort(-detections.confidence, kind="stable")
+    xyxy = detections.xyxy[order]
+    confidence = detections.confidence[order]
+    class_id = detections.class_id[order]
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+
+    clusters: List[List[int]] = []
+    fused: List[np.ndarray] = []
+    for index in range(len(order)):
+        match = -1
+        if fused:
+            boxes = np.array(fused)
+            top_left = np.maximum(boxes[:, :2], xyxy[index, :2])
+            bottom_right = np.minimum(boxes[:, 2:], xyxy[index, 2:])
+            intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+            fused_areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            overlap = intersection / np.maximum(np.minimum(fused_areas, areas[index]), 1e-6)
+            overlap[class_id[[cluster[0] for cluster in clusters]] != class_id[index]] = 0
+            if overlap.max() > iou_threshold:
+                match = int(overlap.argmax())
+
+        if match < 0:
+            clusters.append([index])
+            fused.append(xyxy[index].copy())
+        else:
+            clusters[match].append(index)
+            members = clusters[match]
+            weights = confidence[members]
+            fused[match] = (xyxy[members] * weights[:, None]).sum(axis=0) / weights.sum()
+
+    return Detections(
+        xyxy=np.array(fused, dtype=np.float32).reshape(-1, 4),
+        confidence=np.array([confidence[cluster[0]] for cluster in clusters], dtype=np.float32),
+        class_id=np.array([class_id[cluster[0]] for cluster in clusters], dtype=np.int32),
+        names=detections.names
+    )
@@ -0,0 +1,125 @@
+"""Lightweight SORT-style IoU tracker that carries boxes across skipped frames."""
+
+from typing import Dict
+
+import numpy as np
+
+from app.services.detections import Detections
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy box arrays."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+class IoUTracker:
+    """Associates detections across inferred frames and predicts boxes in between.
+
+    Each track keeps a box and a per-frame velocity estimated with an
+    alpha-beta filter (a steady-state constant-velocity Kalman filter).
+    Matching is greedy by IoU within the same class. Tracks that go unmatched
+    for max_age frames are dropped.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 15, alpha: float = 0.7, beta: float = 0.3):
+        """Initialize an empty tracker."""
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.alpha = alpha
+        self.beta = beta
+        self.names: Dict[int, str] = {}
+        self._last_update = -1
+
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.velocity = np.zeros((0, 4), dtype=np.float32)
+        self.confidence = np.zeros((0,), dtype=np.float32)
+        self.class_id = np.zeros((0,), dtype=np.int32)
+        self.last_seen = np.zeros((0,), dtype=np.int64)
+
+    def _predicted_boxes(self, index: int) -> np.ndarray:
+        """Extrapolate every track to a frame index."""
+        steps = (index - self.last_seen).astype(np.float32)[:, None]
+        return self.boxes + self.velocity * steps
+
+    def update(self, index: int, detections: Detections) -> Detections:
+        """Match fresh detections to tracks and return them unchanged.
+
+        The detector's boxes are reported as-is on inferred frames; the
+        filtered track state is only used to predict the frames in between.
+        """
+        self.names.update(detections.names)
+        predicted = self._predicted_boxes(index)
+
+        ious = iou_matrix(predicted, detections.xyxy)
+        ious[self.class_id[:, None] != detections.class_id[None, :]] = 0.0
+
+        matched_tracks, matched_detections = [], []
+        if ious.size:
+            order = np.argsort(-ious, axis=None)
+            used_tracks, used_detections = set(), set()
+            for flat in order:
+                track, detection = divmod(int(flat), ious.shape[1])
+                if ious[track, detection] < self.iou_threshold:
+                    break
+                if track in used_tracks or detection in used_detections:
+                    continue
+                used_tracks.add(track)
+                used_detections.add(detection)
+                matched_tracks.append(track)
+                matched_detections.append(detection)
+
+        if matched_tracks:
+            tracks = np.array(matched_tracks)
+            found = np.array(matched_detections)
+            steps = np.maximum(index - self.last_seen[tracks], 1).astype(np.float32)[:, None]
+            residual = detections.xyxy[found] - predicted[tracks]
+            self.boxes[tracks] = predicted[tracks] + self.alpha * residual
+            self.velocity[tracks] += self.beta * residual / steps
+            self.confidence[tracks] = detections.confidence[found]
+            self.last_seen[tracks] = index
+
+        unmatched = np.setdiff1d(np.arange(len(detections)), np.array(matched_detections, dtype=np.int64))
+        if len(unmatched):
+            self.boxes = np.concatenate([self.boxes, detections.xyxy[unmatched]])
+            self.velocity = np.concatenate([self.velocity, np.zeros((len(unmatched), 4), dtype=np.float32)])
+            self.confidence = np.concatenate([self.confidence, detections.confidence[unmatched]])
+            self.class_id = np.concatenate([self.class_id, detections.class_id[unmatched]])
+            self.last_seen = np.concatenate([self.last_seen, np.full(len(unmatched), index, dtype=np.int64)])
+
+        self._last_update = index
+        self._drop_stale(index)
+        return detections
+
+    def predict(self, index: int) -> Detections:
+        """Get carried-forward boxes for a frame that skipped inference.
+
+        Only tracks seen on the latest inferred frame are reported; older
+        tracks are kept for re-association but not drawn.
+        """
+        alive = self.last_seen == self._last_update
+        return Detections(
+            xyxy=self._predicted_boxes(index)[alive].astype(np.float32),
+            confidence=self.confidence[alive],
+            class_id=self.class_id[alive],
+            names=self.names
+        )
+
+    def _drop_stale(self, index: int):
+        """Forget tracks not matched for more than max_age frames."""
+        keep = (index - self.last_seen) <= self.max_age
+        if keep.all():
+            return
+        self.boxes = self.boxes[keep]
+        self.velocity = self.velocity[keep]
+        self.confidence = self.confidence[keep]
+        self.class_id = self.class_id[keep]
+        self.last_seen = self.last_seen[keep]
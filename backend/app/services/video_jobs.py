@@ -0,0 +1,268 @@
+"""Background video jobs with progress tracking, cancellation and restart recovery."""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from app.config import settings
+from app.services import job_store
+from app.services.detections import Detections
+from app.services.inference_executor import ExecutorSaturatedError
+from app.services.job_store import JobStore
+from app.services.video_pipeline import PipelineCancelled
+from app.utils.file_validator import validate_video_duration
+from app.utils.ingest import copy_upload, probe_video
+from app.utils.logger import app_logger as logger
+
+# Minimum seconds between progress writes to the job store
+PROGRESS_FLUSH_INTERVAL = 1.0
+
+
+class _JobProgress:
+    """Receives pipeline callbacks on worker threads and records job progress."""
+
+    def __init__(self, store: JobStore, job_id: str, detections_path: str, cancel_event: threading.Event):
+        self.store = store
+        self.job_id = job_id
+        self.cancel_event = cancel_event
+        self.frames_done = 0
+        self.started = time.time()
+        self._last_flush = 0.0
+        self._detections_file = open(detections_path, "w", encoding="utf-8")
+
+    def on_start(self, total_frames: int, fps: float):
+        """Record the frame count once the video is opened."""
+        self.store.update(self.job_id, total_frames=total_frames)
+
+    def on_frame(self, index: int, detections: Optional[Detections], inferred: bool):
+        """Append a frame's detections to the NDJSON log and update progress."""
+        if detections is not None:
+            line = json.dumps({"frame": index, "inferred": inferred, "detections": detections.to_list()})
+            self._detections_file.write(line + "\n")
+            self._detections_file.flush()
+
+        self.frames_done = index + 1
+        now = time.time()
+        if now - self._last_flush >= PROGRESS_FLUSH_INTERVAL:
+            self._last_flush = now
+            self.store.update(self.job_id, frames_done=self.frames_done, fps=self.fps)
+            # Cancellation may have been requested through another server worker
+            if self.store.cancel_requested(self.job_id):
+                self.cancel_event.set()
+
+    @property
+    def fps(self) -> float:
+        elapsed = time.time() - self.started
+        return self.frames_done / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        self._detections_file.close()
+
+
+class VideoJobManager:
+    """Runs video detection jobs on a bounded background worker pool."""
+
+    def __init__(self, detection_service, store: JobStore, job_dir: str, max_concurrent: int, max_queued: int):
+        """Initialize the job manager."""
+        self.detection_service = detection_service
+        self.store = store
+        self.job_dir = job_dir
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max_queued
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._progress: Dict[str, _JobProgress] = {}
+        self._shutting_down = False
+
+    async def submit(self, upload: BinaryIO, original_filename: str, model_id: str,
+                     detection_config: Dict[str, Any], sampling_config: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Persist the upload and queue a job for it."""
+        if len(self._tasks) >= self.max_concurrent + self.max_queued:
+            raise ExecutorSaturatedError(self.detection_service.executor.retry_after)
+
+        job_id = uuid.uuid4().hex
+        extension = os.path.splitext(original_filename or "")[1] or ".mp4"
+        input_path = os.path.join(self.job_dir, f"{job_id}_input{extension}")
+        await self.detection_service.executor.run(self._store_upload, upload, input_path)
+
+        # Reject over-long videos before queuing, from the container headers alone
+        try:
+            video_info = await self.detection_service.executor.run(probe_video, input_path)
+            validate_video_duration(video_info.duration)
+        except Exception:
+            os.remove(input_path)
+            raise
+
+        job = await self.detection_service.executor.run(
+            self.store.create,
+            job_id,
+            model_id=model_id,
+            config=detection_config,
+            sampling=sampling_config or {},
+            input_path=input_path,
+            original_filename=original_filename,
+            detections_path=os.path.join(self.job_dir, f"{job_id}.ndjson")
+        )
+        self._start(job_id)
+        logger.info(f"Queued video job {job_id} ({original_filename}) with model {model_id}")
+        return job
+
+    def _start(self, job_id: str):
+        """Schedule a job on the background pool."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._cancel_events[job_id] = threading.Event()
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str):
+        """Process a job once a worker slot is free."""
+        cancel_event = self._cancel_events[job_id]
+        run = self.detection_service.executor.run
+        job = await run(self.store.get, job_id)
+        progress = None
+
+        try:
+            async with self._slots:
+                if cancel_event.is_set() or await run(self.store.cancel_requested, job_id):
+                    raise PipelineCancelled()
+
+                await run(
+                    self.store.update, job_id,
+                    status=job_store.RUNNING, started_at=time.time(), frames_done=0, error=None
+                )
+                progress = _JobProgress(self.store, job_id, job["detections_path"], cancel_event)
+                self._progress[job_id] = progress
+                # Decode/encode on the I/O pool; inference batches go to the inference pool
+                async with self.detection_service.lease_model(job["model_id"]) as model:
+                    result_filename, result = await self.detection_service.executor.run(
+                        self.detection_service._process_video_file,
+                        job["input_path"], model, job["model_id"], job["config"], job["sampling"],
+                        cancel_event, progress.on_start, progress.on_frame, endpoint="job"
+                    )
+
+            self.detection_service.observe_pipeline(result, job["model_id"], "job")
+            await run(
+                self.store.update,
+                job_id,
+                status=job_store.COMPLETED,
+                result_filename=result_filename,
+                total_frames=result.total_frames,
+                frames_done=result.total_frames,
+                fps=result.fps,
+                inference_ratio=result.inference_ratio,
+                pipeline_stats=result.stats(),
+                finished_at=time.time()
+            )
+            self._remove_input(job)
+            logger.info(f"Video job {job_id} completed: {result.total_frames} frames at {result.fps:.1f} FPS")
+
+        except (PipelineCancelled, asyncio.CancelledError) as e:
+            # Written directly rather than on the I/O pool, which is shut down first on exit
+            if self._shutting_down:
+                # Leave the job queued so it is resumed after a restart
+                self.store.update(job_id, status=job_store.QUEUED)
+            else:
+                self.store.update(job_id, status=job_store.CANCELLED, finished_at=time.time())
+                self._remove_input(job)
+                logger.info(f"Video job {job_id} cancelled")
+            if isinstance(e, asyncio.CancelledError):
+                raise
+
+        except Exception as e:
+            logger.error(f"Video job {job_id} failed: {e}")
+            self.store.update(job_id, status=job_store.FAILED, error=str(e), finished_at=time.time())
+            self._remove_input(job)
+
+        finally:
+            if progress is not None:
+                progress.close()
+            self._progress.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
+
+    def _store_upload(self, upload: BinaryIO, input_path: str):
+        """Copy an upload into the job directory, creating it on first use."""
+        os.makedirs(self.job_dir, exist_ok=True)
+        copy_upload(upload, input_path, settings.max_file_size)
+
+    @staticmethod
+    def _remove_input(job: Dict[str, Any]):
+        """Delete the stored upload of a finished job."""
+        if job.get("input_path") and os.path.exists(job["input_path"]):
+            os.remove(job["input_path"])
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job with live progress, FPS and ETA."""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+
+        progress = self._progress.get(job_id)
+        if progress is not None:
+            job["frames_done"] = progress.frames_done
+            job["fps"] = progress.fps
+
+        remaining = max(job["total_frames"] - job["frames_done"], 0)
+        job["eta_seconds"] = (
+            remaining / job["fps"] if job["status"] == job_store.RUNNING and job["fps"] else None
+        )
+        # The frame count is an estimate until the job finishes, so progress is capped
+        job["progress"] = min(job["frames_done"] / job["total_frames"], 1.0) if job["total_frames"] else 0.0
+        job["video_url"] = (
+            self.detection_service.result_store.url_for(job["result_filename"]) if job.get("result_filename") else None
+        )
+        return job
+
+    def list_status(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the status of the most recent jobs."""
+        return [self.get_status(job["id"]) for job in self.store.list(limit=limit)]
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation of a queued or running job; False when it is no longer active.
+
+        The request is recorded in the job store, so the server worker
+        running the job picks it up even if this one does not own it.
+        """
+        cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+        return self.store.request_cancel(job_id)
+
+    def active_count(self) -> int:
+        """Number of jobs queued or running in this process."""
+        return len(self._tasks)
+
+    def is_active(self, job_id: str) -> bool:
+        """Whether a job is still queued or running, in any server worker."""
+        job = self.store.get(job_id)
+        return job is not None and job["status"] in job_store.ACTIVE_STATES
+
+    async def recover(self):
+        """Requeue jobs left queued or running by a previous process."""
+        run = self.detection_service.executor.run
+        for job in await run(self.store.list, limit=1000, statuses=list(job_store.ACTIVE_STATES)):
+            if job["id"] in self._tasks:
+                continue
+            if job.get("input_path") and os.path.exists(job["input_path"]):
+                await run(self.store.update, job["id"], status=job_store.QUEUED, frames_done=0)
+                self._start(job["id"])
+                logger.info(f"Resuming video job {job['id']} after restart")
+            else:
+                await run(
+                    self.store.update,
+                    job["id"], status=job_store.FAILED,
+                    error="Interrupted by restart and input is no longer available",
+                    finished_at=time.time()
+                )
+
+    def shutdown(self):
+        """Stop running jobs, leaving them queued for the next process."""
+        self._shutting_down = True
+        for cancel_event in self._cancel_events.values():
+            cancel_event.set()
@@ -0,0 +1,309 @@
+"""Staged video pipeline: decode, batched inference and annotate/encode run concurrently."""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.detections import Detections
+from app.services.tracker import IoUTracker
+from app.utils.logger import app_logger as logger
+
+# Seconds between cancellation checks while blocked on a queue
+_POLL_INTERVAL = 0.1
+
+_END = object()
+
+
+class FramePool:
+    """Recycles frame buffers from the encoder back to the decoder."""
+
+    def __init__(self, capacity: int):
+        """Initialize an empty pool that keeps at most capacity free buffers."""
+        self.capacity = capacity
+        self.allocations = 0
+        self._free: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """Take a free buffer, or None (counted as an allocation) when the pool is empty."""
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        self.allocations += 1
+        return None
+
+    def release(self, frame: np.ndarray):
+        """Return a buffer once its frame has been written."""
+        with self._lock:
+            if len(self._free) < self.capacity:
+                self._free.append(frame)
+
+
+class PipelineCancelled(Exception):
+    """Raised when a pipeline run is cancelled before completion."""
+
+
+@dataclass
+class StageStats:
+    """Throughput and stall accounting for one pipeline stage."""
+    name: str
+    frames: int = 0
+    busy_time: float = 0.0
+    input_stall_time: float = 0.0  # starved, waiting for upstream
+    output_stall_time: float = 0.0  # blocked, waiting for downstream
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the stats as a JSON-ready dict."""
+        return {
+            "frames": self.frames,
+            "busy_s": round(self.busy_time, 4),
+            "input_stall_s": round(self.input_stall_time, 4),
+            "output_stall_s": round(self.output_stall_time, 4),
+            "fps": self.frames / self.busy_time if self.busy_time > 0 else 0.0
+        }
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of a pipeline run."""
+    total_frames: int
+    inferred_frames: int
+    elapsed: float
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+    @property
+    def inference_ratio(self) -> float:
+        """Fraction of frames that ran inference."""
+        return self.inferred_frames / self.total_frames if self.total_frames else 0.0
+
+    @property
+    def fps(self) -> float:
+        """End-to-end frames per second."""
+        return self.total_frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-stage throughput and stall times."""
+        return {name: stage.to_dict() for name, stage in self.stages.items()}
+
+
+class VideoPipeline:
+    """Runs decoder, inference and encoder stages connected by bounded queues."""
+
+    def __init__(
+        self,
+        capture: cv2.VideoCapture,
+        writer: cv2.VideoWriter,
+        infer_batch: Callable[[List[np.ndarray]], List[Detections]],
+        draw: Callable[[np.ndarray, Detections], np.ndarray],
+        should_infer: Callable[[int, np.ndarray], bool],
+        batch_size: int = 4,
+        queue_size: int = 32,
+        max_frames: int = 0,
+        cancel_event: Optional[threading.Event] = None,
+        on_frame: Optional[Callable[[int, Optional[Detections], bool], None]] = None,
+        tracker: Optional[IoUTracker] = None,
+        frame_size: Optional[Tuple[int, int]] = None,
+        reuse_frames: bool = False
+    ):
+        """Initialize the pipeline around an opened capture and writer.
+
+        frame_size (width, height) resizes frames right after decoding, so
+        every later stage works on the smaller frame. With reuse_frames,
+        frame buffers go back to the decoder once written; draw must then
+        not keep references to the frames it is given.
+        """
+        self.capture = capture
+        self.writer = writer
+        self.infer_batch = infer_batch
+        self.draw = draw
+        self.should_infer = should_infer
+        self.batch_size = max(1, batch_size)
+        self.max_frames = max_frames
+        self.cancel_event = cancel_event or threading.Event()
+        self.on_frame = on_frame
+        self.tracker = tracker
+        self.frame_size = frame_size
+        # Enough buffers for both queues full plus the frames held by each stage
+        self.frame_pool = FramePool(2 * queue_size + self.batch_size + 4) if reuse_frames else None
+
+        self._decoded: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._inferred: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stages = {name: StageStats(name) for name in ("decode", "infer", "encode")}
+        self._error: Optional[BaseException] = None
+        self._inferred_frames = 0
+        self._written_frames = 0
+
+    def cancel(self):
+        """Request cancellation of a running pipeline."""
+        self.cancel_event.set()
+
+    def run(self) -> PipelineResult:
+        """Run all stages to completion on the calling thread plus two helpers."""
+        start = time.perf_counter()
+        decoder = threading.Thread(target=self._guard, args=(self._decode_stage,), name="video-decode", daemon=True)
+        encoder = threading.Thread(target=self._guard, args=(self._encode_stage,), name="video-encode", daemon=True)
+
+        decoder.start()
+        encoder.start()
+        self._guard(self._infer_stage)
+        decoder.join()
+        encoder.join()
+
+        if self._error is not None:
+            raise self._error
+        if self.cancel_event.is_set():
+            raise PipelineCancelled("Video processing was cancelled")
+
+        return PipelineResult(
+            total_frames=self._written_frames,
+            inferred_frames=self._inferred_frames,
+            elapsed=time.perf_counter() - start,
+            stages=self._stages
+        )
+
+    def _guard(self, stage: Callable[[], None]):
+        """Run a stage, recording the first error and stopping the others."""
+        try:
+            stage()
+        except PipelineCancelled:
+            pass
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+                logger.error(f"Video pipeline stage failed: {e}")
+            self.cancel_event.set()
+
+    def _put(self, target: queue.Queue, item, stats: StageStats):
+        """Put an item downstream, applying backpressure and honouring cancellation."""
+        started = time.perf_counter()
+        while True:
+            if self.cancel_event.is_set():
+                raise PipelineCancelled()
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        stats.output_stall_time += time.perf_counter() - started
+
+    def _get(self, source: queue.Queue, stats: StageStats, block: bool = True):
+        """Take an item from upstream, honouring cancellation."""
+        if not block:
+            return source.get_nowait()
+
+        started = time.perf_counter()
+        while True:
+            if self.cancel_event.is_set():
+                raise PipelineCancelled()
+            try:
+                item = source.get(timeout=_POLL_INTERVAL)
+                break
+            except queue.Empty:
+                continue
+        stats.input_stall_time += time.perf_counter() - started
+        return item
+
+    def _decode_stage(self):
+        """Read frames from the capture."""
+        stats = self._stages["decode"]
+        index = 0
+        source = None  # reused full-size frame when resizing
+        try:
+            while not self.max_frames or index < self.max_frames:
+                started = time.perf_counter()
+                buffer = self.frame_pool.acquire() if self.frame_pool is not None else None
+                if self.frame_size is None:
+                    ret, frame = self.capture.read(buffer)
+                else:
+                    ret, source = self.capture.read(source)
+                    if ret:
+                        frame = cv2.resize(source, self.frame_size, dst=buffer, interpolation=cv2.INTER_AREA)
+                stats.busy_time += time.perf_counter() - started
+                if not ret:
+                    break
+                stats.frames += 1
+                self._put(self._decoded, (index, frame), stats)
+                index += 1
+        finally:
+            if not self.cancel_event.is_set():
+                self._put(self._decoded, _END, stats)
+
+    def _infer_stage(self):
+        """Group frames into batches and run inference on those that need it."""
+        stats = self._stages["infer"]
+        finished = False
+
+        while not finished:
+            window: List[Tuple[int, np.ndarray, bool]] = []
+            candidates = 0
+
+            # Block for one frame, then take whatever is already decoded
+            item = self._get(self._decoded, stats)
+            while True:
+                if item is _END:
+                    finished = True
+                    break
+                index, frame = item
+                infer = self.should_infer(index, frame)
+                window.append((index, frame, infer))
+                candidates += infer
+                if candidates >= self.batch_size:
+                    break
+                try:
+                    item = self._get(self._decoded, stats, block=False)
+                except queue.Empty:
+                    break
+
+            if not window:
+                continue
+
+            started = time.perf_counter()
+            selected = [frame for _, frame, infer in window if infer]
+            results = iter(self.infer_batch(selected) if selected else [])
+            stats.busy_time += time.perf_counter() - started
+            stats.frames += len(selected)
+            self._inferred_frames += len(selected)
+
+            for index, frame, infer in window:
+                detections = next(results) if infer else None
+                if self.tracker is not None:
+                    # Carry boxes forward onto frames that skipped inference
+                    detections = self.tracker.update(index, detections) if infer else self.tracker.predict(index)
+                self._put(self._inferred, (index, frame, detections, infer), stats)
+
+        self._put(self._inferred, _END, stats)
+
+    def _encode_stage(self):
+        """Reassemble frames in order, annotate them and write the output video."""
+        stats = self._stages["encode"]
+        pending: Dict[int, Tuple[np.ndarray, Optional[Detections], bool]] = {}
+        next_index = 0
+
+        while True:
+            item = self._get(self._inferred, stats)
+            if item is _END:
+                break
+
+            index, frame, detections, inferred = item
+            pending[index] = (frame, detections, inferred)
+
+            while next_index in pending:
+                frame, detections, inferred = pending.pop(next_index)
+                started = time.perf_counter()
+                if detections is not None:
+                    frame = self.draw(frame, detections)
+                self.writer.write(frame)
+                if self.frame_pool is not None:
+                    self.frame_pool.release(frame)
+                stats.busy_time += time.perf_counter() - started
+                stats.frames += 1
+                if self.on_frame is not None:
+                    self.on_frame(next_index, detections, inferred)
+                next_index += 1
+
+        self._written_frames = next_index
@@ -1,6 +1,7 @@
 """File validation utilities."""
 
 from fastapi import HTTPException, UploadFile, status
+from app.utils.ingest import get_upload_size, peek_upload, sniff_content_type
 from app.utils.logger import app_logger as logger
 
 
@@ -14,9 +15,8 @@ async def validate_file(file: UploadFile, allowed_types: list, max_size: int):
             detail="No file provided"
         )
 
-    # Check file size
-    file_content = await file.read()
-    file_size = len(file_content)
+    # Check file size (from the spooled upload, without reading it)
+    file_size = get_upload_size(file)
 
     if file_size > max_size:
         max_size_mb = max_size / (1024 * 1024)
@@ -32,24 +32,31 @@ async def validate_file(file: UploadFile, allowed_types: list, max_size: int):
             detail=f"Invalid file type: {file.content_type}. Allowed: {', '.join(allowed_types)}"
         )
 
-    # Reset file pointer for further processing
-    await file.seek(0)
+    # Check the actual content from its magic bytes
+    detected_type = sniff_content_type(peek_upload(file))
+    if detected_type not in allowed_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File content does not match an allowed type ({detected_type or 'unknown'})"
+        )
 
-    logger.info(f"File validated: {file.filename} ({file_size} bytes, {file.content_type})")
+    logger.debug("File validated: {} ({} bytes, {})", file.filename, file_size, file.content_type)
 
 
-def validate_image_dimensions(width: int, height: int):
-    """Validate image dimensions against configured limits."""
+def validate_image_dimensions(width: int, height: int, max_width: int = None, max_height: int = None):
+    """Validate image dimensions against configured limits (or explicit ones)."""
 
     from app.config import settings
 
-    if width > settings.max_image_width or height > settings.max_image_height:
+    max_width = max_width or settings.max_image_width
+    max_height = max_height or settings.max_image_height
+    if width > max_width or height > max_height:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Image dimensions too large. Maximum: {settings.max_image_width}x{settings.max_image_height}"
+            detail=f"Image dimensions too large. Maximum: {max_width}x{max_height}"
         )
 
-    logger.info(f"Image dimensions validated: {width}x{height}")
+    logger.debug("Image dimensions validated: {}x{}", width, height)
 
 
 def validate_video_duration(duration: float):
@@ -63,4 +70,4 @@ def validate_video_duration(duration: float):
             detail=f"Video too long. Maximum duration: {settings.max_video_duration}s"
         )
 
-    logger.info(f"Video duration validated: {duration:.1f}s")
+    logger.debug("Video duration validated: {:.1f}s", duration)
@@ -0,0 +1,359 @@
+"""Single-pass upload ingest: size limits, magic-byte sniffing and image decoding."""
+
+import mmap
+import os
+import shutil
+import struct
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+SNIFF_LENGTH = 512  # covers the tar header magic at offset 257
+
+# Upload buffers up to this size are kept per thread and reused across requests
+REUSABLE_BUFFER_MAX = 8 * 1024 * 1024
+
+# JPEG start-of-frame markers carrying the image dimensions
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xDA))
+_JPEG_APP1_MARKER = 0xE1
+_EXIF_ORIENTATION_TAG = 0x0112
+# EXIF orientations that rotate the image by 90 degrees; the decoder applies them, swapping width and height
+_EXIF_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Leading QuickTime atoms for .mov files without an ftyp box
+_QUICKTIME_ATOMS = {b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+
+_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+_buffers = threading.local()
+
+# tmpfs is used for scratch files only when it can hold this many maximum-size uploads
+_TMPFS_SCRATCH_UPLOADS = 4
+_TMPFS_SCRATCH_DIR = "/dev/shm/yolo-scratch"
+_DISK_SCRATCH_DIR = "./scratch"
+
+
+@dataclass
+class VideoInfo:
+    """Container-level properties of a video."""
+
+    duration: float
+    fps: float
+    width: int
+    height: int
+    frame_count: int
+
+
+def _too_large(max_size: int) -> HTTPException:
+    """Build the error returned for oversized uploads."""
+    max_size_mb = max_size / (1024 * 1024)
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size: {max_size_mb:.1f}MB"
+    )
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Detect the content type of a file from its leading magic bytes."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video/avi"
+    if head[4:8] == b"ftyp":
+        return "video/mov" if head[8:12] == b"qt  " else "video/mp4"
+    if head[4:8] in _QUICKTIME_ATOMS:
+        return "video/mov"
+    if head.startswith(b"PK\x03\x04"):
+        return "application/zip"
+    if head.startswith(b"\x1f\x8b"):
+        return "application/gzip"
+    if head[257:262] == b"ustar":
+        return "application/x-tar"
+    return None
+
+
+def get_upload_size(file: UploadFile) -> int:
+    """Get the size of a spooled upload without reading its content."""
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+
+def peek_upload(file: UploadFile, length: int = SNIFF_LENGTH) -> bytes:
+    """Read the first bytes of an upload and rewind it."""
+    file.file.seek(0)
+    head = file.file.read(length)
+    file.file.seek(0)
+    return head
+
+
+def _get_buffer(size: int) -> bytearray:
+    """Get a per-thread reusable buffer, or a one-off buffer for large uploads."""
+    if size > REUSABLE_BUFFER_MAX:
+        return bytearray(size)
+
+    buffer = getattr(_buffers, "data", None)
+    if buffer is None or len(buffer) < size:
+        buffer = bytearray(max(size, CHUNK_SIZE))
+        _buffers.data = buffer
+    return buffer
+
+
+def read_upload(source: BinaryIO, max_size: int) -> memoryview:
+    """Read an upload once, in chunks, into a reusable buffer.
+
+    The returned view is only valid on the calling thread until its next
+    read_upload call, so decode it before handing the thread back.
+    """
+    source.seek(0, 2)
+    size = source.tell()
+    source.seek(0)
+    if size > max_size:
+        raise _too_large(max_size)
+
+    view = memoryview(_get_buffer(size))[:size]
+    filled = 0
+    while filled < size:
+        count = source.readinto(view[filled:filled + CHUNK_SIZE])
+        if not count:
+            break
+        filled += count
+    return view[:filled]
+
+
+@contextmanager
+def map_upload(source: BinaryIO, max_size: int) -> Iterator[memoryview]:
+    """Expose an upload's bytes, memory-mapping it when it was spooled to disk.
+
+    Large uploads are decoded straight from the page cache instead of being
+    copied into a buffer first; small in-memory uploads use read_upload.
+    """
+    source.seek(0, 2)
+    size = source.tell()
+    source.seek(0)
+    if size > max_size:
+        raise _too_large(max_size)
+
+    # SpooledTemporaryFile keeps small uploads in memory until it rolls over to a real file
+    if size == 0 or not getattr(source, "_rolled", False):
+        yield read_upload(source, max_size)
+        return
+
+    mapped = mmap.mmap(source.fileno(), size, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        try:
+            view.release()
+            mapped.close()
+        except BufferError:
+            # A slice is still referenced (e.g. from a traceback); the map closes when it is collected
+            pass
+
+
+def _exif_orientation(segment: memoryview) -> int:
+    """Orientation tag of a JPEG APP1 segment's EXIF data (1, unrotated, when absent or unreadable)."""
+    if segment[:6] != b"Exif\x00\x00" or len(segment) < 14:
+        return 1
+    tiff = segment[6:]
+    byte_order = {b"II": "<", b"MM": ">"}.get(bytes(tiff[:2]))
+    if byte_order is None:
+        return 1
+    ifd_offset = struct.unpack(byte_order + "I", tiff[4:8])[0]
+    if ifd_offset + 2 > len(tiff):
+        return 1
+    entries = struct.unpack(byte_order + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+    for entry in range(entries):
+        start = ifd_offset + 2 + entry * 12
+        if start + 12 > len(tiff):
+            break
+        tag, _, _, value = struct.unpack(byte_order + "HHIH", tiff[start:start + 10])
+        if tag == _EXIF_ORIENTATION_TAG:
+            return value
+    return 1
+
+
+def probe_image_size(data: memoryview) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG or PNG header without decoding pixels.
+
+    For JPEGs the EXIF orientation is applied, as cv2.imdecode applies it,
+    so the size matches the decoded image and its box coordinates.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    i = 2
+    end = len(data)
+    orientation = 1
+    while i + 9 < end:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return (height, width) if orientation in _EXIF_TRANSPOSED_ORIENTATIONS else (width, height)
+        segment_length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker == _JPEG_APP1_MARKER and orientation == 1:
+            orientation = _exif_orientation(data[i + 4:min(i + 2 + segment_length, end)])
+        i += 2 + segment_length
+    return None
+
+
+def choose_reduce_factor(width: int, height: int, target_size: int) -> int:
+    """Pick the largest JPEG DCT downscale that keeps the image above target_size."""
+    longest = max(width, height)
+    for factor in (8, 4, 2):
+        if longest // factor >= target_size:
+            return factor
+    return 1
+
+
+def decode_image(data: memoryview, reduce_factor: int = 1) -> np.ndarray:
+    """Decode image bytes straight from the buffer into a BGR array."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), _REDUCED_DECODE_FLAGS[reduce_factor])
+    if image is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not decode image"
+        )
+    return image
+
+
+def copy_upload(source: BinaryIO, path: str, max_size: int) -> int:
+    """Stream an upload to a file in chunks, enforcing the size limit as it goes.
+
+    Returns the number of bytes written; a partial file is removed on failure.
+    """
+    source.seek(0)
+    written = 0
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_size:
+                    raise _too_large(max_size)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+
+def probe_video(path: str) -> VideoInfo:
+    """Read duration, frame rate and resolution from the container without decoding frames."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Could not open video file")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+
+    if fps <= 0 or width <= 0 or height <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Could not read video stream properties")
+    return VideoInfo(
+        duration=max(frame_count, 0) / fps,
+        fps=fps,
+        width=width,
+        height=height,
+        frame_count=max(frame_count, 0)
+    )
+
+
+def resolve_scratch_dir(configured: str, max_file_size: int) -> str:
+    """Get the scratch directory; when not configured, prefer tmpfs if it has room for a few uploads.
+
+    The directory is not created here; the result store creates it with its scratch directories.
+    """
+    if configured:
+        return configured
+    try:
+        if shutil.disk_usage("/dev/shm").free >= _TMPFS_SCRATCH_UPLOADS * max_file_size:
+            return _TMPFS_SCRATCH_DIR
+    except OSError:
+        pass
+    return _DISK_SCRATCH_DIR
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware enforcing the upload size limit while the body streams in.
+
+    path_limits overrides the limit for specific paths, e.g. multi-file uploads.
+    """
+
+    def __init__(self, app, max_file_size: int, overhead_bytes: int = 0, path_limits: Dict[str, int] = None):
+        self.app = app
+        self.max_file_size = max_file_size
+        self.overhead_bytes = overhead_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_file_size = self.path_limits.get(scope["path"], self.max_file_size)
+        max_body_size = max_file_size + self.overhead_bytes
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        error = None
+        # Only ASCII digits are valid; int() would also accept signs, spaces and underscores
+        if content_length is not None and not content_length.isdigit():
+            error = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Content-Length header")
+        elif content_length is not None and int(content_length) > max_body_size:
+            error = _too_large(max_file_size)
+        if error is not None:
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    raise _too_large(max_file_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,13 +1,78 @@
 """Logging configuration for the application."""
 
+import itertools
+import json
 import os
 import sys
+import traceback
+from typing import Dict, Optional
 from loguru import logger
 from app.config import settings
 
+TEXT_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+CONSOLE_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+
+
+def _json_format(record) -> str:
+    """Render a record as one compact JSON line, with bound and keyword fields at the top level."""
+    extra = record["extra"]
+    # Every sink formats the same record, so build the line once
+    if "_json" not in extra:
+        entry = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "logger": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "message": record["message"],
+            **extra
+        }
+        if record["exception"] is not None:
+            entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+        extra["_json"] = json.dumps(entry, separators=(",", ":"), default=str)
+    return "{extra[_json]}\n"
+
+
+class SuccessLogSampler:
+    """Decide which successful requests get an access log line, per route template."""
+
+    def __init__(self, default_rate: float, route_rates: Dict[str, float]):
+        """Create a sampler keeping a fraction of the logs of each route (1 keeps all, 0 none)."""
+        self.default_rate = default_rate
+        self.route_rates = route_rates
+        self._counters: Dict[str, itertools.count] = {}
+
+    def should_log(self, route: str) -> bool:
+        """Keep every Nth success of a route, so a rate of 0.1 logs one request in ten."""
+        rate = self.route_rates.get(route, self.default_rate)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        counter = self._counters.get(route)
+        if counter is None:
+            counter = self._counters.setdefault(route, itertools.count())
+        return next(counter) % round(1 / rate) == 0
+
+
+# Process whose sinks are configured; a forked child needs its own (the enqueue writer thread does not survive a fork)
+_configured_pid: Optional[int] = None
+
 
 def setup_logging():
-    """Configure logging with file rotation and console output."""
+    """Configure logging with file rotation and console output, once per process.
+
+    Sinks are written from a background thread (LOG_ENQUEUE), so a slow
+    disk or terminal does not stall request handlers, and LOG_FORMAT=json
+    emits one JSON object per line for log collectors.
+    """
+    global _configured_pid
+    if _configured_pid == os.getpid():
+        return logger
+    _configured_pid = os.getpid()
 
     # Remove default logger
     logger.remove()
@@ -16,12 +81,16 @@ def setup_logging():
     log_dir = os.path.dirname(settings.log_file)
     os.makedirs(log_dir, exist_ok=True)
 
+    structured = settings.log_format == "json"
+    file_format = _json_format if structured else TEXT_FORMAT
+
     # Add console handler for development
     logger.add(
         sys.stdout,
         level=settings.log_level,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        colorize=True
+        format=_json_format if structured else CONSOLE_FORMAT,
+        colorize=not structured,
+        enqueue=settings.log_enqueue
     )
 
     # Add file handler with rotation
@@ -31,8 +100,9 @@ def setup_logging():
         rotation="10 MB",  # Rotate when file reaches 10MB
         retention="30 days",  # Keep logs for 30 days
         encoding="utf-8",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        compression="gz"  # Compress rotated files
+        format=file_format,
+        compression="gz",  # Compress rotated files
+        enqueue=settings.log_enqueue
     )
 
     # Add error-only file handler
@@ -42,8 +112,9 @@ def setup_logging():
         rotation="10 MB",
         retention="30 days",
         encoding="utf-8",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        compression="gz"
+        format=file_format,
+        compression="gz",
+        enqueue=settings.log_enqueue
     )
 
     # Log application startup
@@ -54,5 +125,7 @@ def setup_logging():
     return logger
 
 
-# Global logger instance
-app_logger = setup_logging()
+# Global logger instance; importing only sets the console level, the server adds the file sinks at startup
+logger.remove()
+logger.add(sys.stderr, level=settings.log_level, format=CONSOLE_FORMAT)
+app_logger = logger
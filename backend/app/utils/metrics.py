@@ -0,0 +1,108 @@
+"""Prometheus metrics: per-stage latency histograms and runtime gauges."""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Request stages, in processing order
+STAGES = (
+    "read", "validate", "probe", "decode", "batch_wait", "queue_wait", "inference",
+    "postprocess", "draw", "encode", "save", "total"
+)
+
+# Seconds; spans sub-millisecond header checks to multi-minute videos
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+STAGE_SECONDS = Histogram(
+    "yolo_stage_seconds",
+    "Time spent per request in each processing stage",
+    ["stage", "model", "endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+
+REQUEST_SECONDS = Histogram(
+    "yolo_http_request_seconds",
+    "HTTP request latency by route",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "yolo_http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+
+EXECUTOR_REJECTED = Counter(
+    "yolo_executor_rejected",
+    "Requests rejected because the inference executor was saturated"
+)
+
+RESULT_STORE_EVICTIONS = Counter(
+    "yolo_result_store_evictions_total",
+    "Result files deleted by the result store",
+    ["reason"]
+)
+
+RESULT_STORE_SWEEP_SECONDS = Histogram(
+    "yolo_result_store_sweep_seconds",
+    "Duration of result store sweeps",
+    buckets=LATENCY_BUCKETS
+)
+
+
+def observe_stage(stage: str, model: str, endpoint: str, seconds: float):
+    """Record the time a request spent in a stage."""
+    STAGE_SECONDS.labels(stage=stage, model=model, endpoint=endpoint).observe(seconds)
+
+
+@contextmanager
+def stage_timer(stage: str, model: str, endpoint: str) -> Iterator[None]:
+    """Time the enclosed block as one stage of a request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, model, endpoint, time.perf_counter() - started)
+
+
+def register_runtime_gauges(model_manager, detection_service, job_manager):
+    """Expose live service state as gauges evaluated at scrape time.
+
+    Process RSS, CPU and open file descriptors come from the default
+    prometheus_client process collector (process_resident_memory_bytes).
+    """
+    Gauge("yolo_models_loaded", "Models resident in memory").set_function(
+        lambda: len(model_manager.loaded_models)
+    )
+    Gauge("yolo_models_resident_bytes", "Bytes held by resident models").set_function(
+        lambda: sum(resident.size_bytes for resident in model_manager.residency.values())
+    )
+    Gauge("yolo_executor_in_flight", "Requests admitted to the inference executor").set_function(
+        lambda: detection_service.executor.in_flight
+    )
+    Gauge("yolo_executor_queue_depth", "Inference calls waiting for a free executor worker").set_function(
+        lambda: detection_service.executor.queue_depth
+    )
+    Gauge("yolo_batch_queue_depth", "Images waiting to join an inference batch").set_function(
+        lambda: sum(detection_service.batcher.queue_depth().values())
+    )
+    Gauge("yolo_video_jobs_active", "Video jobs queued or running").set_function(
+        job_manager.active_count
+    )
+    Gauge("yolo_result_store_bytes", "Bytes of result files on disk").set_function(
+        lambda: detection_service.result_store.bytes
+    )
+    Gauge("yolo_result_store_files", "Result files on disk").set_function(
+        lambda: sum(detection_service.result_store.get_stats()["files"].values())
+    )
+
+
+def render_metrics() -> bytes:
+    """Serialize all metrics in the Prometheus text format."""
+    return generate_latest()
+
@@ -0,0 +1,75 @@
+"""Server worker identity and the CPU thread budget shared by torch, OpenCV and ONNX Runtime."""
+
+import os
+import sys
+
+from app.config import settings
+from app.utils.logger import app_logger as logger
+
+# Set by the pre-fork launcher in each worker process
+WORKER_SLOT_ENV = "YOLO_WORKER_SLOT"
+WORKER_RESPAWNED_ENV = "YOLO_WORKER_RESPAWNED"
+
+# Intra-op thread budget of this process, applied to torch when it is first imported
+_thread_budget = None
+_torch_configured = False
+
+
+def worker_slot() -> int:
+    """Slot of this server worker (0 when running a single server)."""
+    return int(os.environ.get(WORKER_SLOT_ENV, "0"))
+
+
+def is_primary_worker() -> bool:
+    """Whether this worker runs the process-wide housekeeping (result sweeps, job recovery)."""
+    return worker_slot() == 0
+
+
+def is_respawned_worker() -> bool:
+    """Whether this worker replaces one that exited while the server kept running."""
+    return os.environ.get(WORKER_RESPAWNED_ENV) == "1"
+
+
+def intra_op_threads(processes: int = None) -> int:
+    """Intra-op threads per process: torch_threads, or the CPU cores split evenly across processes."""
+    if settings.torch_threads:
+        return settings.torch_threads
+    processes = max(1, processes or settings.workers)
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    return max(1, cores // processes)
+
+
+def configure_threads(processes: int = None) -> int:
+    """Apply the per-process thread budget to OpenCV, and to torch now or when it is first imported."""
+    import cv2
+
+    global _thread_budget
+    _thread_budget = intra_op_threads(processes)
+    cv2.setNumThreads(_thread_budget)
+    # Already imported when forked from a parent that loaded models
+    if "torch" in sys.modules:
+        _configure_torch(sys.modules["torch"])
+    return _thread_budget
+
+
+def import_torch():
+    """Import torch on first use, applying this process's thread budget to it."""
+    import torch
+
+    if not _torch_configured:
+        _configure_torch(torch)
+    return torch
+
+
+def _configure_torch(torch):
+    """Set torch's intra-op and inter-op thread counts."""
+    global _torch_configured
+    _torch_configured = True
+    threads = _thread_budget or intra_op_threads()
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(settings.torch_interop_threads)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started
+        pass
+    logger.info(f"CPU threads per process: {threads} intra-op, {torch.get_num_interop_threads()} inter-op")
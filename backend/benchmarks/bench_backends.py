@@ -0,0 +1,115 @@
+"""Benchmark: PyTorch vs. ONNX Runtime (FP32 / INT8) CPU latency, with output parity against PyTorch.
+
+Run from the backend directory:
+    python -m benchmarks.bench_backends [--model yolov8n] [--image photo.jpg] [--backends torch onnx onnx_int8]
+
+Artifacts are exported on first use into MODEL_CACHE_DIR. Without --image a
+synthetic 1280x720 scene is used. Parity is measured against the PyTorch
+boxes, so the run fails when PyTorch finds none (pick an image with
+objects or lower --conf); tests/test_backend_parity.py checks it with
+fixed tolerances.
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.models.backends import BACKENDS, ensure_artifact, load_artifact, run_detection
+from app.services.detections import Detections
+from app.services.tracker import iou_matrix
+
+REPEATS = 30
+PARITY_IOU = 0.5
+
+
+def make_scene(size=(1280, 720)) -> np.ndarray:
+    """Draw a synthetic scene with a few solid shapes on noise."""
+    width, height = size
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    cv2.rectangle(image, (200, 150), (420, 600), (0, 0, 255), -1)
+    cv2.rectangle(image, (700, 300), (1100, 520), (40, 160, 40), -1)
+    cv2.circle(image, (560, 200), 90, (255, 0, 0), -1)
+    return image
+
+
+def time_backend(model, image: np.ndarray, params: Dict) -> List[float]:
+    """Get per-call latencies in milliseconds after a short warmup."""
+    for _ in range(3):
+        run_detection(model, [image], params)
+    latencies = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run_detection(model, [image], params)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def parity(reference: Detections, candidate: Detections) -> Dict[str, float]:
+    """Match boxes of the same class by IoU and summarize how closely a backend follows the reference."""
+    if not len(reference):
+        raise ValueError("The reference has no boxes, so parity cannot be measured")
+    ious = iou_matrix(reference.xyxy, candidate.xyxy)
+    ious[reference.class_id[:, None] != candidate.class_id[None, :]] = 0.0
+
+    matched_ious, conf_diffs = [], []
+    if ious.size:
+        for row in np.argsort(-ious.max(axis=1)):
+            column = int(ious[row].argmax())
+            if ious[row, column] < PARITY_IOU:
+                continue
+            matched_ious.append(ious[row, column])
+            conf_diffs.append(abs(reference.confidence[row] - candidate.confidence[column]))
+            ious[:, column] = 0.0
+
+    return {
+        "boxes": len(candidate),
+        "matched": len(matched_ious) / len(reference),
+        "mean_iou": float(np.mean(matched_ious)) if matched_ious else 0.0,
+        "max_conf_diff": float(np.max(conf_diffs)) if conf_diffs else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="yolov8n", choices=list(settings.available_models))
+    parser.add_argument("--image", help="Image to run (default: synthetic scene)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx_int8"], choices=BACKENDS)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=settings.detection_confidence_threshold)
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image) if args.image else make_scene()
+    params = {"conf": args.conf, "imgsz": args.imgsz, "verbose": False}
+
+    results = {}
+    for backend in args.backends:
+        model = load_artifact(ensure_artifact(args.model, backend), backend)
+        latencies = time_backend(model, image, params)
+        results[backend] = (latencies, run_detection(model, [image], params)[0])
+
+    reference = results["torch"][1] if "torch" in results else None
+    parity_unchecked = reference is not None and not len(reference)
+    if parity_unchecked:
+        reference = None
+    print(f"{'backend':>10} | {'mean ms':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'boxes':>5} | "
+          f"{'matched':>7} | {'mean IoU':>8} | {'max dconf':>9}")
+    for backend, (latencies, detections) in results.items():
+        row = f"{backend:>10} | {np.mean(latencies):>8.1f} | {np.percentile(latencies, 50):>7.1f} | " \
+              f"{np.percentile(latencies, 95):>7.1f} | {len(detections):>5}"
+        if reference is not None:
+            match = parity(reference, detections)
+            row += f" | {match['matched']:>7.1%} | {match['mean_iou']:>8.3f} | {match['max_conf_diff']:>9.4f}"
+        print(row)
+
+    if parity_unchecked:
+        sys.exit("torch found no boxes, parity not checked: use --image with objects or a lower --conf")
+
+
+if __name__ == "__main__":
+    main()
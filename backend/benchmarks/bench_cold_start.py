@@ -0,0 +1,163 @@
+"""Benchmark: API cold start — import time of the app and time until /health answers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_cold_start [--runs 5] [--top 12] [--preload yolov8n]
+        [--budget 1.0] [--output cold_start.json]
+
+Each run starts a fresh interpreter. The import profile comes from
+`python -X importtime -c "import app.main"` and is summed per top-level
+package, so a heavy dependency creeping back into the startup path (torch,
+ultralytics, ...) shows up by name. The server timing launches uvicorn and
+polls /health until it answers; with --preload the models load in the
+background and the time until /health stops reporting models_preloading
+is recorded too. --budget exits non-zero when the median time to a healthy
+response exceeds it, so the check can run in CI.
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Packages that must not be imported to serve /health
+HEAVY_PACKAGES = ("torch", "torchvision", "ultralytics", "onnxruntime", "openvino", "PIL", "matplotlib")
+HEALTH_TIMEOUT = 60.0
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def profile_import(env: Dict[str, str]) -> Tuple[float, Dict[str, float]]:
+    """Import app.main in a fresh interpreter; returns its cumulative seconds and self seconds per package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, _, module = match.groups()
+        packages[module.split(".")[0]] += int(self_us) / 1e6
+        if module == "app.main":
+            total = int(cumulative_us) / 1e6
+    return total, packages
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_health(port: int) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1.0) as response:
+            return json.loads(response.read())
+    except OSError:
+        return None
+
+
+def time_server_start(env: Dict[str, str], preload: bool) -> Dict[str, Optional[float]]:
+    """Launch uvicorn; time until /health answers and, when preloading, until the models are ready."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    healthy = ready = None
+    try:
+        while time.perf_counter() - started < HEALTH_TIMEOUT and server.poll() is None:
+            health = _get_health(port)
+            if health is not None:
+                elapsed = time.perf_counter() - started
+                healthy = healthy or elapsed
+                if not preload or not health.get("models_preloading"):
+                    ready = elapsed
+                    break
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health_s": healthy, "models_ready_s": ready if preload else None}
+
+
+def _median(values: List[Optional[float]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=12, help="Packages listed by import time")
+    parser.add_argument("--preload", nargs="*", default=[], help="Models to preload at startup")
+    parser.add_argument("--budget", type=float, help="Fail when the median time to /health exceeds this (s)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep results, jobs and logs out of the working tree
+        env = {
+            "RESULT_DIR": os.path.join(tmp, "static"),
+            "JOB_DIR": os.path.join(tmp, "jobs"),
+            "JOB_DB_PATH": os.path.join(tmp, "jobs", "jobs.db"),
+            "RENDER_PENDING_DIR": os.path.join(tmp, "pending_renders"),
+            "SCRATCH_DIR": os.path.join(tmp, "scratch"),
+            "LOG_FILE": os.path.join(tmp, "logs", "app.log"),
+            "ERROR_LOG_FILE": os.path.join(tmp, "logs", "error.log"),
+            "LOG_LEVEL": "WARNING",
+            **os.environ,
+            "PRELOAD_MODELS": json.dumps(args.preload)
+        }
+
+        imports = [profile_import(env) for _ in range(args.runs)]
+        starts = [time_server_start(env, bool(args.preload)) for _ in range(args.runs)]
+
+    packages = {
+        name: statistics.median(run[1].get(name, 0.0) for run in imports)
+        for name in set().union(*(run[1] for run in imports))
+    }
+    results = {
+        "runs": args.runs,
+        "preload": args.preload,
+        "import_app_s": statistics.median(run[0] for run in imports),
+        "packages_s": dict(sorted(packages.items(), key=lambda item: -item[1])),
+        "heavy_imported": [name for name in HEAVY_PACKAGES if name in packages],
+        "health_s": _median([start["health_s"] for start in starts]),
+        "models_ready_s": _median([start["models_ready_s"] for start in starts])
+    }
+
+    print(f"import app.main: {results['import_app_s']:.3f}s (median of {args.runs})")
+    for name, seconds in list(results["packages_s"].items())[:args.top]:
+        print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+    print(f"heavy packages imported at startup: {', '.join(results['heavy_imported']) or 'none'}")
+    health = results["health_s"]
+    print(f"first /health response: {f'{health:.3f}s' if health is not None else 'never'}")
+    if args.preload:
+        ready = results["models_ready_s"]
+        print(f"models {', '.join(args.preload)} ready: {f'{ready:.3f}s' if ready is not None else 'never'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.budget is not None and (health is None or health > args.budget):
+        print(f"Cold start exceeds the {args.budget:.3f}s budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Benchmark: per-frame letterbox copies vs. letterboxing into reused buffers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_preprocess [--size 1920x1080] [--imgsz 640] [--weights models/yolov8n.pt]
+
+The first part times decode plus preprocessing alone and reports the
+memory each frame allocates (tracemalloc peak above the steady state).
+With --weights, the staged video pipeline is also run end to end with and
+without buffer reuse on a synthetic clip.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import cv2
+import numpy as np
+
+from app.models.backends import letterbox, run_detection
+from app.services.detections import Detections
+from app.services.frame_preprocessing import LetterboxBatcher
+from app.services.rendering import draw_detections
+from app.services.video_pipeline import VideoPipeline
+
+FRAMES = 120
+BATCH_SIZE = 4
+
+
+def make_clip(path: str, size, frames: int = FRAMES, fps: int = 30):
+    """Write a synthetic clip with a moving shape."""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    background = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = background.copy()
+        x = (i * 7) % (width - 200)
+        cv2.rectangle(frame, (x, height // 4), (x + 160, height // 2), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def preprocess_copies(imgsz: int) -> Callable:
+    """Previous path: a fresh decoded frame, then letterbox, stack and transpose copies."""
+    def step(capture: cv2.VideoCapture, batch):
+        ret, frame = capture.read()
+        if not ret:
+            return False
+        batch.append(letterbox(frame, imgsz)[0])
+        if len(batch) == BATCH_SIZE:
+            tensor = np.ascontiguousarray(np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+            tensor /= 255.0
+            batch.clear()
+        return True
+    return step
+
+
+def preprocess_reused(imgsz: int, size) -> Callable:
+    """New path: decode into recycled frames and letterbox into the preallocated batch."""
+    batcher = LetterboxBatcher(size, imgsz, BATCH_SIZE)
+    frames = [np.empty((size[1], size[0], 3), dtype=np.uint8) for _ in range(BATCH_SIZE)]
+
+    def step(capture: cv2.VideoCapture, batch):
+        ret, frame = capture.read(frames[len(batch)])
+        if not ret:
+            return False
+        batch.append(frame)
+        if len(batch) == BATCH_SIZE:
+            batcher.fill(batch)
+            batch.clear()
+        return True
+    return step
+
+
+def measure(video_path: str, step: Callable) -> Dict[str, float]:
+    """Run a preprocessing step over the clip; get FPS and transient bytes allocated per frame."""
+    capture = cv2.VideoCapture(video_path)
+    batch = []
+    for _ in range(BATCH_SIZE):  # warm up buffers and the decoder
+        step(capture, batch)
+
+    frames, peaks = 0, []
+    tracemalloc.start()
+    start = time.perf_counter()
+    while True:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        if not step(capture, batch):
+            break
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    capture.release()
+    return {"fps": frames / elapsed, "bytes_per_frame": float(np.mean(peaks)) if peaks else 0.0}
+
+
+def run_pipeline(model, video_path: str, output_path: str, size, imgsz: int, reuse: bool):
+    """Run the staged pipeline, inferring every frame, with or without buffer reuse."""
+    capture = cv2.VideoCapture(video_path)
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), 30, size)
+    infer_batch = lambda frames: [
+        Detections.from_result(result) for result in model(frames, imgsz=imgsz, verbose=False)
+    ]
+    if reuse:
+        infer_batch = LetterboxBatcher(size, imgsz, BATCH_SIZE).wrap(
+            lambda batch: run_detection(model, batch, {})
+        )
+    pipeline = VideoPipeline(
+        capture=capture,
+        writer=writer,
+        infer_batch=infer_batch,
+        draw=draw_detections,
+        should_infer=lambda index, frame: True,
+        batch_size=BATCH_SIZE,
+        reuse_frames=reuse
+    )
+    result = pipeline.run()
+    writer.release()
+    capture.release()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", default="1920x1080", help="Synthetic clip size (WIDTHxHEIGHT)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--weights", help="Also run the full pipeline with these weights")
+    args = parser.parse_args()
+    size = tuple(int(part) for part in args.size.split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, "reference.mp4")
+        make_clip(video_path, size)
+
+        before = measure(video_path, preprocess_copies(args.imgsz))
+        after = measure(video_path, preprocess_reused(args.imgsz, size))
+        print(f"decode + preprocess ({args.size} -> imgsz {args.imgsz}, batches of {BATCH_SIZE}):")
+        for name, stats in (("per-frame copies", before), ("reused buffers", after)):
+            print(f"  {name:>16}: {stats['fps']:7.1f} FPS, {stats['bytes_per_frame'] / 1024:9.1f} KiB allocated/frame")
+
+        if args.weights:
+            from ultralytics import YOLO
+
+            model = YOLO(args.weights)
+            model(np.zeros((size[1], size[0], 3), dtype=np.uint8), imgsz=args.imgsz, verbose=False)  # warmup
+            for reuse in (False, True):
+                result = run_pipeline(
+                    model, video_path, os.path.join(tmp, f"out_{reuse}.mp4"), size, args.imgsz, reuse
+                )
+                label = "reused buffers" if reuse else "per-frame copies"
+                print(f"  pipeline {label:>16}: {result.fps:.1f} FPS, stages {result.stats()}")
+
+
+if __name__ == "__main__":
+    main()
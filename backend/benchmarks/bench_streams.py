@@ -0,0 +1,136 @@
+"""Benchmark: many server-side streams sharing a fixed inference budget.
+
+Run from the backend directory:
+    python -m benchmarks.bench_streams [--streams 8 24 48] [--slots 8] [--max-fps 5] [--duration 15]
+
+Every stream loops a synthetic clip (read at its own frame rate, like a
+camera) through the StreamManager. Models are stubs with a fixed latency
+unless --real-models is given, so the numbers show the scheduling and
+decode overhead rather than model speed. For each stream count the
+benchmark reports the aggregate and per-stream inference rates, the
+share of frames replaced before inference, the mean batch size, the
+latency from capture to published result, process CPU and peak RSS.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.load_test import PeakRss, make_video, parse_size
+
+
+async def run_scenario(args, clip: str, streams: int) -> Dict[str, Any]:
+    """Run a number of streams for the configured duration and collect their statistics."""
+    from app.models.yolo_manager import YOLOModelManager
+    from app.services.detection_service import DetectionService
+    from app.services.stream_manager import StreamManager
+
+    service = DetectionService(YOLOModelManager())
+    manager = StreamManager(service, max_streams=streams, inference_slots=args.slots)
+    latencies: List[float] = []
+    collectors: List[asyncio.Task] = []
+
+    async def collect(stream):
+        with stream.subscribe() as queue:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                if event["type"] == "detections":
+                    latencies.append(event["latency_ms"])
+
+    try:
+        running = [await manager.add(clip, args.model, {}, args.max_fps, True) for _ in range(streams)]
+        collectors.extend(asyncio.create_task(collect(stream)) for stream in running)
+        # Let models load and decoders settle before measuring
+        await asyncio.sleep(args.warmup)
+        latencies.clear()
+        inferred_before = {stream.id: stream.frames_inferred for stream in running}
+        dropped_before = sum(stream.frames_dropped for stream in running)
+        batches_before = service.batcher.batches_total
+        requests_before = service.batcher.requests_total
+        cpu_before, started = sum(os.times()[:2]), time.perf_counter()
+
+        with PeakRss() as rss:
+            await asyncio.sleep(args.duration)
+
+        elapsed = time.perf_counter() - started
+        cpu = (sum(os.times()[:2]) - cpu_before) / elapsed
+        rates = [(stream.frames_inferred - inferred_before[stream.id]) / elapsed for stream in running]
+        inferred = sum(stream.frames_inferred for stream in running) - sum(inferred_before.values())
+        dropped = sum(stream.frames_dropped for stream in running) - dropped_before
+        batches = service.batcher.batches_total - batches_before
+        requests = service.batcher.requests_total - requests_before
+    finally:
+        for stream_id in list(manager.streams):
+            await manager.remove(stream_id)
+        for task in collectors:
+            task.cancel()
+        service.executor.shutdown()
+
+    return {
+        "streams": streams,
+        "aggregate_fps": sum(rates),
+        "stream_fps_min": min(rates),
+        "stream_fps_mean": statistics.mean(rates),
+        "drop_ratio": dropped / max(1, dropped + inferred),
+        "mean_batch": requests / batches if batches else 0.0,
+        "latency_p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "latency_p95_ms": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0,
+        "cpu_cores": cpu,
+        "peak_rss_mb": rss.peak / (1024 * 1024)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", nargs="+", type=int, default=[8, 24, 48])
+    parser.add_argument("--slots", type=int, default=8, help="Inference slots shared by all streams")
+    parser.add_argument("--max-fps", type=float, default=5.0, help="Per-stream inference cap")
+    parser.add_argument("--size", default="640x360", help="Clip resolution")
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds per scenario")
+    parser.add_argument("--model", default="yolov8n")
+    parser.add_argument("--real-models", action="store_true", help="Load real weights instead of stubs")
+    parser.add_argument("--stub-batch-ms", type=float, default=20.0, help="Stub latency per inference call")
+    parser.add_argument("--stub-image-ms", type=float, default=5.0, help="Stub latency per image")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep results and logs out of the working tree; settings are read on first import
+        os.environ.setdefault("RESULT_DIR", os.path.join(tmp, "static"))
+        os.environ.setdefault("RENDER_PENDING_DIR", os.path.join(tmp, "pending_renders"))
+        os.environ.setdefault("SCRATCH_DIR", os.path.join(tmp, "scratch"))
+        os.environ.setdefault("LOG_FILE", os.path.join(tmp, "logs", "app.log"))
+        os.environ.setdefault("ERROR_LOG_FILE", os.path.join(tmp, "logs", "error.log"))
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
+        # The streams read a local clip
+        os.environ["STREAM_LOCAL_SOURCES"] = "true"
+        if not args.real_models:
+            os.environ["INFERENCE_EXECUTOR"] = "thread"
+            from benchmarks.stub_model import install_stub_models
+
+            install_stub_models(args.stub_batch_ms, args.stub_image_ms)
+
+        clip = os.path.join(tmp, "clip.mp4")
+        make_video(clip, parse_size(args.size), frames=90)
+
+        print(f"{args.slots} inference slots, {args.max_fps:g} FPS cap per stream, {args.size} clips at 30 FPS:")
+        for streams in args.streams:
+            result = asyncio.run(run_scenario(args, clip, streams))
+            print(
+                f"  {streams:3d} streams: {result['aggregate_fps']:6.1f} FPS total, per stream "
+                f"min {result['stream_fps_min']:4.1f} mean {result['stream_fps_mean']:4.1f} | "
+                f"dropped {result['drop_ratio']:5.1%} | batch {result['mean_batch']:4.1f} | "
+                f"latency p50 {result['latency_p50_ms']:6.1f} p95 {result['latency_p95_ms']:6.1f} ms | "
+                f"CPU {result['cpu_cores']:4.2f} cores | RSS {result['peak_rss_mb']:6.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: sequential video loop vs. the staged decode/infer/encode pipeline.
+
+Run from the backend directory:
+    python -m benchmarks.bench_video_pipeline [--video clip.mp4] [--weights models/yolov8n.pt]
+
+Without --video a synthetic 640x480 clip is generated.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from app.services.rendering import draw_detections
+from app.services.detections import Detections
+from app.services.video_pipeline import VideoPipeline
+
+STRIDE = 3
+
+
+def make_clip(path: str, frames: int = 300, size=(640, 480), fps: int = 30):
+    """Write a synthetic clip with moving shapes."""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = background.copy()
+        x = (i * 5) % (width - 100)
+        cv2.rectangle(frame, (x, 100), (x + 80, 260), (0, 0, 255), -1)
+        cv2.circle(frame, (width - x - 50, 350), 40, (255, 0, 0), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def open_io(video_path: str, output_path: str):
+    """Open a capture and a matching writer."""
+    cap = cv2.VideoCapture(video_path)
+    fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    return cap, out
+
+
+def run_sequential(model, video_path: str, output_path: str) -> float:
+    """Previous loop: read, infer every third frame, draw and write one after another."""
+    cap, out = open_io(video_path, output_path)
+    start = time.perf_counter()
+    frames = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frames % STRIDE == 0:
+            detections = Detections.from_result(model(frame, verbose=False)[0])
+            frame = draw_detections(frame, detections)
+        out.write(frame)
+        frames += 1
+    out.release()
+    cap.release()
+    return frames / (time.perf_counter() - start)
+
+
+def run_pipeline(model, video_path: str, output_path: str, batch_size: int):
+    """Staged pipeline with the same inference stride."""
+    cap, out = open_io(video_path, output_path)
+    pipeline = VideoPipeline(
+        capture=cap,
+        writer=out,
+        infer_batch=lambda frames: [Detections.from_result(r) for r in model(frames, verbose=False)],
+        draw=draw_detections,
+        should_infer=lambda index, frame: index % STRIDE == 0,
+        batch_size=batch_size
+    )
+    result = pipeline.run()
+    out.release()
+    cap.release()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", help="Reference clip (default: synthetic)")
+    parser.add_argument("--weights", default="models/yolov8n.pt")
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    model = YOLO(args.weights)
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = args.video or os.path.join(tmp, "reference.mp4")
+        if not args.video:
+            make_clip(video_path)
+
+        model(np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)  # warmup
+        sequential_fps = run_sequential(model, video_path, os.path.join(tmp, "sequential.mp4"))
+        result = run_pipeline(model, video_path, os.path.join(tmp, "pipeline.mp4"), args.batch_size)
+
+    print(f"sequential loop: {sequential_fps:.1f} FPS")
+    print(f"staged pipeline: {result.fps:.1f} FPS ({result.fps / sequential_fps:.2f}x)")
+    for name, stage in result.stats().items():
+        print(f"  {name:>6}: {stage}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Benchmark: memory of N pre-forked workers vs. N independently started uvicorn workers.
+
+Run from the backend directory (Linux only, reads /proc/<pid>/smaps_rollup):
+    python -m benchmarks.bench_worker_memory [--workers 4] [--weights models/yolov8n.pt] [--model yolov8n]
+
+Both modes preload and warm up the same model in every worker. RSS counts
+shared pages once per process, so the comparison is made on PSS (shared
+pages split between the processes mapping them) and USS (private pages).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+PORT = 8765
+STARTUP_TIMEOUT = 300
+
+
+def descendants(pid: int) -> List[int]:
+    """Get the process ids of all descendants of a process."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    found, pending = [], [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def memory(pid: int) -> Dict[str, int]:
+    """Get RSS, PSS and USS of a process in KiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    }
+
+
+def wait_ready(process: subprocess.Popen, workers: int, settle: float):
+    """Wait until every worker has answered /health, then let memory settle."""
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/health", timeout=2) as response:
+                if response.status == 200 and len(descendants(process.pid)) >= workers:
+                    time.sleep(settle)
+                    return
+        except OSError:
+            pass
+        time.sleep(1)
+    raise TimeoutError("Server did not start in time")
+
+
+def measure(command: List[str], env: Dict[str, str], workers: int, settle: float) -> Dict[str, object]:
+    """Start a server, read the memory of its processes and stop it."""
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(process, workers, settle)
+        pids = [process.pid] + descendants(process.pid)
+        processes = {pid: memory(pid) for pid in pids}
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    # Workers are the processes that hold the model; skip the parent and helpers
+    worker_memory = sorted((stats for stats in processes.values()), key=lambda stats: -stats["rss"])[:workers]
+    return {
+        "processes": len(processes),
+        "total": {key: sum(stats[key] for stats in processes.values()) for key in ("rss", "pss", "uss")},
+        "per_worker": {
+            key: sum(stats[key] for stats in worker_memory) / max(1, len(worker_memory))
+            for key in ("rss", "pss", "uss")
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--weights", default="models/yolov8n.pt", help="PyTorch weights served as --model")
+    parser.add_argument("--model", default="yolov8n")
+    parser.add_argument("--settle", type=float, default=10.0, help="Seconds to wait after startup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = os.path.join(tmp, "models")
+        os.makedirs(model_dir)
+        shutil.copy(args.weights, os.path.join(model_dir, f"{args.model}.pt"))
+        env = dict(
+            os.environ,
+            PORT=str(PORT),
+            WORKERS=str(args.workers),
+            DEBUG="false",
+            MODEL_CACHE_DIR=model_dir,
+            PRELOAD_MODELS=json.dumps([args.model]),
+            DEFAULT_MODEL_BACKEND="torch",
+            RESULT_DIR=os.path.join(tmp, "static"),
+            JOB_DB_PATH=os.path.join(tmp, "jobs", "jobs.db"),
+            LOG_FILE=os.path.join(tmp, "logs", "app.log"),
+            ERROR_LOG_FILE=os.path.join(tmp, "logs", "error.log")
+        )
+
+        modes = {
+            "independent (uvicorn --workers)": [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--port", str(PORT), "--workers", str(args.workers), "--log-level", "warning"
+            ],
+            "pre-fork (main.py)": [sys.executable, "main.py"]
+        }
+        print(f"{args.workers} workers, model {args.model} preloaded (KiB):")
+        for name, command in modes.items():
+            result = measure(command, env, args.workers, args.settle)
+            per_worker, total = result["per_worker"], result["total"]
+            print(
+                f"  {name:>32}: per worker RSS {per_worker['rss']:9.0f}  PSS {per_worker['pss']:9.0f}  "
+                f"USS {per_worker['uss']:9.0f} | all {result['processes']} processes "
+                f"PSS {total['pss']:9.0f}  USS {total['uss']:9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
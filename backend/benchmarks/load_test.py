@@ -0,0 +1,376 @@
+"""Load test: drive the detection API with synthetic uploads; report throughput, latency percentiles and peak RSS.
+
+Run from the backend directory:
+    python -m benchmarks.load_test [--transport inprocess|socket] [--endpoints image batch video]
+        [--models yolov8n] [--image-sizes 640x480 1920x1080] [--concurrency 1 4 16]
+        [--requests 40] [--real-models] [--output results.json]
+    python -m benchmarks.load_test --compare baseline.json results.json [--threshold 0.1]
+
+The app runs inside this process, either called through ASGI directly
+(inprocess) or served by uvicorn on a local port (socket). By default every
+model is a deterministic stub with a fixed simulated latency, so runs are
+repeatable without weights; --real-models loads the configured weights.
+Each endpoint x model x size x concurrency scenario becomes one entry of
+the JSON results, which --compare diffs between two runs (e.g. two commits).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+ENDPOINTS = {"image": "/api/detect/image", "batch": "/api/detect/batch", "video": "/api/detect/video"}
+IMAGE_VARIANTS = 8  # distinct images per size, cycled through the requests
+SOCKET_PORT = 8799
+REQUEST_TIMEOUT = 600.0
+
+
+class PeakRss:
+    """Samples this process's resident set size in the background and keeps the peak."""
+
+    def __init__(self, interval: float = 0.01):
+        """Initialize the sampler."""
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def current() -> int:
+        """Resident set size in bytes (peak so far where /proc is unavailable)."""
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRss":
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """Parse WIDTHxHEIGHT."""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def make_image(size: Tuple[int, int], seed: int) -> np.ndarray:
+    """Draw a synthetic scene with a few solid shapes on noise."""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for _ in range(3):
+        x, y = int(rng.integers(0, width * 3 // 4)), int(rng.integers(0, height * 3 // 4))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(image, (x, y), (x + width // 5, y + height // 4), color, -1)
+    return image
+
+
+def make_video(path: str, size: Tuple[int, int], frames: int, fps: int = 30):
+    """Write a synthetic clip with a moving shape."""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    background = make_image(size, 0)
+    for i in range(frames):
+        frame = background.copy()
+        x = (i * 9) % max(1, width - width // 5)
+        cv2.rectangle(frame, (x, height // 3), (x + width // 5, height * 2 // 3), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def build_payloads(args, tmp: str) -> Dict[Tuple[str, str], List[List[Tuple[str, Tuple[str, bytes, str]]]]]:
+    """Encode the multipart files of every (endpoint, size), a few distinct variants each."""
+    payloads = {}
+    for size_name in args.image_sizes:
+        size = parse_size(size_name)
+        images = []
+        for seed in range(IMAGE_VARIANTS):
+            ok, encoded = cv2.imencode(".jpg", make_image(size, seed), [cv2.IMWRITE_JPEG_QUALITY, 90])
+            images.append(encoded.tobytes())
+        if "image" in args.endpoints:
+            payloads[("image", size_name)] = [
+                [("file", (f"bench_{seed}.jpg", data, "image/jpeg"))] for seed, data in enumerate(images)
+            ]
+        if "batch" in args.endpoints:
+            payloads[("batch", size_name)] = [[
+                ("files", (f"bench_{index}.jpg", images[(offset + index) % len(images)], "image/jpeg"))
+                for index in range(args.batch_images)
+            ] for offset in range(IMAGE_VARIANTS)]
+
+    if "video" in args.endpoints:
+        for size_name in args.video_sizes:
+            path = os.path.join(tmp, f"bench_{size_name}.mp4")
+            make_video(path, parse_size(size_name), args.video_frames)
+            with open(path, "rb") as f:
+                payloads[("video", size_name)] = [[("file", ("bench.mp4", f.read(), "video/mp4"))]]
+    return payloads
+
+
+async def send(client, endpoint: str, model: str, files) -> Tuple[int, float]:
+    """Send one request and read the whole response; returns the status and latency in seconds."""
+    data = {"model": model}
+    if endpoint == "batch":
+        data["render"] = "none"
+    started = time.perf_counter()
+    async with client.stream("POST", ENDPOINTS[endpoint], data=data, files=files) as response:
+        async for _ in response.aiter_bytes():
+            pass
+    return response.status_code, time.perf_counter() - started
+
+
+async def run_scenario(client, endpoint: str, model: str, size: str, variants, concurrency: int,
+                       requests: int, warmup: int) -> Dict[str, Any]:
+    """Send requests from concurrency parallel clients and summarize the results."""
+    for index in range(warmup):
+        await send(client, endpoint, model, variants[index % len(variants)])
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    next_request = iter(range(requests))
+
+    async def client_loop():
+        for index in next_request:
+            status, latency = await send(client, endpoint, model, variants[index % len(variants)])
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(latency)
+
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    milliseconds = np.array(latencies) * 1000.0
+    percentiles = np.percentile(milliseconds, [50, 95, 99]).tolist() if len(milliseconds) else [None] * 3
+    return {
+        "endpoint": endpoint,
+        "model": model,
+        "size": size,
+        "concurrency": concurrency,
+        "requests": requests,
+        "succeeded": len(latencies),
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": percentiles[0],
+            "p95": percentiles[1],
+            "p99": percentiles[2],
+            "mean": float(milliseconds.mean()) if len(milliseconds) else None,
+            "max": float(milliseconds.max()) if len(milliseconds) else None
+        },
+        "peak_rss_mb": round(rss.peak / (1024 * 1024), 1)
+    }
+
+
+async def run_all(args, payloads) -> List[Dict[str, Any]]:
+    """Start the app on the chosen transport and run every scenario against it."""
+    import httpx
+    import uvicorn
+
+    from app.main import app
+
+    results = []
+
+    async def run_with(client):
+        for (endpoint, size), variants in payloads.items():
+            for model in args.models:
+                for concurrency in args.concurrency:
+                    requests = args.video_requests if endpoint == "video" else args.requests
+                    result = await run_scenario(
+                        client, endpoint, model, size, variants, concurrency, requests, args.warmup
+                    )
+                    results.append(result)
+                    latency = result["latency_ms"]
+                    p50 = f"{latency['p50']:.1f}" if latency["p50"] is not None else "-"
+                    p95 = f"{latency['p95']:.1f}" if latency["p95"] is not None else "-"
+                    print(
+                        f"{endpoint:>6} {model:>8} {size:>10} c={concurrency:<3} "
+                        f"{result['throughput_rps']:8.2f} req/s  p50 {p50:>8} ms  p95 {p95:>8} ms  "
+                        f"RSS {result['peak_rss_mb']:7.1f} MB  {result['status_codes']}"
+                    )
+
+    if args.transport == "inprocess":
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=REQUEST_TIMEOUT) as client:
+                await run_with(client)
+        return results
+
+    # The server runs its own event loop (and the app's lifespan) on a background thread
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="bench-server", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Benchmark server failed to start")
+        await asyncio.sleep(0.05)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=REQUEST_TIMEOUT) as client:
+            await run_with(client)
+    finally:
+        server.should_exit = True
+        thread.join()
+    return results
+
+
+def run_metadata(args) -> Dict[str, Any]:
+    """Describe the code, machine and configuration a run was made with."""
+    from app.config import settings
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "transport": args.transport,
+        "stub_models": not args.real_models,
+        "stub_latency_ms": {"batch": args.stub_batch_ms, "image": args.stub_image_ms},
+        "settings": {
+            "inference_executor": settings.inference_executor,
+            "inference_workers": settings.inference_workers,
+            "inference_batching_enabled": settings.inference_batching_enabled,
+            "inference_max_batch_size": settings.inference_max_batch_size,
+            "default_model_backend": settings.default_model_backend,
+            "result_cache_enabled": settings.result_cache_enabled
+        }
+    }
+
+
+def model_load_metrics() -> Dict[str, Any]:
+    """Load, read and warmup times the model manager recorded during the run."""
+    from app.api.routes import model_manager
+
+    return model_manager.get_load_metrics()
+
+
+def scenario_key(result: Dict[str, Any]) -> Tuple:
+    return result["endpoint"], result["model"], result["size"], result["concurrency"]
+
+
+def compare(baseline_path: str, candidate_path: str, threshold: float) -> int:
+    """Print per-scenario changes between two result files; returns 1 if any regressed past threshold."""
+    with open(baseline_path) as f:
+        baseline = {scenario_key(result): result for result in json.load(f)["results"]}
+    with open(candidate_path) as f:
+        candidate = json.load(f)["results"]
+
+    regressions = 0
+    for result in candidate:
+        before = baseline.get(scenario_key(result))
+        if before is None:
+            continue
+        changes = []
+        for label, old, new, higher_is_worse in (
+            ("p50", before["latency_ms"]["p50"], result["latency_ms"]["p50"], True),
+            ("p95", before["latency_ms"]["p95"], result["latency_ms"]["p95"], True),
+            ("rps", before["throughput_rps"], result["throughput_rps"], False),
+            ("rss", before["peak_rss_mb"], result["peak_rss_mb"], True)
+        ):
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > threshold if higher_is_worse else change < -threshold
+            regressions += regressed
+            changes.append(f"{label} {old:.1f}->{new:.1f} ({change:+.0%}){' !' if regressed else ''}")
+        endpoint, model, size, concurrency = scenario_key(result)
+        print(f"{endpoint:>6} {model:>8} {size:>10} c={concurrency:<3} " + "  ".join(changes))
+
+    print(f"{regressions} metric(s) regressed by more than {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=("inprocess", "socket"), default="inprocess")
+    parser.add_argument("--port", type=int, default=SOCKET_PORT)
+    parser.add_argument("--endpoints", nargs="+", choices=tuple(ENDPOINTS), default=["image", "batch", "video"])
+    parser.add_argument("--models", nargs="+", default=["yolov8n"])
+    parser.add_argument("--image-sizes", nargs="+", default=["640x480", "1920x1080"])
+    parser.add_argument("--video-sizes", nargs="+", default=["640x360"])
+    parser.add_argument("--video-frames", type=int, default=60)
+    parser.add_argument("--batch-images", type=int, default=8)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=40, help="Requests per image/batch scenario")
+    parser.add_argument("--video-requests", type=int, default=4, help="Requests per video scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed requests before each scenario")
+    parser.add_argument("--real-models", action="store_true", help="Load real weights instead of stubs")
+    parser.add_argument("--stub-batch-ms", type=float, default=5.0, help="Stub latency per inference call")
+    parser.add_argument("--stub-image-ms", type=float, default=5.0, help="Stub latency per image")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="Compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep results, jobs and logs out of the working tree; settings are read on first import
+        os.environ.setdefault("RESULT_DIR", os.path.join(tmp, "static"))
+        os.environ.setdefault("JOB_DIR", os.path.join(tmp, "jobs"))
+        os.environ.setdefault("JOB_DB_PATH", os.path.join(tmp, "jobs", "jobs.db"))
+        os.environ.setdefault("RENDER_PENDING_DIR", os.path.join(tmp, "pending_renders"))
+        os.environ.setdefault("SCRATCH_DIR", os.path.join(tmp, "scratch"))
+        os.environ.setdefault("LOG_FILE", os.path.join(tmp, "logs", "app.log"))
+        os.environ.setdefault("ERROR_LOG_FILE", os.path.join(tmp, "logs", "error.log"))
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
+        if not args.real_models:
+            # Stubs replace models inside this process only
+            os.environ["INFERENCE_EXECUTOR"] = "thread"
+            os.environ.setdefault("PRELOAD_MODELS", "[]")
+            from benchmarks.stub_model import install_stub_models
+
+            install_stub_models(args.stub_batch_ms, args.stub_image_ms)
+
+        payloads = build_payloads(args, tmp)
+        results = asyncio.run(run_all(args, payloads))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"metadata": run_metadata(args), "model_load": model_load_metrics(), "results": results},
+                f, indent=2, default=str
+            )
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Deterministic stand-in for a detection model, so benchmarks run without weights."""
+
+import time
+from typing import List
+
+import numpy as np
+
+from app.models.backends import OnnxRuntimeModel
+from app.services.detections import Detections
+
+STUB_NAMES = {0: "person", 2: "car", 16: "dog"}
+
+# (x1, y1, x2, y2) as fractions of the input, with confidence and class id
+_STUB_BOXES = np.array([[0.10, 0.10, 0.40, 0.50], [0.50, 0.20, 0.90, 0.80], [0.30, 0.60, 0.60, 0.95]], dtype=np.float32)
+_STUB_CONFIDENCE = np.array([0.90, 0.60, 0.30], dtype=np.float32)
+_STUB_CLASS_ID = np.array([0, 2, 16], dtype=np.int32)
+
+
+class StubModel(OnnxRuntimeModel):
+    """Returns the same three boxes, scaled to each input, after a fixed simulated latency.
+
+    Subclasses OnnxRuntimeModel only so run_detection dispatches to detect()
+    and detect_letterboxed(); no ONNX session is created.
+    """
+
+    def __init__(self, batch_ms: float = 5.0, image_ms: float = 5.0):
+        """Create a stub that takes batch_ms plus image_ms per image for each call."""
+        self.batch_ms = batch_ms
+        self.image_ms = image_ms
+        self.names = dict(STUB_NAMES)
+        self.size_bytes = 0
+
+    def _boxes(self, height: int, width: int, conf: float, max_det: int, classes: List[int] = None) -> Detections:
+        keep = _STUB_CONFIDENCE > conf
+        if classes is not None:
+            keep &= np.isin(_STUB_CLASS_ID, classes)
+        xyxy = _STUB_BOXES[keep] * np.array([width, height, width, height], dtype=np.float32)
+        return Detections(
+            xyxy=xyxy[:max_det],
+            confidence=_STUB_CONFIDENCE[keep][:max_det],
+            class_id=_STUB_CLASS_ID[keep][:max_det],
+            names=self.names
+        )
+
+    def _simulate(self, images: int):
+        time.sleep((self.batch_ms + self.image_ms * images) / 1000.0)
+
+    def detect(self, images: List[np.ndarray], conf: float = 0.25, iou: float = 0.7,
+               max_det: int = 300, classes: List[int] = None, **_) -> List[Detections]:
+        """Detect the stub boxes on BGR images."""
+        self._simulate(len(images))
+        return [self._boxes(*image.shape[:2], conf, max_det, classes) for image in images]
+
+    def detect_letterboxed(self, batch: np.ndarray, conf: float = 0.25, iou: float = 0.7,
+                           max_det: int = 300, classes: List[int] = None, **_) -> List[Detections]:
+        """Detect the stub boxes on a letterboxed batch."""
+        self._simulate(len(batch))
+        return [self._boxes(*batch.shape[2:], conf, max_det, classes) for _ in range(len(batch))]
+
+
+def install_stub_models(batch_ms: float = 5.0, image_ms: float = 5.0):
+    """Make the model manager load a StubModel for every model id instead of reading weights."""
+    from app.models.yolo_manager import YOLOModelManager
+
+    def load_stub(self, model_id: str):
+        return StubModel(batch_ms, image_ms), 0.0, 0.0
+
+    YOLOModelManager._load_model = load_stub
@@ -2,20 +2,27 @@
 """Entry point for the YOLO Object Detection backend."""
 
 import uvicorn
-from app.main import app
 from app.config import settings
-from app.utils.logger import app_logger as logger
+from app.utils.logger import app_logger as logger, setup_logging
 
 if __name__ == "__main__":
+    setup_logging()
     logger.info("Starting YOLO Object Detection Backend")
     logger.info(f"Host: {settings.host}:{settings.port}")
     logger.info(f"Debug mode: {settings.debug}")
 
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
-        log_level=settings.log_level.lower(),
-        access_log=True
-    )
+    if settings.workers > 1 and not settings.debug:
+        # Pre-forked workers share the preloaded model weights
+        from app.server import serve
+
+        logger.info(f"Workers: {settings.workers}")
+        serve(settings.workers)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            reload=settings.debug,
+            log_level=settings.log_level.lower(),
+            access_log=False  # the timing middleware writes the (sampled) access log
+        )
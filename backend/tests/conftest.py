@@ -0,0 +1,43 @@
+"""Shared test setup (results, jobs and logs go to a temporary directory) and real-model fixtures."""
+
+import os
+import tempfile
+
+import cv2
+import pytest
+
+# Settings are read when app.config is first imported, so these must be set first
+_TMP = tempfile.mkdtemp(prefix="yolo-tests-")
+os.environ.setdefault("RESULT_DIR", os.path.join(_TMP, "static"))
+os.environ.setdefault("JOB_DIR", os.path.join(_TMP, "jobs"))
+os.environ.setdefault("JOB_DB_PATH", os.path.join(_TMP, "jobs", "jobs.db"))
+os.environ.setdefault("RENDER_PENDING_DIR", os.path.join(_TMP, "pending_renders"))
+os.environ.setdefault("SCRATCH_DIR", os.path.join(_TMP, "scratch"))
+os.environ.setdefault("LOG_FILE", os.path.join(_TMP, "logs", "app.log"))
+os.environ.setdefault("ERROR_LOG_FILE", os.path.join(_TMP, "logs", "error.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.models.backends import ensure_artifact, load_artifact, weights_path
+
+# Model used by the tests that run real inference
+MODEL_ID = "yolov8n"
+
+
+@pytest.fixture(scope="session")
+def bus_image():
+    """The street photo shipped with ultralytics (a bus and several people)."""
+    ultralytics = pytest.importorskip("ultralytics")
+    return cv2.imread(os.path.join(os.path.dirname(ultralytics.__file__), "assets", "bus.jpg"))
+
+
+@pytest.fixture(scope="session")
+def load_backend():
+    """Get a loader for MODEL_ID on a backend; tests skip when the weights cannot be downloaded."""
+    def load(backend: str):
+        if not os.path.exists(weights_path(MODEL_ID)):
+            try:
+                ensure_artifact(MODEL_ID, "torch")
+            except Exception as e:
+                pytest.skip(f"{MODEL_ID} weights unavailable: {e}")
+        return load_artifact(ensure_artifact(MODEL_ID, backend), backend)
+    return load
@@ -0,0 +1,42 @@
+"""Output parity of the ONNX Runtime backends (FP32 and INT8) against PyTorch."""
+
+import pytest
+
+from app.config import settings
+from app.models.backends import run_detection
+from app.services.detections import Detections
+from benchmarks.bench_backends import parity
+
+PARAMS = {"conf": settings.detection_confidence_threshold, "imgsz": 640, "verbose": False}
+
+# Per backend: minimum share of reference boxes matched, minimum mean IoU of the matches,
+# maximum confidence difference of a match
+TOLERANCES = {
+    "onnx": (0.95, 0.99, 0.01),
+    "onnx_int8": (0.8, 0.9, 0.1),
+}
+
+
+@pytest.fixture(scope="module")
+def reference(bus_image, load_backend):
+    detections = run_detection(load_backend("torch"), [bus_image], PARAMS)[0]
+    assert len(detections) > 0, "PyTorch found no boxes, so parity would be vacuous"
+    return detections
+
+
+def test_parity_rejects_empty_reference():
+    candidate = Detections.from_list([{"bbox": [0, 0, 10, 10], "confidence": 0.9, "class": "person"}])
+    with pytest.raises(ValueError):
+        parity(Detections.empty(), candidate)
+
+
+@pytest.mark.parametrize("backend", list(TOLERANCES))
+def test_backend_matches_torch(backend, bus_image, load_backend, reference):
+    min_matched, min_iou, max_conf_diff = TOLERANCES[backend]
+    match = parity(reference, run_detection(load_backend(backend), [bus_image], PARAMS)[0])
+
+    assert match["matched"] >= min_matched
+    assert match["mean_iou"] >= min_iou
+    assert match["max_conf_diff"] <= max_conf_diff
+    # Few extra boxes either: the candidate finds about as many as the reference
+    assert match["boxes"] <= len(reference) / min_matched + 1
@@ -0,0 +1,109 @@
+"""Micro-batching: lanes per model and config, the deadline flush and cancelled requests."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.batch_scheduler import InferenceBatcher
+
+PARAMS = {"conf": 0.25, "imgsz": 640}
+
+
+class RecordingRunner:
+    """Batch runner returning each image as its own result and recording every forward pass."""
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, model_id, model, images, detect_params):
+        self.batches.append((model_id, list(images), dict(detect_params)))
+        return list(images)
+
+
+@pytest.fixture
+def runner():
+    return RecordingRunner()
+
+
+async def test_compatible_requests_share_a_batch(runner):
+    batcher = InferenceBatcher(max_batch_size=4, max_wait_ms=20, runner=runner)
+
+    results = await asyncio.gather(*(batcher.submit("yolov8n", None, image, PARAMS) for image in range(4)))
+
+    # Each caller gets its own slice of one forward pass
+    assert results == [0, 1, 2, 3]
+    assert runner.batches == [("yolov8n", [0, 1, 2, 3], PARAMS)]
+    assert batcher.get_stats()["batch_size_histogram"] == {"4": 1}
+
+
+async def test_models_and_configs_get_separate_lanes(runner):
+    batcher = InferenceBatcher(max_batch_size=8, max_wait_ms=20, runner=runner)
+    requests = [
+        ("yolov8n", "a", PARAMS),
+        ("yolov8s", "b", PARAMS),
+        ("yolov8n", "c", {**PARAMS, "conf": 0.5}),
+        ("yolov8n", "d", {**PARAMS, "classes": [0]}),
+        ("yolov8n", "e", PARAMS),
+    ]
+
+    results = await asyncio.gather(*(batcher.submit(model_id, None, image, params) for model_id, image, params in requests))
+
+    assert results == ["a", "b", "c", "d", "e"]
+    assert sorted((model_id, images) for model_id, images, _ in runner.batches) == [
+        ("yolov8n", ["a", "e"]), ("yolov8n", ["c"]), ("yolov8n", ["d"]), ("yolov8s", ["b"])
+    ]
+    # Lanes are dropped once drained
+    assert batcher.get_stats()["active_lanes"] == 0
+
+
+async def test_partial_batch_flushes_at_the_deadline(runner):
+    batcher = InferenceBatcher(max_batch_size=8, max_wait_ms=50, runner=runner)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(batcher.submit("yolov8n", None, 1, PARAMS), batcher.submit("yolov8n", None, 2, PARAMS))
+    elapsed = time.perf_counter() - started
+
+    assert results == [1, 2]
+    assert [images for _, images, _ in runner.batches] == [[1, 2]]
+    assert 0.05 <= elapsed < 1.0
+
+
+async def test_full_batch_does_not_wait_for_the_deadline(runner):
+    batcher = InferenceBatcher(max_batch_size=2, max_wait_ms=10_000, runner=runner)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.submit("yolov8n", None, 1, PARAMS), batcher.submit("yolov8n", None, 2, PARAMS)),
+        timeout=1.0
+    )
+
+    assert results == [1, 2]
+
+
+async def test_cancelled_request_is_left_out_of_the_batch(runner):
+    batcher = InferenceBatcher(max_batch_size=8, max_wait_ms=50, runner=runner)
+    tasks = [asyncio.create_task(batcher.submit("yolov8n", None, image, PARAMS)) for image in range(3)]
+    await asyncio.sleep(0)
+    assert batcher.queue_depth() == {"yolov8n": 3}
+
+    tasks[1].cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert [images for _, images, _ in runner.batches] == [[0, 2]]
+    assert batcher.queue_depth() == {}
+
+
+async def test_runner_failure_reaches_every_caller_in_the_batch():
+    async def failing(model_id, model, images, detect_params):
+        raise RuntimeError("out of memory")
+
+    batcher = InferenceBatcher(max_batch_size=2, max_wait_ms=20, runner=failing)
+
+    results = await asyncio.gather(
+        batcher.submit("yolov8n", None, 1, PARAMS), batcher.submit("yolov8n", None, 2, PARAMS),
+        return_exceptions=True
+    )
+
+    assert [str(result) for result in results] == ["out of memory", "out of memory"]
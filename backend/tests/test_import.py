@@ -0,0 +1,22 @@
+"""Importing the application has no side effects on the filesystem."""
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_creates_no_files(tmp_path):
+    # The default log files live one level above the working directory
+    workdir = tmp_path / "backend"
+    workdir.mkdir()
+    env = {
+        key: value for key, value in os.environ.items()
+        if not key.endswith(("_DIR", "_PATH", "_FILE"))
+    }
+    env.update(PYTHONPATH=BACKEND_DIR, SCRATCH_DIR=str(workdir / "scratch"))
+
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=workdir, env=env, check=True, capture_output=True)
+
+    assert [path.name for path in tmp_path.rglob("*")] == ["backend"]
@@ -0,0 +1,105 @@
+"""Job store: lifecycle transitions, cancellation requests and persistence across restarts."""
+
+import pytest
+
+from app.services import job_store
+from app.services.job_store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs" / "jobs.db"))
+    yield store
+    store.close()
+
+
+def _create(store: JobStore, job_id: str = "job1", **fields):
+    return store.create(job_id, model_id="yolov8n", config={"conf": 0.4}, sampling={}, input_path="/in.mp4", **fields)
+
+
+def test_store_opens_the_database_on_first_use(tmp_path):
+    db_path = tmp_path / "jobs" / "jobs.db"
+    store = JobStore(str(db_path))
+    assert not db_path.parent.exists()
+
+    _create(store)
+
+    assert db_path.exists()
+    store.close()
+
+
+def test_new_job_is_queued_with_decoded_fields(store):
+    job = _create(store)
+
+    assert job["status"] == job_store.QUEUED
+    assert job["config"] == {"conf": 0.4}
+    assert job["frames_done"] == 0 and not job["cancel_requested"]
+
+
+def test_job_runs_to_completion(store):
+    _create(store)
+
+    store.update("job1", status=job_store.RUNNING, started_at=1.0, total_frames=100)
+    store.update("job1", frames_done=40, fps=20.0)
+    assert store.get("job1")["status"] == job_store.RUNNING
+
+    store.update(
+        "job1", status=job_store.COMPLETED, result_filename="result_job1.mp4", frames_done=100,
+        pipeline_stats={"decode": 1.5}, finished_at=2.0
+    )
+
+    job = store.get("job1")
+    assert job["status"] == job_store.COMPLETED
+    assert (job["frames_done"], job["total_frames"]) == (100, 100)
+    assert job["pipeline_stats"] == {"decode": 1.5}
+    assert store.find_by_result("result_job1.mp4")["id"] == "job1"
+
+
+def test_list_filters_by_status_newest_first(store):
+    for created_at, job_id in enumerate(("a", "b", "c")):
+        _create(store, job_id, created_at=float(created_at))
+    store.update("b", status=job_store.FAILED, error="boom")
+
+    assert [job["id"] for job in store.list()] == ["c", "b", "a"]
+    assert [job["id"] for job in store.list(statuses=list(job_store.ACTIVE_STATES))] == ["c", "a"]
+    assert [job["id"] for job in store.list(limit=1)] == ["c"]
+
+
+@pytest.mark.parametrize("status", job_store.ACTIVE_STATES)
+def test_active_job_can_be_cancelled(store, status):
+    _create(store)
+    store.update("job1", status=status)
+
+    assert store.request_cancel("job1")
+    assert store.cancel_requested("job1")
+
+
+@pytest.mark.parametrize("status", job_store.FINAL_STATES)
+def test_finished_job_cannot_be_cancelled(store, status):
+    _create(store)
+    store.update("job1", status=status)
+
+    assert not store.request_cancel("job1")
+    assert not store.cancel_requested("job1")
+
+
+def test_unknown_job(store):
+    assert store.get("missing") is None
+    assert not store.request_cancel("missing")
+    assert not store.cancel_requested("missing")
+
+
+def test_jobs_survive_a_restart(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    store = JobStore(db_path)
+    _create(store)
+    store.update("job1", status=job_store.RUNNING)
+    store.request_cancel("job1")
+    store.close()
+
+    reopened = JobStore(db_path)
+    job = reopened.get("job1")
+
+    # Another worker sees both the state and the pending cancellation
+    assert job["status"] == job_store.RUNNING and reopened.cancel_requested("job1")
+    reopened.close()
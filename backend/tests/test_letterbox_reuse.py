@@ -0,0 +1,51 @@
+"""Video letterbox reuse: the preallocated batch gives the predictor's detections."""
+
+import cv2
+import pytest
+
+from app.config import settings
+from app.models import backends
+from app.models.backends import DEFAULT_IMGSZ, run_detection
+from app.services.frame_preprocessing import LetterboxBatcher
+from benchmarks.bench_backends import parity
+
+CONF = settings.detection_confidence_threshold
+
+# How a letterboxed batch reaches the PyTorch model: predictor internals, or model.predict on releases without them
+LETTERBOXED_PATHS = {
+    "fast_path": lambda model, batch: run_detection(model, batch, {"conf": CONF}),
+    "predict_fallback": lambda model, batch: backends._predict_letterboxed_torch(model, batch, CONF, 0.7, 300, None),
+}
+
+
+@pytest.fixture(scope="module")
+def model(load_backend):
+    return load_backend("torch")
+
+
+@pytest.fixture(scope="module")
+def frames(bus_image):
+    # Two frames of one size, as a video batch
+    return [bus_image, cv2.flip(bus_image, 1)]
+
+
+@pytest.fixture(scope="module")
+def expected(model, frames):
+    # Letterbox reuse off: the ultralytics predictor preprocesses each frame
+    detections = run_detection(model, frames, {"conf": CONF})
+    assert all(len(result) for result in detections), "no boxes found, so the comparison would be vacuous"
+    return detections
+
+
+@pytest.mark.parametrize("path", list(LETTERBOXED_PATHS))
+def test_reuse_matches_predictor(path, model, frames, expected):
+    height, width = frames[0].shape[:2]
+    batcher = LetterboxBatcher((width, height), DEFAULT_IMGSZ, len(frames))
+    infer = batcher.wrap(lambda batch: LETTERBOXED_PATHS[path](model, batch))
+
+    for reference, detections in zip(expected, infer(frames)):
+        match = parity(reference, detections)
+        assert match["boxes"] == len(reference)
+        assert match["matched"] == 1.0
+        assert match["mean_iou"] >= 0.99
+        assert match["max_conf_diff"] <= 1e-3
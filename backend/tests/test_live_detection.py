@@ -0,0 +1,180 @@
+"""Live detection: only the newest frame waits while inference is busy, and results are sent compactly."""
+
+import asyncio
+import json
+import multiprocessing
+from contextlib import asynccontextmanager, nullcontext
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.models.yolo_manager import YOLOModelManager
+from app.services import inference_executor
+from app.services.detection_service import DetectionService
+from app.services.detections import Detections
+from app.services.live_detection import LiveConfig, LiveDetectionSession, compact_detections
+
+MODEL_ID = "yolov8n"
+NAMES = {0: "person", 1: "bicycle"}
+
+
+class FakeWebSocket:
+    """Feeds queued client messages to the session and records what it sends back."""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent = []
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+    def send_frame(self, data: bytes):
+        self.incoming.put_nowait({"type": "websocket.receive", "bytes": data})
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+
+class FakeService:
+    """Only what the session needs to announce its settings."""
+
+    @asynccontextmanager
+    async def lease_model(self, model_id):
+        yield type("Model", (), {"names": {0: "person"}})()
+
+
+class StandInModel:
+    """Model a process worker finds already loaded, so no weights are needed."""
+
+    names = NAMES
+
+
+class GatedSession(LiveDetectionSession):
+    """Session whose detection waits until the test releases it, recording the frames detected."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.detected = []
+        self.busy = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def _detect(self, data, received, config):
+        self.detected.append(data)
+        self.busy.set()
+        await self.release.wait()
+        self.release.clear()
+        return Detections.empty(), 640, 480
+
+
+@pytest.fixture
+def websocket():
+    return FakeWebSocket()
+
+
+@pytest.fixture
+def session(websocket):
+    return GatedSession(websocket, FakeService(), LiveConfig(model_id=MODEL_ID))
+
+
+async def _until(condition, timeout: float = 2.0):
+    async def wait():
+        while not condition():
+            await asyncio.sleep(0.001)
+    await asyncio.wait_for(wait(), timeout)
+
+
+async def test_latest_frame_wins(websocket, session):
+    run = asyncio.create_task(session.run())
+
+    websocket.send_frame(b"frame0")
+    await asyncio.wait_for(session.busy.wait(), 2.0)
+    # Frames arriving while frame0 is in inference replace each other
+    for data in (b"frame1", b"frame2", b"frame3"):
+        websocket.send_frame(data)
+    await _until(lambda: session.frames_received == 4)
+
+    session.release.set()
+    await _until(lambda: len(session.detected) == 2)
+    session.release.set()
+    await _until(lambda: session.frames_processed == 2)
+    websocket.disconnect()
+    await asyncio.wait_for(run, 2.0)
+
+    assert session.detected == [b"frame0", b"frame3"]
+    assert session.dropped == 2
+
+    results = [message for message in websocket.sent if message["type"] == "detections"]
+    assert [(result["frame"], result["dropped"]) for result in results] == [(0, 2), (3, 2)]
+    assert websocket.sent[0]["type"] == "ready" and websocket.sent[0]["names"] == {"0": "person"}
+
+
+async def test_frames_are_not_dropped_when_inference_keeps_up(websocket, session):
+    run = asyncio.create_task(session.run())
+
+    for index in range(3):
+        session.busy.clear()
+        websocket.send_frame(b"frame%d" % index)
+        await asyncio.wait_for(session.busy.wait(), 2.0)
+        session.release.set()
+        await _until(lambda: session.frames_processed == index + 1)
+    websocket.disconnect()
+    await asyncio.wait_for(run, 2.0)
+
+    assert session.detected == [b"frame0", b"frame1", b"frame2"]
+    assert session.dropped == 0
+
+
+def test_compact_detections_are_short():
+    detections = Detections.from_data(np.array([[100.25, 20.04, 300.96, 400.0, 0.9, 2]], dtype=np.float32))
+
+    rows = compact_detections(detections)
+
+    assert rows == [[100.2, 20.0, 301.0, 400.0, 0.9, 2]]
+    assert json.dumps(rows) == "[[100.2, 20.0, 301.0, 400.0, 0.9, 2]]"
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers inherit the stand-in model by forking")
+async def test_process_workers_report_class_names(monkeypatch, websocket):
+    monkeypatch.setattr(settings, "inference_executor", "process")
+    monkeypatch.setattr(settings, "inference_workers", 1)
+    monkeypatch.setattr(settings, "preload_models", [])
+    # Set before the pool forks its worker, which then holds the model
+    monkeypatch.setitem(inference_executor._worker_models, MODEL_ID, StandInModel())
+    service = DetectionService(YOLOModelManager())
+    try:
+        assert service.executor.uses_processes
+        session = LiveDetectionSession(websocket, service, LiveConfig(model_id=MODEL_ID))
+
+        assert await session._announce(session.config, "ready")
+        assert await session._announce(session.config, "config")
+    finally:
+        service.executor.shutdown()
+
+    assert [(message["type"], message["names"]) for message in websocket.sent] == [
+        ("ready", {"0": "person", "1": "bicycle"}), ("config", {"0": "person", "1": "bicycle"})
+    ]
+    assert not service.model_manager.loaded_models
+
+
+async def test_worker_load_failure_is_reported(websocket):
+    class FailingExecutor:
+        async def model_names(self, model_id):
+            raise FileNotFoundError("yolov8n.pt")
+
+    service = FakeService()
+    service.executor = FailingExecutor()
+    service.lease_model = lambda model_id: nullcontext(None)
+    session = LiveDetectionSession(websocket, service, LiveConfig(model_id=MODEL_ID))
+
+    assert not await session._announce(session.config, "ready")
+    assert websocket.sent == [{"type": "error", "error": "Model could not be loaded: yolov8n.pt"}]
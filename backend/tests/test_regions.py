@@ -0,0 +1,121 @@
+"""Regions of interest: parsing, containment, and cropping with detections restored to the image."""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.services.detections import Detections
+from app.services.regions import RegionOfInterest, parse_roi, split_region
+
+# An L-shaped (concave) polygon and a separate rectangle
+L_SHAPE = [[0, 0], [40, 0], [40, 10], [10, 10], [10, 40], [0, 40]]
+RECT = [100, 100, 150, 120]
+
+
+def _region(*shapes) -> RegionOfInterest:
+    return RegionOfInterest.from_config(parse_roi(json.dumps(list(shapes))))
+
+
+def _detections(*boxes) -> Detections:
+    return Detections(
+        xyxy=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        confidence=np.full(len(boxes), 0.9, dtype=np.float32),
+        class_id=np.arange(len(boxes), dtype=np.int32),
+        names={0: "person", 1: "car", 2: "bus"}
+    )
+
+
+@pytest.mark.parametrize("value, message", [
+    ("not json", "not valid JSON"),
+    ("[]", "non-empty list"),
+    ("[[10, 10, 5, 20]]", "x2 > x1"),
+    ("[[[0, 0], [1, 1]]]", "polygon of 3"),
+    ("[[0, 0, true, 1]]", "rectangle"),
+])
+def test_invalid_roi_is_rejected(value, message):
+    with pytest.raises(ValueError, match=message):
+        parse_roi(value)
+
+
+def test_contains_rectangles_and_concave_polygons():
+    region = _region(L_SHAPE, RECT)
+    points = np.array([
+        [5, 5],      # corner of the L
+        [30, 5],     # horizontal arm
+        [5, 30],     # vertical arm
+        [30, 30],    # notch of the L
+        [125, 110],  # inside the rectangle
+        [150, 120],  # rectangle corner, inclusive
+        [200, 200],  # outside everything
+    ], dtype=np.float32)
+
+    assert region.contains(points).tolist() == [True, True, True, False, True, True, False]
+
+
+def test_keep_inside_uses_box_centers():
+    region = _region(RECT)
+    detections = _detections([90, 90, 130, 130], [140, 100, 200, 120], [0, 0, 50, 50])
+
+    kept = region.keep_inside(detections)
+
+    assert kept.class_id.tolist() == [0]
+
+
+def test_crop_window_covers_all_shapes():
+    region = _region(L_SHAPE, RECT)
+
+    assert region.crop_window(640, 480) == (0, 0, 150, 120)
+    assert region.crop_size(640, 480) == (150, 120)
+    # A region covering the whole image needs no crop
+    assert _region([0, 0, 640, 480]).crop_window(640, 480) is None
+
+
+def test_small_or_off_image_windows_keep_a_minimum_size():
+    assert _region([10.2, 10.7, 12.5, 14.1]).crop_window(640, 480) == (10, 10, 42, 42)
+    assert _region([630, 470, 700, 500]).crop_window(640, 480) == (608, 448, 640, 480)
+
+
+def test_crop_and_restore_round_trip():
+    image = np.arange(480 * 640 * 3, dtype=np.uint32).reshape(480, 640, 3)
+    region = _region([200, 100, 400, 300])
+
+    crop, origin = region.crop(image)
+
+    assert origin == (200, 100)
+    assert crop.shape == (200, 200, 3) and np.shares_memory(crop, image)
+    assert (crop[0, 0] == image[100, 200]).all()
+
+    # Boxes in crop coordinates: one centered in the region, one whose center falls outside it
+    restored = region.restore(_detections([50, 50, 150, 150], [180, 180, 260, 260]), origin)
+
+    assert restored.xyxy.tolist() == [[250, 150, 350, 250]]
+    assert restored.names == {0: "person", 1: "car", 2: "bus"}
+
+
+def test_scaled_region_follows_a_downscaled_image():
+    region = _region([200, 100, 400, 300]).scaled(0.5)
+
+    assert region.crop_window(320, 240) == (100, 50, 200, 150)
+
+
+def test_wrap_runs_inference_on_the_window():
+    region = _region([200, 100, 400, 300])
+    seen = []
+
+    def infer(frames):
+        seen.extend(frame.shape for frame in frames)
+        return [_detections([0, 0, 20, 20]) for _ in frames]
+
+    results = region.wrap(infer, (640, 480))([np.zeros((480, 640, 3), dtype=np.uint8)] * 2)
+
+    assert seen == [(200, 200, 3)] * 2
+    assert [result.xyxy.tolist() for result in results] == [[[200, 100, 220, 120]]] * 2
+
+
+def test_split_region_removes_the_roi_from_model_params():
+    params, region = split_region({"conf": 0.3, "roi": parse_roi(json.dumps([RECT]))})
+
+    assert params == {"conf": 0.3}
+    assert region.rects.tolist() == [RECT]
+    assert split_region({"conf": 0.3}) == ({"conf": 0.3}, None)
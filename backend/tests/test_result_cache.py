@@ -0,0 +1,59 @@
+"""Result cache keys: equivalent detection configs share a key, anything that changes results does not."""
+
+import numpy as np
+import pytest
+
+from app.services.result_cache import ResultCache, make_cache_key, normalize_params
+
+IMAGE = np.arange(32 * 32 * 3, dtype=np.uint8).reshape(32, 32, 3)
+
+
+def test_omitted_and_default_params_normalize_alike():
+    explicit = {"conf": 0.25, "iou": 0.7, "max_det": 300, "imgsz": 640, "classes": None}
+
+    assert normalize_params({}) == normalize_params(explicit) == normalize_params({"conf": None, "imgsz": None})
+
+
+def test_normalization_ignores_number_types_rounding_and_class_order():
+    assert normalize_params({"conf": 0.3, "max_det": 100, "classes": [2, 0]}) == normalize_params(
+        {"conf": 0.30000000001, "max_det": 100.0, "classes": [0, 2]}
+    )
+    assert normalize_params({"classes": []})["classes"] is None
+
+
+def test_equivalent_requests_share_a_key():
+    assert make_cache_key(IMAGE, "yolov8n", {}) == make_cache_key(
+        IMAGE.copy(), "yolov8n", {"conf": 0.25, "iou": 0.7, "classes": None}
+    )
+    # Keys hash the pixels, so a non-contiguous view of the same pixels matches too
+    assert make_cache_key(np.asfortranarray(IMAGE), "yolov8n", {}) == make_cache_key(IMAGE, "yolov8n", {})
+
+
+@pytest.mark.parametrize("model_id, params, extra, image", [
+    ("yolov8s", {}, None, IMAGE),
+    ("yolov8n", {"conf": 0.5}, None, IMAGE),
+    ("yolov8n", {"classes": [0]}, None, IMAGE),
+    ("yolov8n", {"roi": [[0, 0, 16, 16]]}, None, IMAGE),
+    ("yolov8n", {}, {"tiling": True}, IMAGE),
+    ("yolov8n", {}, None, IMAGE[:, :, ::-1]),
+    ("yolov8n", {}, None, IMAGE.reshape(16, 64, 3)),
+])
+def test_anything_affecting_results_changes_the_key(model_id, params, extra, image):
+    assert make_cache_key(image, model_id, params, extra) != make_cache_key(IMAGE, "yolov8n", {})
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    key = make_cache_key(IMAGE, "yolov8n", {})
+    cache = ResultCache(max_bytes=1024, disk_path=path, disk_max_bytes=1024)
+    cache.put(key, {"detections": []})
+    cache.close()
+
+    reopened = ResultCache(max_bytes=1024, disk_path=path, disk_max_bytes=1024)
+
+    assert reopened.get(key) == {"detections": []}
+    assert reopened.get_stats()["disk_hits"] == 1
+    # Entries whose result file is gone are dropped
+    assert reopened.get(key, is_valid=lambda value: False) is None
+    assert reopened.get(key) is None
+    reopened.close()
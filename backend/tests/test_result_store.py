@@ -0,0 +1,143 @@
+"""Result store: sharded layout, LRU quota, TTL sweeps and scratch cleanup."""
+
+import os
+import time
+
+import pytest
+
+from app.services.result_store import ResultStore
+
+HOUR = 3600
+
+
+def _store(root, **options) -> ResultStore:
+    options = {"shard_levels": 2, "ttls": {"image": HOUR, "video": HOUR}, "max_bytes": 0, **options}
+    store = ResultStore(str(root), **options)
+    store.scan()
+    return store
+
+
+def _write(store: ResultStore, filename: str, size: int = 100, age: float = 0) -> str:
+    """Write a result to its prepared path, optionally backdated by age seconds."""
+    path = store.prepare(filename)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    if age:
+        backdated = time.time() - age
+        os.utime(path, (backdated, backdated))
+    return path
+
+
+@pytest.fixture
+def root(tmp_path):
+    return tmp_path / "static"
+
+
+def test_results_are_sharded_by_name(root):
+    store = _store(root)
+
+    path = _write(store, "result_a.jpg")
+    store.add("result_a.jpg")
+
+    shards = os.path.relpath(os.path.dirname(path), root).split(os.sep)
+    assert len(shards) == 2 and all(len(shard) == 2 and set(shard) <= set("0123456789abcdef") for shard in shards)
+    assert store.url_for("result_a.jpg") == "/static/" + "/".join(shards) + "/result_a.jpg"
+    assert store.exists("result_a.jpg") and store.stat("result_a.jpg").size == 100
+
+
+def test_scan_rebuilds_the_index_and_removes_stale_partials(root):
+    store = _store(root)
+    _write(store, "result_a.jpg", size=10)
+    _write(store, "result_b.mp4", size=20)
+    stale = store.partial_path("result_c.jpg")
+    fresh = store.partial_path("result_d.jpg")
+    for path, age in ((stale, 2 * HOUR), (fresh, 0)):
+        with open(path, "wb") as f:
+            f.write(b"x")
+        os.utime(path, (time.time() - age, time.time() - age))
+
+    restarted = _store(root)
+
+    assert restarted.get_stats()["files"] == {"image": 1, "video": 1}
+    assert restarted.bytes == 30
+    # A partial file may still be being written by another request
+    assert not os.path.exists(stale) and os.path.exists(fresh)
+
+
+def test_quota_evicts_least_recently_used(root):
+    store = _store(root, max_bytes=250)
+    for name in ("result_a.jpg", "result_b.jpg"):
+        _write(store, name)
+        store.add(name)
+    store.touch("result_a.jpg")
+
+    _write(store, "result_c.jpg")
+    store.add("result_c.jpg")
+
+    assert store.exists("result_a.jpg") and store.exists("result_c.jpg")
+    assert not store.exists("result_b.jpg")
+    assert not os.path.exists(os.path.join(root, store._shard("result_b.jpg"), "result_b.jpg"))
+    assert store.bytes == 200 and store.evictions == 1
+
+
+def test_result_larger_than_the_quota_is_kept(root):
+    store = _store(root, max_bytes=150)
+    _write(store, "result_a.jpg")
+    store.add("result_a.jpg")
+
+    _write(store, "result_b.jpg", size=200)
+    store.add("result_b.jpg")
+
+    # The result just written is still served; everything older goes
+    assert store.exists("result_b.jpg") and not store.exists("result_a.jpg")
+
+
+def test_sweep_expires_results_per_kind(root):
+    store = _store(root, ttls={"image": HOUR, "video": 0})
+    _write(store, "result_old.jpg", age=2 * HOUR)
+    _write(store, "result_new.jpg")
+    _write(store, "result_old.mp4", age=2 * HOUR)
+    store.scan()
+
+    assert store.sweep() == {"expired": 1, "evicted": 0, "scratch_removed": 0}
+    assert not store.exists("result_old.jpg")
+    # A TTL of 0 keeps videos until the quota needs the space
+    assert store.exists("result_new.jpg") and store.exists("result_old.mp4")
+    assert store.get_stats()["last_sweep_at"] is not None
+
+
+def test_sweep_enforces_the_quota(root):
+    store = _store(root)
+    for name in ("result_a.jpg", "result_b.jpg", "result_c.jpg"):
+        _write(store, name)
+        store.add(name)
+
+    store.max_bytes = 150
+    assert store.sweep()["evicted"] == 2
+    assert store.exists("result_c.jpg") and store.bytes == 100
+
+
+def test_sweep_cleans_old_scratch_files(root, tmp_path):
+    scratch = tmp_path / "scratch"
+    store = _store(root, scratch_dirs={str(scratch): 60})
+    old = store.scratch_path(str(scratch), "upload.mp4")
+    new = store.scratch_path(str(scratch), "upload.mp4")
+    for path, age in ((old, 120), (new, 0)):
+        with open(path, "wb") as f:
+            f.write(b"x")
+        os.utime(path, (time.time() - age, time.time() - age))
+
+    assert store.sweep()["scratch_removed"] == 1
+    assert not os.path.exists(old) and os.path.exists(new)
+
+
+def test_shared_store_finds_results_written_by_another_worker(root):
+    store = _store(root, shared=True)
+    other = _store(root, shared=True)
+
+    _write(other, "result_a.jpg")
+    other.add("result_a.jpg")
+
+    assert store.exists("result_a.jpg")
+    assert store.remove("result_a.jpg")
+    assert not os.path.exists(os.path.join(root, store._shard("result_a.jpg"), "result_a.jpg"))
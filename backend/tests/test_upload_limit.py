@@ -0,0 +1,83 @@
+"""Upload size middleware: oversized bodies get a 413, declared or streamed; malformed lengths a 400."""
+
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.ingest import UploadSizeLimitMiddleware
+
+MAX_FILE_SIZE = 1024
+OVERHEAD = 128
+BATCH_LIMIT = 4096
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.state.handled = 0
+
+    @app.post("/upload")
+    @app.post("/batch")
+    async def upload(request: Request):
+        app.state.handled += 1
+        return {"size": len(await request.body())}
+
+    app.add_middleware(
+        UploadSizeLimitMiddleware, max_file_size=MAX_FILE_SIZE, overhead_bytes=OVERHEAD,
+        path_limits={"/batch": BATCH_LIMIT}
+    )
+    return TestClient(app)
+
+
+def _chunks(size: int, chunk_size: int = 256):
+    """Stream a body without a Content-Length header."""
+    for start in range(0, size, chunk_size):
+        yield b"x" * min(chunk_size, size - start)
+
+
+def test_body_within_the_limit_is_accepted(client):
+    response = client.post("/upload", content=b"x" * (MAX_FILE_SIZE + OVERHEAD))
+
+    assert response.status_code == 200
+    assert response.json() == {"size": MAX_FILE_SIZE + OVERHEAD}
+
+
+def test_declared_oversized_body_is_rejected_before_the_app(client):
+    response = client.post("/upload", content=b"x" * (MAX_FILE_SIZE + OVERHEAD + 1))
+
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("File too large")
+    assert client.app.state.handled == 0
+
+
+def test_streamed_oversized_body_is_rejected(client):
+    response = client.post("/upload", content=_chunks(MAX_FILE_SIZE * 4))
+
+    assert response.status_code == 413
+
+
+def test_path_limit_overrides_the_default(client):
+    assert client.post("/batch", content=b"x" * BATCH_LIMIT).status_code == 200
+    assert client.post("/batch", content=_chunks(BATCH_LIMIT * 2)).status_code == 413
+
+
+@pytest.mark.parametrize("content_length", [b"abc", b"-1", b"+10", b" 10", b"1_0", b""])
+async def test_malformed_content_length_is_rejected(content_length):
+    async def app(scope, receive, send):
+        raise AssertionError("the request must not reach the app")
+
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/upload", "headers": [(b"content-length", content_length)]}
+    await UploadSizeLimitMiddleware(app, max_file_size=MAX_FILE_SIZE)(scope, receive, send)
+
+    assert sent[0]["status"] == 400
+    assert json.loads(sent[1]["body"]) == {"detail": "Invalid Content-Length header"}
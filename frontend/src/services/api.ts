@@ -52,6 +52,8 @@ export const detectionApi = {
     const formData = new FormData()
     formData.append('file', file)
     formData.append('model', model)
+    // The result view shows the annotated image, which the API skips by default
+    formData.append('render', 'jpeg')
 
     // Add config parameters if provided
     if (config) {